@@ -0,0 +1,57 @@
+"""Сравнение путей декодирования NotificationJob в consumer'е
+(JSON: slow/fast, бинарный формат common.job_codec).
+
+Запуск из корня репозитория:
+
+    python -m src.benchmarks.worker.bench_decode [--count 5000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from src.notifications.common.job_codec import encode_job
+from src.notifications.worker.consumer.decoding import decode_job
+from .payloads import make_jobs
+
+
+def _best_of(repeat: int, payloads: list[bytes], fast: bool) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for raw in payloads:
+            decode_job(raw, fast=fast)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'payload':<10}{'avg bytes':>10}{'path':>8}"
+          f"{'jobs/s':>12}{'us/job':>9}")
+    for kind in ("welcome", "campaign"):
+        jobs = make_jobs(args.count, kind=kind)
+        as_json = [job.model_dump_json().encode("utf-8") for job in jobs]
+        as_binary = [encode_job(job) for job in jobs]
+        results = {}
+        for path, payloads, fast in (
+            ("slow", as_json, False),
+            ("fast", as_json, True),
+            ("binary", as_binary, True),
+        ):
+            avg_size = sum(map(len, payloads)) / len(payloads)
+            elapsed = _best_of(args.repeat, payloads, fast)
+            results[path] = elapsed
+            print(f"{kind:<10}{avg_size:>10.0f}{path:>8}"
+                  f"{args.count / elapsed:>12.0f}"
+                  f"{elapsed / args.count * 1e6:>9.1f}")
+        print(f"{kind:<10}{'':>10}{'x':>8}"
+              f"{results['slow'] / results['fast']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
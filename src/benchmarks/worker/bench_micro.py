@@ -0,0 +1,227 @@
+"""Микро-бенчмарки функций, которые воркер вызывает на каждое сообщение.
+
+Результат — JSON (ns/op: лучший и медиана из --repeat прогонов),
+который сравнивает src.benchmarks.worker.compare:
+
+    python -m src.benchmarks.worker.bench_micro --output baseline.json
+    # ... изменения ...
+    python -m src.benchmarks.worker.bench_micro --output current.json
+    python -m src.benchmarks.worker.compare baseline.json current.json
+
+Числа зависят от машины и версии Python: baseline и текущий прогон
+снимаем на одной машине.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import Any, Callable
+
+from src.notifications.common.config import Settings
+from src.notifications.common.schemas import NotificationJob
+from src.notifications.worker.dlq import DlqPublisher
+from src.notifications.worker.processor import JobProcessor
+from src.notifications.worker.processor.rendering import compile_template
+from src.notifications.worker.processor.status_writer import _ensure_channel
+from src.notifications.worker.senders import EmailSender
+from .fakes import TEMPLATES
+from .payloads import make_jobs
+
+FORMAT_VERSION = 1
+
+# run(loops) — выполнить операцию loops раз
+RunFn = Callable[[int], None]
+
+
+@dataclass
+class Case:
+    name: str
+    run: RunFn
+
+
+def _sync(fn: Callable[[], Any]) -> RunFn:
+    def run(loops: int) -> None:
+        for _ in repeat(None, loops):
+            fn()
+    return run
+
+
+class _DoneProducer:
+    """AIOKafkaProducer.send(), который сразу «доставляет» сообщение."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    async def send(self, topic: str, key: bytes | None, value: bytes):
+        delivery = self._loop.create_future()
+        delivery.set_result(None)
+        return delivery
+
+
+def _dlq_case(job: NotificationJob) -> RunFn:
+    loop = asyncio.new_event_loop()
+    publisher = DlqPublisher(Settings(), _DoneProducer(loop))
+
+    async def _many(loops: int) -> None:
+        for _ in repeat(None, loops):
+            await publisher.publish_job(job, error_message="SMTP timeout")
+        # колбэки доставки — вне замера не вынести, но они дешёвые
+        await asyncio.sleep(0)
+
+    return lambda loops: loop.run_until_complete(_many(loops))
+
+
+def build_cases() -> list[Case]:
+    cases: list[Case] = []
+    for kind in ("welcome", "campaign"):
+        job = make_jobs(1, kind=kind)[0]
+        as_dict = job.model_dump(mode="json")
+        as_json = job.model_dump_json().encode("utf-8")
+        cases += [
+            Case(f"job.model_validate[{kind}]",
+                 _sync(lambda d=as_dict: NotificationJob.model_validate(d))),
+            Case(f"job.model_validate_json[{kind}]",
+                 _sync(lambda raw=as_json:
+                       NotificationJob.model_validate_json(raw))),
+        ]
+
+    job = make_jobs(1, kind="campaign")[0]
+    str_job = job.model_copy(update={"channel": " Email "})
+    cases += [
+        Case("status_writer._ensure_channel[enum]",
+             _sync(lambda: _ensure_channel(job))),
+        Case("status_writer._ensure_channel[str]",
+             _sync(lambda: _ensure_channel(str_job))),
+        Case("job_processor._normalize_channel[enum]",
+             _sync(lambda: JobProcessor._normalize_channel(job.channel))),
+        Case("job_processor._normalize_channel[str]",
+             _sync(lambda: JobProcessor._normalize_channel("email"))),
+    ]
+
+    subject, body = TEMPLATES["campaign_email"]
+    compiled = compile_template(body)
+    cases += [
+        Case("render.str_format[campaign]",
+             _sync(lambda: body.format(**job.data))),
+        Case("render.compiled[campaign]",
+             _sync(lambda: compiled.render(job.data))),
+    ]
+
+    rendered_subject = subject.format(**job.data)
+    rendered_body = body.format(**job.data)
+    sender = EmailSender(
+        host="localhost", port=1025, sender="no-reply@example.com")
+    cases.append(Case(
+        "email.mime_text[campaign]",
+        _sync(lambda: sender._build_message(
+            rendered_subject, rendered_body, "user@example.com")),
+    ))
+
+    for kind in ("welcome", "campaign"):
+        cases.append(Case(
+            f"dlq.publish_job[{kind}]",
+            _dlq_case(make_jobs(1, kind=kind)[0]),
+        ))
+    return cases
+
+
+def measure(
+    case: Case,
+    *,
+    repeat_count: int,
+    min_time: float,
+) -> dict[str, Any]:
+    """Подобрать loops под min_time, затем repeat_count прогонов."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        case.run(loops)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed <= 0 else max(
+            2, min(10, int(min_time / elapsed) + 1))
+
+    timings = []
+    for _ in range(repeat_count):
+        started = time.perf_counter()
+        case.run(loops)
+        timings.append((time.perf_counter() - started) / loops * 1e9)
+    return {
+        "ns_per_op_min": min(timings),
+        "ns_per_op_median": statistics.median(timings),
+        "loops": loops,
+        "repeat": repeat_count,
+    }
+
+
+def run(
+    *,
+    repeat_count: int = 7,
+    min_time: float = 0.2,
+    name_filter: str | None = None,
+    report: Callable[[str, dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    # DLQ пишет в лог каждое N-е сообщение — в замер это не нужно
+    logging.disable(logging.CRITICAL)
+    try:
+        for case in build_cases():
+            if name_filter and name_filter not in case.name:
+                continue
+            results[case.name] = measure(
+                case, repeat_count=repeat_count, min_time=min_time)
+            if report is not None:
+                report(case.name, results[case.name])
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", "-o",
+                        help="write results as JSON to this file")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds per measured run")
+    parser.add_argument("--filter", dest="name_filter",
+                        help="run only cases whose name contains this")
+    args = parser.parse_args()
+
+    def report(name: str, result: dict[str, Any]) -> None:
+        print(f"{name:<42}{result['ns_per_op_min']:>12.0f}"
+              f"{result['ns_per_op_median']:>12.0f}", file=sys.stderr)
+
+    print(f"{'case':<42}{'best ns':>12}{'median ns':>12}", file=sys.stderr)
+    data = run(
+        repeat_count=args.repeat,
+        min_time=args.min_time,
+        name_filter=args.name_filter,
+        report=report,
+    )
+    text = json.dumps(data, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
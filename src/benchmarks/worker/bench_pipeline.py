@@ -0,0 +1,257 @@
+"""End-to-end бенчмарк пайплайна воркера без внешних сервисов.
+
+Сообщения NotificationJob (JSON bytes, как пишет API) проходят через
+настоящие KafkaNotificationConsumer (декодирование, dispatcher,
+батчевый idempotency-lookup и prefetch контактов) и JobProcessor
+(claim/lookup, шаблон, рендер, Auth, отправка, статусы). Postgres,
+Auth и sender'ы — in-memory замены с задержкой (fakes.py).
+
+На каждом уровне конкурентности (WORKER_MAX_IN_FLIGHT) печатается:
+jobs/s, p50/p99 времени handle_job одного job'а и пик памяти
+(tracemalloc, отдельный прогон — чтобы не искажать время).
+
+Запуск из корня репозитория:
+
+    python -m src.benchmarks.worker.bench_pipeline \\
+        [--count 5000] [--concurrency 1,8,32,128] [--mode batch|stream] \\
+        [--db-ms 1] [--auth-ms 2] [--send-ms 5] [--jitter 0.2]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from aiokafka import TopicPartition
+
+from src.notifications.common.config import Settings
+from src.notifications.worker.consumer import (
+    KafkaNotificationConsumer,
+    KeyedDispatcher,
+)
+from src.notifications.worker.processor import JobProcessor
+from src.notifications.worker.repositories import (
+    BufferedNotificationDeliveryRepository,
+    CachedTemplateRepository,
+)
+from .fakes import (
+    FakeDlqPublisher,
+    FakeSender,
+    InMemoryDeliveryRepository,
+    InMemoryTemplateRepository,
+    Latency,
+    make_auth_client,
+)
+from .payloads import make_jobs
+
+
+class _Record(NamedTuple):
+    """Минимум ConsumerRecord, который читает consumer."""
+    offset: int
+    value: bytes
+    headers: tuple = ()
+
+
+class _TimedJobProcessor(JobProcessor):
+    """JobProcessor, который запоминает время каждого handle_job."""
+
+    durations: list[float]
+
+    async def handle_job(self, job, **kwargs) -> None:
+        started = time.perf_counter()
+        try:
+            await super().handle_job(job, **kwargs)
+        finally:
+            self.durations.append(time.perf_counter() - started)
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    jobs_per_second: float
+    p50_ms: float
+    p99_ms: float
+    peak_mib: float | None
+    sent: int
+    dlq: int
+
+
+def make_payloads(args: argparse.Namespace) -> list[bytes]:
+    jobs = make_jobs(args.count, kind=args.kind)
+    if args.users:
+        # Несколько job'ов на пользователя: работает кеш контактов,
+        # а dispatcher сериализует job'ы одного user_id
+        user_ids = [job.user_id for job in jobs[:args.users]]
+        jobs = [
+            job.model_copy(update={"user_id": user_ids[idx % args.users]})
+            for idx, job in enumerate(jobs)
+        ]
+    return [job.model_dump_json().encode("utf-8") for job in jobs]
+
+
+async def run_pipeline(
+    payloads: list[bytes],
+    args: argparse.Namespace,
+    concurrency: int,
+) -> tuple[float, list[float], int, int]:
+    """Один прогон: (секунды, длительности job'ов, отправлено, в DLQ)."""
+    settings = Settings().model_copy(update={
+        "worker_max_in_flight": concurrency,
+        "kafka_batch_mode": args.mode == "batch",
+    })
+
+    def latency(ms: float) -> Latency:
+        return Latency(ms=ms, jitter=args.jitter)
+
+    template_repo = InMemoryTemplateRepository(latency(args.db_ms))
+    if settings.template_cache_enabled:
+        template_repo = CachedTemplateRepository(
+            template_repo,
+            max_size=settings.template_cache_max_size,
+            ttl_seconds=settings.template_cache_ttl_seconds,
+        )
+        await template_repo.warm()
+    delivery_repo = InMemoryDeliveryRepository(latency(args.db_ms))
+    status_buffer = None
+    if settings.status_write_behind_enabled:
+        status_buffer = BufferedNotificationDeliveryRepository(
+            delivery_repo,
+            max_batch_size=settings.status_flush_max_batch,
+            flush_interval_seconds=settings.status_flush_interval_ms / 1000,
+        )
+        await status_buffer.start()
+    auth_client = make_auth_client(settings, latency(args.auth_ms))
+    sender = FakeSender(latency(args.send_ms), failure_rate=args.failure_rate)
+    dlq = FakeDlqPublisher()
+
+    processor = _TimedJobProcessor(
+        settings=settings,
+        template_repo=template_repo,
+        delivery_repo=status_buffer or delivery_repo,
+        auth_client=auth_client,
+        email_sender=sender,
+        push_sender=sender,
+        ws_sender=sender,
+        dlq_publisher=dlq,
+    )
+    processor.durations = []
+    dispatcher = KeyedDispatcher(concurrency)
+    consumer = KafkaNotificationConsumer(
+        settings=settings,
+        processor=processor,
+        dlq_publisher=dlq,
+        dispatcher=dispatcher,
+    )
+
+    started = time.perf_counter()
+    if args.mode == "batch":
+        tp = TopicPartition(settings.kafka_outbox_topic, 0)
+        step = settings.kafka_batch_max_records
+        for start in range(0, len(payloads), step):
+            records = [
+                _Record(offset, raw)
+                for offset, raw in enumerate(
+                    payloads[start:start + step], start=start)
+            ]
+            await consumer._handle_batch({tp: records})
+    else:
+        for raw in payloads:
+            await consumer._dispatch_message(raw)
+    await dispatcher.drain()
+    if status_buffer is not None:
+        await status_buffer.close()
+    elapsed = time.perf_counter() - started
+
+    await auth_client.aclose()
+    return elapsed, processor.durations, sender.sent, dlq.published
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+async def run_level(
+    payloads: list[bytes],
+    args: argparse.Namespace,
+    concurrency: int,
+) -> LevelResult:
+    # Прогрев: кеши компиляции шаблонов, импорт, аллокации
+    await run_pipeline(payloads[:min(len(payloads), 200)], args, concurrency)
+    elapsed, durations, sent, dlq = await run_pipeline(
+        payloads, args, concurrency)
+
+    peak_mib = None
+    if args.memory:
+        tracemalloc.start()
+        try:
+            await run_pipeline(payloads, args, concurrency)
+            peak_mib = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+
+    return LevelResult(
+        concurrency=concurrency,
+        jobs_per_second=len(payloads) / elapsed,
+        p50_ms=_percentile(durations, 50) * 1000,
+        p99_ms=_percentile(durations, 99) * 1000,
+        peak_mib=peak_mib,
+        sent=sent,
+        dlq=dlq,
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--kind", choices=("welcome", "campaign"),
+                        default="campaign")
+    parser.add_argument("--users", type=int, default=0,
+                        help="distinct user_ids (0 — each job its own)")
+    parser.add_argument("--concurrency", default="1,8,32,128",
+                        help="comma-separated worker_max_in_flight levels")
+    parser.add_argument("--mode", choices=("batch", "stream"),
+                        default="batch")
+    parser.add_argument("--db-ms", type=float, default=1.0)
+    parser.add_argument("--auth-ms", type=float, default=2.0)
+    parser.add_argument("--send-ms", type=float, default=5.0)
+    parser.add_argument("--jitter", type=float, default=0.2,
+                        help="latency spread as a fraction of the mean")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="share of sends that fail")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip the tracemalloc pass")
+    return parser.parse_args(argv)
+
+
+async def amain(args: argparse.Namespace) -> list[LevelResult]:
+    payloads = make_payloads(args)
+    print(
+        f"{args.count} {args.kind} jobs, mode={args.mode}, latency ms:"
+        f" db={args.db_ms} auth={args.auth_ms} send={args.send_ms}"
+        f" (±{args.jitter:.0%})"
+    )
+    print(f"{'in_flight':>9}{'jobs/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'peak MiB':>10}{'sent':>8}{'dlq':>6}")
+    results = []
+    for level in (int(value) for value in args.concurrency.split(",")):
+        result = await run_level(payloads, args, level)
+        results.append(result)
+        peak = "-" if result.peak_mib is None else f"{result.peak_mib:.1f}"
+        print(f"{result.concurrency:>9}{result.jobs_per_second:>10.0f}"
+              f"{result.p50_ms:>9.2f}{result.p99_ms:>9.2f}{peak:>10}"
+              f"{result.sent:>8}{result.dlq:>6}")
+    return results
+
+
+def main() -> None:
+    asyncio.run(amain(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
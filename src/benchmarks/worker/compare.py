@@ -0,0 +1,103 @@
+"""Сравнение двух результатов bench_micro (baseline → текущий).
+
+    python -m src.benchmarks.worker.compare baseline.json current.json \\
+        [--threshold 0.10] [--metric min|median]
+
+Кейс медленнее baseline больше чем на threshold — регрессия, код
+выхода 1 (удобно для CI). Кейсы, которых нет в одном из файлов,
+печатаются, но на код выхода не влияют.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+from .bench_micro import FORMAT_VERSION
+
+
+@dataclass
+class Diff:
+    name: str
+    baseline_ns: float
+    current_ns: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ns / self.baseline_ns
+
+    def verdict(self, threshold: float) -> str:
+        if self.ratio > 1 + threshold:
+            return "SLOWER"
+        if self.ratio < 1 - threshold:
+            return "faster"
+        return ""
+
+
+def load(path: str) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if data.get("format_version") != FORMAT_VERSION:
+        raise SystemExit(
+            f"{path}: unsupported format_version {data.get('format_version')}")
+    return data
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    metric: str = "min",
+) -> tuple[list[Diff], list[str], list[str]]:
+    """(общие кейсы, только в baseline, только в текущем)."""
+    key = f"ns_per_op_{metric}"
+    base_results = baseline["results"]
+    cur_results = current["results"]
+    diffs = [
+        Diff(name, base_results[name][key], cur_results[name][key])
+        for name in base_results if name in cur_results
+    ]
+    removed = [name for name in base_results if name not in cur_results]
+    added = [name for name in cur_results if name not in base_results]
+    return diffs, removed, added
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown as a fraction (0.10 = 10%%)")
+    parser.add_argument("--metric", choices=("min", "median"), default="min")
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    current = load(args.current)
+    for field in ("python", "platform"):
+        if baseline.get(field) != current.get(field):
+            print(f"warning: {field} differs: {baseline.get(field)!r}"
+                  f" vs {current.get(field)!r}", file=sys.stderr)
+
+    diffs, removed, added = compare(baseline, current, args.metric)
+    print(f"{'case':<42}{'baseline ns':>13}{'current ns':>13}{'change':>9}")
+    regressions = 0
+    for diff in diffs:
+        verdict = diff.verdict(args.threshold)
+        regressions += verdict == "SLOWER"
+        print(f"{diff.name:<42}{diff.baseline_ns:>13.0f}"
+              f"{diff.current_ns:>13.0f}{diff.ratio - 1:>+9.1%}  {verdict}")
+    for name in removed:
+        print(f"{name:<42}  only in baseline")
+    for name in added:
+        print(f"{name:<42}  new case")
+
+    if regressions:
+        print(f"\n{regressions} case(s) slower than baseline by more than"
+              f" {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
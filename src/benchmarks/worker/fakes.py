@@ -0,0 +1,221 @@
+"""In-memory замены внешних зависимостей воркера для бенчмарков.
+
+Каждая зависимость «отвечает» с заданной задержкой (Latency), поэтому
+можно сравнивать изменения при реалистичных временах БД, Auth и SMTP,
+не поднимая ни Postgres, ни Kafka, ни Mailpit.
+
+AuthClient — настоящий: подменяется только HTTP-транспорт
+(httpx.MockTransport), так что кеш контактов, single-flight и
+bulk-запросы работают как в бою.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
+
+import httpx
+
+from src.notifications.common.config import Settings
+from src.notifications.common.schemas import NotificationStatus
+from src.notifications.worker.auth import AuthClient
+from src.notifications.worker.repositories import (
+    NotificationDelivery,
+    Template,
+)
+
+_FINAL = (NotificationStatus.SENT.value, NotificationStatus.FAILED.value)
+
+TEMPLATES = {
+    "welcome_email": (
+        "Добро пожаловать, {name}!",
+        "Привет, {name}! Спасибо за регистрацию в онлайн-кинотеатре.",
+    ),
+    "campaign_email": (
+        "{name}, подборка фильмов недели",
+        "<p>Привет, {name}!</p><table>{banner_html}</table>"
+        "<p>Промокод: <b>{promo_code}</b></p>"
+        '<a href="{unsubscribe_url}">Отписаться</a>',
+    ),
+}
+
+
+@dataclass
+class Latency:
+    """Задержка ответа: ms ± jitter (доля от ms). ms=0 — без await."""
+
+    ms: float = 0.0
+    jitter: float = 0.0
+    rng: random.Random = random.Random(0)
+
+    async def wait(self) -> None:
+        if self.ms <= 0:
+            return
+        spread = self.rng.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(self.ms * (1 + spread) / 1000)
+
+
+class InMemoryTemplateRepository:
+    def __init__(self, latency: Latency) -> None:
+        self._latency = latency
+        self.queries = 0
+
+    async def get_template(
+        self,
+        template_code: str,
+        locale: str,
+        channel: str,
+    ) -> Template | None:
+        self.queries += 1
+        await self._latency.wait()
+        texts = TEMPLATES.get(template_code)
+        if texts is None:
+            return None
+        return Template(template_code, locale, channel, *texts)
+
+    async def list_templates(self) -> list[Template]:
+        await self._latency.wait()
+        return [
+            Template(code, "ru", "email", subject, body)
+            for code, (subject, body) in TEMPLATES.items()
+        ]
+
+
+class InMemoryDeliveryRepository:
+    """notification_delivery в словаре; тот же интерфейс, что у репозитория."""
+
+    def __init__(self, latency: Latency) -> None:
+        self._latency = latency
+        self.rows: dict[UUID, NotificationDelivery] = {}
+        self.writes = 0
+
+    async def get_by_job_id(self, job_id: UUID) -> NotificationDelivery | None:
+        await self._latency.wait()
+        return self.rows.get(job_id)
+
+    async def get_by_job_ids(
+        self,
+        job_ids: list[UUID],
+    ) -> dict[UUID, NotificationDelivery]:
+        await self._latency.wait()
+        return {
+            job_id: self.rows[job_id] for job_id in job_ids
+            if job_id in self.rows
+        }
+
+    async def claim(
+        self,
+        job_id: UUID,
+        user_id: UUID,
+        channel: str,
+        max_attempts: int,
+        lease_seconds: float,
+    ) -> NotificationDelivery | None:
+        await self._latency.wait()
+        row = self.rows.get(job_id)
+        if row is not None and row.status in _FINAL:
+            return None
+        row = NotificationDelivery(
+            job_id=job_id,
+            user_id=user_id,
+            status=NotificationStatus.IN_PROGRESS.value,
+            attempts=row.attempts if row else 0,
+            error_message=None,
+            sent_at=None,
+        )
+        self.rows[job_id] = row
+        return row
+
+    async def save_status(
+        self,
+        *,
+        job_id: UUID,
+        user_id: UUID,
+        channel: str,
+        status: str,
+        attempts: int,
+        error_code: str | None,
+        error_message: str | None,
+        sent_at: datetime | None,
+    ) -> None:
+        await self._latency.wait()
+        self.writes += 1
+        self.rows[job_id] = NotificationDelivery(
+            job_id=job_id,
+            user_id=user_id,
+            status=status,
+            attempts=attempts,
+            error_message=error_message,
+            sent_at=sent_at,
+        )
+
+    async def save_statuses(self, updates) -> None:
+        """Multi-row upsert для BufferedNotificationDeliveryRepository."""
+        await self._latency.wait()
+        for update in updates:
+            self.writes += 1
+            self.rows[update.job_id] = NotificationDelivery(
+                job_id=update.job_id,
+                user_id=update.user_id,
+                status=update.status,
+                attempts=update.attempts,
+                error_message=update.error_message,
+                sent_at=update.sent_at,
+            )
+
+
+class FakeSender:
+    """Sender канала: задержка провайдера и доля ошибок failure_rate."""
+
+    def __init__(self, latency: Latency, failure_rate: float = 0.0) -> None:
+        self._latency = latency
+        self._failure_rate = failure_rate
+        self._rng = random.Random(1)
+        self.sent = 0
+        self.failed = 0
+
+    async def send(self, **_kwargs) -> None:
+        await self._latency.wait()
+        if self._failure_rate and self._rng.random() < self._failure_rate:
+            self.failed += 1
+            raise RuntimeError("Provider error (benchmark)")
+        self.sent += 1
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeDlqPublisher:
+    def __init__(self) -> None:
+        self.published = 0
+
+    async def publish_job(self, job, error_message: str) -> None:
+        self.published += 1
+
+    async def publish_raw(self, raw_value: bytes, error_message: str) -> None:
+        self.published += 1
+
+    async def flush(self) -> None:
+        pass
+
+
+def make_auth_client(settings: Settings, latency: Latency) -> AuthClient:
+    """Настоящий AuthClient поверх in-memory «Auth-сервиса»."""
+
+    def _user(user_id: str) -> dict:
+        return {"user_id": user_id, "email": f"user-{user_id}@example.com"}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await latency.wait()
+        if request.url.path.endswith("/users/bulk"):
+            user_ids = json.loads(request.content)["user_ids"]
+            return httpx.Response(
+                200, json={"users": [_user(user_id) for user_id in user_ids]})
+        user_id = request.url.path.rsplit("/", 1)[1]
+        return httpx.Response(200, json=_user(user_id))
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AuthClient(settings, http_client=http_client)
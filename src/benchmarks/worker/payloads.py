@@ -0,0 +1,86 @@
+"""Генератор реалистичных NotificationJob для бенчмарков воркера."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from src.notifications.common.schemas import (
+    NotificationChannel,
+    NotificationJob,
+    NotificationMeta,
+    NotificationPriority,
+)
+
+_FILMS = ["Дюна", "Оппенгеймер", "Барби", "Интерстеллар", "Начало"]
+
+
+def make_job(
+    *,
+    kind: str = "campaign",
+    rng: random.Random | None = None,
+) -> NotificationJob:
+    """kind: "welcome" — короткий job регистрации,
+    "campaign" — рассылка с HTML-блоками в data."""
+    rng = rng or random.Random()
+    now = datetime.now(timezone.utc)
+
+    if kind == "welcome":
+        data = {"name": f"User {rng.randint(1, 10**6)}"}
+        meta = NotificationMeta(event_type="user_registered", event_id=uuid4())
+    elif kind == "campaign":
+        films = rng.sample(_FILMS, k=3)
+        data = {
+            "name": f"User {rng.randint(1, 10**6)}",
+            "films": films,
+            "promo_code": f"PROMO{rng.randint(1000, 9999)}",
+            "banner_html": "".join(
+                f"<tr><td><b>{film}</b></td><td>{rng.random():.3f}</td></tr>"
+                for film in films * 20
+            ),
+            "unsubscribe_url": f"https://example.com/unsubscribe/{uuid4()}",
+        }
+        meta = NotificationMeta(
+            event_type="campaign_triggered",
+            event_id=uuid4(),
+            campaign_id=uuid4(),
+            priority=NotificationPriority.NORMAL,
+        )
+    else:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    return NotificationJob(
+        job_id=uuid4(),
+        user_id=uuid4(),
+        channel=NotificationChannel.EMAIL,
+        template_code=f"{kind}_email",
+        locale="ru",
+        data=data,
+        meta=meta,
+        created_at=now,
+        send_after=None,
+        expires_at=now + timedelta(days=1),
+    )
+
+
+def make_jobs(
+    count: int,
+    *,
+    kind: str = "campaign",
+    seed: int = 42,
+) -> list[NotificationJob]:
+    rng = random.Random(seed)
+    return [make_job(kind=kind, rng=rng) for _ in range(count)]
+
+
+def make_payloads(
+    count: int,
+    *,
+    kind: str = "campaign",
+    seed: int = 42,
+) -> list[bytes]:
+    """Job'ы в том виде, в каком их пишет API в outbox (JSON bytes)."""
+    return [
+        job.model_dump_json().encode("utf-8")
+        for job in make_jobs(count, kind=kind, seed=seed)
+    ]
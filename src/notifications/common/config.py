@@ -21,6 +21,27 @@ class Settings(BaseSettings):
     kafka_outbox_topic: str = "notifications.outbox"
     kafka_dlq_topic: str = "notifications.dlq"
     kafka_consumer_group: str = "notification-worker"
+    # Число партиций outbox, high-priority и retry-топиков при создании
+    # (kafka_init). Не меньше числа процессов воркера во всех
+    # инстансах: лишний процесс в группе партиций не получит
+    kafka_topic_partitions: int = 4
+    # Формат NotificationJob в outbox: "json" | "binary" (common.job_codec).
+    # Воркер читает оба, поэтому сначала выкатываем воркер, потом API
+    kafka_job_format: str = "json"
+    # Приоритетная полоса: HIGH job'ы идут в отдельный топик, воркер
+    # читает его своим consumer'ом и отдаёт ему слоты с весом
+    # high_priority_lane_weight против 1 у обычного outbox
+    priority_lanes_enabled: bool = False
+    kafka_high_priority_topic: str = "notifications.outbox.high"
+    high_priority_lane_weight: int = 4
+
+    # Producer воркера (DLQ и retry-топики): батчинг и сжатие.
+    # lz4/zstd требуют пакетов lz4 / zstandard
+    kafka_producer_linger_ms: int = 20
+    kafka_producer_max_batch_size: int = 65536
+    kafka_producer_compression_type: str | None = None
+    # В лог ERROR пишется каждое N-е DLQ-сообщение (1 — все)
+    dlq_log_sample_every: int = 100
 
     # Postgres
     db_host: str = "notifications-db"
@@ -52,9 +73,105 @@ class Settings(BaseSettings):
     max_attempts: int = 3
     retry_delays_seconds_raw: str = "1,3,10"
     max_send_delay_seconds: int = 300
+    # Сколько job'ов воркер обрабатывает одновременно (1 = последовательно).
+    # Job'ы одного user_id всегда выполняются по порядку.
+    worker_max_in_flight: int = 1
+    # Сколько процессов воркера запускает супервизор (python -m
+    # notifications.worker); все в одной consumer group
+    worker_processes: int = 1
+    # Как часто процессы шлют супервизору свои счётчики и обновляют
+    # gauge'и метрик (сумму счётчиков он пишет в лог раз в минуту)
+    worker_stats_interval_seconds: float = 10.0
+    # Сколько ждать graceful-остановки процесса после SIGTERM до kill
+    worker_shutdown_timeout_seconds: float = 30.0
+    # Prometheus-метрики воркера: GET http://<host>:<port>/metrics.
+    # При нескольких процессах endpoint поднимает супервизор — сумма
+    # по процессам (multiprocess-режим prometheus_client). По умолчанию
+    # только localhost; в контейнере — METRICS_HOST=0.0.0.0
+    metrics_enabled: bool = True
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9108
+    # Профилирование живого воркера: SIGUSR1 (процессу или супервизору)
+    # пишет folded-стеки в profile_dir. GET /debug/profile?seconds=N на
+    # порту метрик (только одиночный процесс) — при profile_endpoint_enabled
+    profile_endpoint_enabled: bool = False
+    profile_dir: str = "/tmp/notifications-worker-profiles"
+    profile_default_seconds: float = 30.0
+    profile_max_seconds: float = 300.0
+    profile_sample_interval_ms: float = 5.0
+    # Batch-режим: getmany() + ручной коммит только завершённых offset'ов
+    kafka_batch_mode: bool = False
+    kafka_batch_max_records: int = 500
+    kafka_batch_timeout_ms: int = 1000
+    # NotificationJob.model_validate_json прямо из bytes вместо
+    # decode → json.loads → model_validate. Быстрее только на маленьких
+    # job'ах; на кампаниях с большим data — медленнее (см. WORKER.md)
+    kafka_fast_decode: bool = False
+
+    # Отложенная доставка (send_after) без блокировки consumer'а:
+    # все job'ы — в Postgres, ближние ещё и в timer wheel в памяти.
+    # lease — через сколько после срока чужую аренду строки можно снять
+    delayed_delivery_enabled: bool = False
+    delay_wheel_tick_ms: int = 100
+    delay_wheel_horizon_seconds: int = 60
+    delay_store_poll_interval_seconds: float = 5.0
+    delay_store_poll_batch_size: int = 500
+    delay_store_lease_seconds: float = 300.0
+
+    # Атомарный claim job'а в notification_delivery (IN_PROGRESS + lease)
+    # вместо чтения записи и проверки в Python
+    delivery_claim_enabled: bool = False
+    delivery_claim_lease_seconds: int = 600
+
+    # Write-behind для notification_delivery: статусы копятся в памяти
+    # и пишутся одним multi-row upsert'ом
+    status_write_behind_enabled: bool = False
+    status_flush_max_batch: int = 500
+    status_flush_interval_ms: int = 200
+
+    # Retry через Kafka-топики (notifications.retry.1s/3s/10s) вместо
+    # asyncio.sleep внутри воркера. Топики строятся по retry_delays_seconds.
+    retry_topics_enabled: bool = False
+    kafka_retry_topic_prefix: str = "notifications.retry"
+
+    def retry_topic_for_delay(self, delay_seconds: float) -> str:
+        # 1.0 → notifications.retry.1s, 0.5 → notifications.retry.500ms
+        if float(delay_seconds).is_integer():
+            return f"{self.kafka_retry_topic_prefix}.{int(delay_seconds)}s"
+        millis = int(round(delay_seconds * 1000))
+        return f"{self.kafka_retry_topic_prefix}.{millis}ms"
+
+    @property
+    def retry_topics(self) -> List[str]:
+        topics: List[str] = []
+        for delay in self.retry_delays_seconds:
+            topic = self.retry_topic_for_delay(delay)
+            if topic not in topics:
+                topics.append(topic)
+        return topics
+
+    # Кеш шаблонов в воркере; инвалидация через Postgres NOTIFY,
+    # который API шлёт при create/update шаблона
+    template_cache_enabled: bool = True
+    template_cache_max_size: int = 1000
+    template_cache_ttl_seconds: int = 300
+    templates_notify_channel: str = "templates_changed"
 
     # Auth service
     auth_base_url: str = "http://auth-service:8000"
+    # Общий HTTP-клиент воркера к Auth (keep-alive пул)
+    auth_http_timeout_seconds: float = 2.0
+    auth_http_max_connections: int = 100
+    auth_http_max_keepalive_connections: int = 20
+    auth_http_keepalive_expiry_seconds: float = 30.0
+    # Требует пакет h2 (httpx[http2]); без него — HTTP/1.1
+    auth_http2_enabled: bool = False
+    # Кеш контактов пользователей в воркере (LRU + TTL)
+    auth_contacts_cache_enabled: bool = True
+    auth_contacts_cache_max_size: int = 10000
+    auth_contacts_cache_ttl_seconds: int = 300
+    # Сколько user_id за один запрос к bulk-эндпоинту Auth
+    auth_bulk_max_ids: int = 100
 
     @property
     def retry_delays_seconds(self) -> List[float]:
@@ -73,5 +190,36 @@ class Settings(BaseSettings):
     smtp_host: str = "mailpit"
     smtp_port: int = 1025
     smtp_from: str = "noreply@cinema.kz"
+    # Пул постоянных SMTP-сессий; 0 — соединение на каждое письмо
+    smtp_pool_size: int = 4
+    smtp_pool_idle_check_seconds: float = 30.0
+    smtp_timeout_seconds: float = 10.0
+    # Склейка одинаковых писем кампаний в одну транзакцию (RCPT TO на
+    # каждого получателя). Имеет смысл при worker_max_in_flight > 1
+    smtp_batch_enabled: bool = False
+    smtp_batch_window_ms: int = 50
+    smtp_batch_max_recipients: int = 50
+
+    # Лимиты отправки по каналам (bulkhead + token bucket).
+    # *_max_concurrency=0 / *_rate_per_second=0 — без ограничения
+    email_max_concurrency: int = 0
+    email_rate_per_second: float = 0
+    email_rate_burst: int = 1
+    push_max_concurrency: int = 0
+    push_rate_per_second: float = 0
+    push_rate_burst: int = 1
+    ws_max_concurrency: int = 0
+    ws_rate_per_second: float = 0
+    ws_rate_burst: int = 1
+
+    # Circuit breaker на канал отправки. Пока канал open, job'ы не зовут
+    # провайдера и откладываются (delay-планировщик или retry-топик).
+    # Без DELAYED_DELIVERY_ENABLED / RETRY_TOPICS_ENABLED не включается
+    circuit_breaker_enabled: bool = False
+    circuit_breaker_window_size: int = 20
+    circuit_breaker_min_calls: int = 10
+    circuit_breaker_failure_rate: float = 0.5
+    circuit_breaker_open_seconds: float = 30.0
+    circuit_breaker_half_open_probes: int = 1
 
 settings = Settings()
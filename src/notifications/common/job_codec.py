@@ -0,0 +1,224 @@
+"""Компактный бинарный формат NotificationJob для Kafka.
+
+JSON повторяет имена полей в каждом сообщении и передаёт UUID и даты
+длинными строками. Бинарный формат v1 (только stdlib, struct):
+
+    MAGIC (3 байта) | VERSION (1 байт) | фиксированный заголовок | хвост
+
+Фиксированный заголовок (big-endian):
+    job_id (16) | user_id (16) | channel (1) | priority (1) | flags (1)
+    | created_at (int64, микросекунды от epoch UTC)
+
+Хвост — по флагам: send_after, expires_at (int64 мкс), event_id,
+campaign_id (16 байт), затем template_code, locale, event_type и data
+(компактный JSON) как строки с varint-длиной.
+
+MAGIC начинается с нулевого байта — корректный JSON так начинаться
+не может, поэтому consumer различает форматы по первым байтам и во
+время раскатки в топике спокойно живут оба.
+
+Даты декодируются как aware UTC (тот же момент времени), результат
+проходит обычную валидацию NotificationJob. Таблицы _CHANNELS/_PRIORITIES —
+часть формата: значения только дописываем в конец, новая раскладка
+полей — новая VERSION.
+"""
+from __future__ import annotations
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from .schemas import NotificationJob
+
+MAGIC = b"\x00NJ"
+VERSION = 1
+
+_CHANNELS = ("email", "push", "ws", "sms")
+_PRIORITIES = ("normal", "high")
+
+_HEADER = struct.Struct("!3sB16s16sBBBq")
+_INT64 = struct.Struct("!q")
+
+_FLAG_EVENT_ID = 1
+_FLAG_CAMPAIGN_ID = 2
+_FLAG_SEND_AFTER = 4
+_FLAG_EXPIRES_AT = 8
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class JobCodecError(ValueError):
+    """Job не кодируется в бинарный формат или сообщение повреждено."""
+
+
+def is_binary_job(raw_value: bytes) -> bool:
+    return raw_value[:len(MAGIC)] == MAGIC
+
+
+def encode_job(job: NotificationJob) -> bytes:
+    """NotificationJob → bytes. Неизвестный канал/приоритет — JobCodecError."""
+    meta = job.meta
+    flags = 0
+    tail = bytearray()
+
+    if job.send_after is not None:
+        flags |= _FLAG_SEND_AFTER
+        tail += _INT64.pack(_to_micros(job.send_after))
+    if job.expires_at is not None:
+        flags |= _FLAG_EXPIRES_AT
+        tail += _INT64.pack(_to_micros(job.expires_at))
+    if meta.event_id is not None:
+        flags |= _FLAG_EVENT_ID
+        tail += meta.event_id.bytes
+    if meta.campaign_id is not None:
+        flags |= _FLAG_CAMPAIGN_ID
+        tail += meta.campaign_id.bytes
+
+    for text in (job.template_code, job.locale, meta.event_type):
+        _write_str(tail, text.encode("utf-8"))
+    _write_str(
+        tail,
+        json.dumps(
+            job.data,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        ).encode("utf-8"),
+    )
+
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        job.job_id.bytes,
+        job.user_id.bytes,
+        _code(_CHANNELS, "channel", job.channel),
+        _code(_PRIORITIES, "priority", meta.priority),
+        flags,
+        _to_micros(job.created_at),
+    )
+    return header + bytes(tail)
+
+
+def decode_job_binary(raw_value: bytes) -> NotificationJob:
+    """bytes (encode_job) → NotificationJob. Ошибки формата — JobCodecError."""
+    try:
+        return _decode(memoryview(raw_value))
+    except JobCodecError:
+        raise
+    except (struct.error, IndexError, ValueError, OverflowError) as exc:
+        # ValidationError и UnicodeDecodeError — тоже ValueError
+        raise JobCodecError(
+            f"Malformed binary NotificationJob: {exc}") from exc
+
+
+def _decode(buf: memoryview) -> NotificationJob:
+    if len(buf) < _HEADER.size:
+        raise JobCodecError("Binary NotificationJob is truncated")
+    (
+        magic,
+        version,
+        job_id,
+        user_id,
+        channel,
+        priority,
+        flags,
+        created_at,
+    ) = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise JobCodecError("Not a binary NotificationJob")
+    if version != VERSION:
+        raise JobCodecError(f"Unsupported NotificationJob format v{version}")
+
+    pos = _HEADER.size
+    send_after = expires_at = None
+    event_id = campaign_id = None
+    if flags & _FLAG_SEND_AFTER:
+        send_after = _from_micros(_INT64.unpack_from(buf, pos)[0])
+        pos += _INT64.size
+    if flags & _FLAG_EXPIRES_AT:
+        expires_at = _from_micros(_INT64.unpack_from(buf, pos)[0])
+        pos += _INT64.size
+    if flags & _FLAG_EVENT_ID:
+        event_id, pos = _read_uuid(buf, pos)
+    if flags & _FLAG_CAMPAIGN_ID:
+        campaign_id, pos = _read_uuid(buf, pos)
+
+    template_code, pos = _read_str(buf, pos)
+    locale, pos = _read_str(buf, pos)
+    event_type, pos = _read_str(buf, pos)
+    data_json, pos = _read_str(buf, pos)
+    if pos != len(buf):
+        raise JobCodecError("Trailing bytes after binary NotificationJob")
+
+    # Та же валидация, что и у JSON: бинарный путь не должен пропускать
+    # то, что отверг бы model_validate_json
+    return NotificationJob.model_validate({
+        "job_id": UUID(bytes=bytes(job_id)),
+        "user_id": UUID(bytes=bytes(user_id)),
+        "channel": _CHANNELS[channel],
+        "template_code": template_code,
+        "locale": locale,
+        "data": json.loads(data_json),
+        "meta": {
+            "event_type": event_type,
+            "event_id": event_id,
+            "campaign_id": campaign_id,
+            "priority": _PRIORITIES[priority],
+        },
+        "created_at": _from_micros(created_at),
+        "send_after": send_after,
+        "expires_at": expires_at,
+    })
+
+
+def _code(table: tuple[str, ...], field: str, value: object) -> int:
+    try:
+        return table.index(str(value))
+    except ValueError:
+        raise JobCodecError(
+            f"Cannot encode NotificationJob: unknown {field} {value!r}"
+        ) from None
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    seconds = delta.days * 86400 + delta.seconds
+    return seconds * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _write_str(out: bytearray, data: bytes) -> None:
+    length = len(data)
+    while length >= 0x80:
+        out.append((length & 0x7F) | 0x80)
+        length >>= 7
+    out.append(length)
+    out += data
+
+
+def _read_str(buf: memoryview, pos: int) -> tuple[str, int]:
+    length = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        length |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    end = pos + length
+    if end > len(buf):
+        raise JobCodecError("Binary NotificationJob is truncated")
+    return bytes(buf[pos:end]).decode("utf-8"), end
+
+
+def _read_uuid(buf: memoryview, pos: int) -> tuple[UUID, int]:
+    end = pos + 16
+    if end > len(buf):
+        raise JobCodecError("Binary NotificationJob is truncated")
+    return UUID(bytes=bytes(buf[pos:end])), end
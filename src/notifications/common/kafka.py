@@ -10,11 +10,14 @@
 """
 import asyncio
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 from aiokafka import AIOKafkaProducer, errors
+from pydantic import BaseModel
 
 from notifications.common.config import settings
+from notifications.common.job_codec import JobCodecError, encode_job
+from notifications.common.schemas import NotificationJob, NotificationPriority
 
 
 class KafkaNotificationJobPublisher:
@@ -24,9 +27,21 @@ class KafkaNotificationJobPublisher:
     а работает в деградированном режиме: просто логирует отправки.
     """
 
-    def __init__(self, bootstrap_servers: str, topic: str) -> None:
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        topic: str,
+        job_format: str = "json",
+        high_priority_topic: Optional[str] = None,
+    ) -> None:
+        if job_format not in ("json", "binary"):
+            raise ValueError(f"Unknown job format: {job_format}")
         self._bootstrap_servers = bootstrap_servers
         self._topic = topic
+        # "binary" — компактный формат common.job_codec; воркер понимает оба
+        self._job_format = job_format
+        # Задан — job'ы с meta.priority=high уходят в отдельный топик
+        self._high_priority_topic = high_priority_topic
         self._producer: Optional[AIOKafkaProducer] = None
         self._enabled: bool = True  # если старт не удался и мы ушли в dummy
 
@@ -45,8 +60,6 @@ class KafkaNotificationJobPublisher:
         for attempt in range(1, max_attempts + 1):
             producer = AIOKafkaProducer(
                 bootstrap_servers=self._bootstrap_servers,
-                value_serializer=lambda v:
-                json.dumps(v, default=str).encode("utf-8"),
             )
             try:
                 print(
@@ -95,21 +108,78 @@ class KafkaNotificationJobPublisher:
         finally:
             self._producer = None
 
-    async def publish_job(self, payload: Dict[str, Any]) -> None:
+    async def publish_job(
+        self,
+        payload: Union[NotificationJob, Dict[str, Any]],
+    ) -> None:
         if not self._enabled or self._producer is None:
             # Деградирующий режим: просто выводим, что бы отправили
             print(f"[KAFKA DUMMY] Would publish to {self._topic}: {payload}")
             return
 
         try:
-            await self._producer.send_and_wait(self._topic, payload)
+            value = self._serialize(payload)
+            # key — user_id: job'ы одного пользователя попадают в одну
+            # партицию и обрабатываются по порядку
+            await self._producer.send_and_wait(
+                self._topic_for(payload), value, key=self._key_for(payload))
+        except JobCodecError as exc:
+            # Ошибка данных, а не Kafka: job не должен молча пропасть
+            print(f"[KAFKA] Cannot serialize job: {exc}")
+            raise
         except errors.KafkaError as exc:
             print(f"[KAFKA] Failed to publish message: {exc}")
         except Exception as exc:
             print(f"[KAFKA] Unexpected error while publishing: {exc}")
 
+    def _topic_for(
+        self,
+        payload: Union[NotificationJob, Dict[str, Any]],
+    ) -> str:
+        if self._high_priority_topic is None:
+            return self._topic
+        if isinstance(payload, BaseModel):
+            priority = payload.meta.priority
+        else:
+            priority = (payload.get("meta") or {}).get("priority")
+        if priority == NotificationPriority.HIGH:
+            return self._high_priority_topic
+        return self._topic
+
+    @staticmethod
+    def _key_for(
+        payload: Union[NotificationJob, Dict[str, Any]],
+    ) -> Optional[bytes]:
+        if isinstance(payload, BaseModel):
+            user_id = payload.user_id
+        else:
+            user_id = payload.get("user_id")
+        if user_id is None:
+            return None
+        return str(user_id).encode("utf-8")
+
+    def _serialize(
+        self,
+        payload: Union[NotificationJob, Dict[str, Any]],
+    ) -> bytes:
+        # BaseModel, а не NotificationJob: модуль схем бывает импортирован
+        # и как notifications.*, и как src.notifications.*
+        if self._job_format == "binary":
+            if not isinstance(payload, BaseModel):
+                payload = NotificationJob.model_validate(payload)
+            return encode_job(payload)
+
+        if isinstance(payload, BaseModel):
+            return payload.model_dump_json().encode("utf-8")
+        return json.dumps(payload, default=str).encode("utf-8")
+
 
 kafka_publisher = KafkaNotificationJobPublisher(
     bootstrap_servers=settings.kafka_bootstrap_servers,
     topic=settings.kafka_outbox_topic,  # лучше использовать общий конфиг
+    job_format=settings.kafka_job_format,
+    high_priority_topic=(
+        settings.kafka_high_priority_topic
+        if settings.priority_lanes_enabled else None
+    ),
 )
@@ -2,6 +2,7 @@ from enum import StrEnum
 
 
 class NotificationStatus(StrEnum):
+    IN_PROGRESS = "IN_PROGRESS"  # job захвачен воркером (claim)
     SENT = "SENT"
     FAILED = "FAILED"
     RETRYING = "RETRYING"
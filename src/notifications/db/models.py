@@ -21,6 +21,7 @@ class Base(DeclarativeBase):
 
 
 class DeliveryStatus(str, Enum):
+    IN_PROGRESS = "IN_PROGRESS"
     SENT = "SENT"
     FAILED = "FAILED"
     RETRYING = "RETRYING"
@@ -141,4 +142,32 @@ class Campaign(Base):
     )
     max_runs: Mapped[int | None] = mapped_column(
         Integer,
-    )
\ No newline at end of file
+    )
+
+
+class DelayedJob(Base):
+    """Job'ы с далёким send_after, припаркованные воркером."""
+
+    __tablename__ = "delayed_jobs"
+
+    job_id: Mapped[UUID] = mapped_column(
+        PGUUID(as_uuid=True),
+        primary_key=True,
+    )
+    due_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        index=True,
+    )
+    # NotificationJob в JSON — как в Kafka
+    payload: Mapped[str] = mapped_column(Text)
+    # Аренда воркером: job у него в timer wheel. NULL или в прошлом —
+    # строку может забрать любой воркер
+    claimed_until: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
@@ -55,7 +55,7 @@ async def wait_for_kafka(
 
 
 async def create_topics() -> None:
-    """Создать notifications.outbox и notifications.dlq, если их ещё нет."""
+    """Создать outbox (обычный и high), dlq и retry-топики, если их ещё нет."""
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
@@ -77,30 +77,33 @@ async def create_topics() -> None:
         existing: List[str] = list(await admin.list_topics())
         logger.info("Existing topics: %s", existing)
 
-        topics_to_create: list[NewTopic] = []
-        if settings.kafka_outbox_topic not in existing:
-            topics_to_create.append(
-                NewTopic(
-                    name=settings.kafka_outbox_topic,
-                    num_partitions=1,
-                    replication_factor=1,
-                )
-            )
-        if settings.kafka_dlq_topic not in existing:
-            topics_to_create.append(
-                NewTopic(
-                    name=settings.kafka_dlq_topic,
-                    num_partitions=1,
-                    replication_factor=1,
-                )
+        # Топики, которые читает воркер, делятся между его процессами
+        # по партициям; DLQ никто не читает — ему хватит одной
+        partitions = {
+            settings.kafka_outbox_topic: settings.kafka_topic_partitions,
+            settings.kafka_high_priority_topic:
+                settings.kafka_topic_partitions,
+            settings.kafka_dlq_topic: 1,
+            **{
+                topic: settings.kafka_topic_partitions
+                for topic in settings.retry_topics
+            },
+        }
+        wanted = list(partitions)
+        topics_to_create: list[NewTopic] = [
+            NewTopic(
+                name=name,
+                num_partitions=partitions[name],
+                replication_factor=1,
             )
+            for name in wanted
+            if name not in existing
+        ]
 
         if not topics_to_create:
             logger.info(
-                "Topics already exist, nothing to create "
-                "(outbox=%s, dlq=%s)",
-                settings.kafka_outbox_topic,
-                settings.kafka_dlq_topic,
+                "Topics already exist, nothing to create (%s)",
+                wanted,
             )
             return
 
@@ -1,9 +1,11 @@
 from collections.abc import Sequence 
+import json
 from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from notifications.common.config import settings
 from notifications.common.schemas import NotificationChannel
 from notifications.notifications_api.schemas.template import (
     TemplateCreate,
@@ -62,6 +64,7 @@ class TemplateRepository:
             body=data.body,
         )
         self._session.add(tpl)
+        await self._notify_changed(tpl)
         await self._session.commit()
         await self._session.refresh(tpl)
         return tpl
@@ -76,6 +79,22 @@ class TemplateRepository:
         if data.body is not None:
             template.body = data.body
 
+        await self._notify_changed(template)
         await self._session.commit()
         await self._session.refresh(template)
-        return template
\ No newline at end of file
+        return template
+
+    async def _notify_changed(self, template: Template) -> None:
+        """pg_notify в текущей транзакции: воркеры сбросят кеш шаблона.
+
+        Postgres доставляет NOTIFY только после commit, так что воркер
+        не прочитает старую версию после уведомления.
+        """
+        payload = json.dumps({
+            "template_code": template.template_code,
+            "locale": template.locale,
+            "channel": template.channel,
+        })
+        await self._session.execute(
+            select(func.pg_notify(settings.templates_notify_channel, payload))
+        )
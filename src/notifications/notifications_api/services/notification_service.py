@@ -41,8 +41,8 @@ class NotificationService:
         jobs = self._map_event_to_jobs(event)
 
         for job in jobs:
-            # Pydantic v2: можно использовать model_dump(), dict() тоже ок
-            await self._job_publisher.publish_job(job.model_dump(mode="json"))
+            # Сериализацию (JSON или бинарный формат) выбирает publisher
+            await self._job_publisher.publish_job(job)
 
         return len(jobs)
 
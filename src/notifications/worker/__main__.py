@@ -0,0 +1,53 @@
+"""python -m notifications.worker [--processes N]
+
+--processes 1 (по умолчанию WORKER_PROCESSES) — воркер в текущем
+процессе, как notifications.worker.main. Больше одного — супервизор
+с N дочерними процессами в одной consumer group.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+
+from src.notifications.worker.core.config import settings
+from src.notifications.worker.core.logger import configure_logging
+
+from .main import main as run_single, run_worker_process
+from .supervisor import WorkerSupervisor
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m notifications.worker")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.worker_processes,
+        help="number of worker processes (default: WORKER_PROCESSES)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.processes <= 1:
+        run_single()
+        return 0
+
+    configure_logging()
+    supervisor = WorkerSupervisor(
+        args.processes,
+        run_worker_process,
+        shutdown_timeout_seconds=settings.worker_shutdown_timeout_seconds,
+        metrics_address=(
+            (settings.metrics_host, settings.metrics_port)
+            if settings.metrics_enabled else None
+        ),
+    )
+    return supervisor.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
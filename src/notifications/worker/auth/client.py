@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, replace
+from typing import Iterable
 from uuid import UUID
 import logging
 
 import httpx
 
+from ..core.cache import MISSING, TTLCache
 from src.notifications.common.config import Settings  # или откуда у тебя берётся Settings
 
 logger = logging.getLogger(__name__)
@@ -28,17 +31,117 @@ class AuthClient:
       - подменяется на FakeAuthClient через фикстуры.
     """
 
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        http_client: httpx.AsyncClient | None = None,
+    ) -> None:
         self._settings = settings
+        # Долгоживущий клиент с keep-alive: соединения к Auth
+        # переиспользуются между job'ами. Чужой клиент не закрываем.
+        self._owns_client = http_client is None
+        self._http = http_client or httpx.AsyncClient(
+            timeout=settings.auth_http_timeout_seconds)
 
-    async def get_user_contacts(self, user_id: UUID) -> UserContacts:
+        # Кеш контактов: в кампаниях один user_id приходит много раз.
+        # Fallback-контакты (Auth недоступен) не кешируем, ws_session_id
+        # живёт секунды — в кеш он не попадает (см. get_user_contacts).
+        self._cache: TTLCache[UUID, UserContacts] | None = None
+        if settings.auth_contacts_cache_enabled:
+            self._cache = TTLCache(
+                max_size=settings.auth_contacts_cache_max_size,
+                ttl_seconds=settings.auth_contacts_cache_ttl_seconds,
+            )
+        # single-flight: параллельные запросы одного user_id ждут
+        # один и тот же HTTP-запрос
+        self._inflight: dict[UUID, asyncio.Task[UserContacts]] = {}
+        self.coalesced = 0
+        # Сбрасывается, если Auth ответил, что bulk-эндпоинта нет
+        self._bulk_supported = True
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._http.aclose()
+
+    async def get_user_contacts(
+        self,
+        user_id: UUID,
+        *,
+        fresh: bool = False,
+    ) -> UserContacts:
+        """Контакты пользователя.
+
+        Из кеша приходят контакты без ws_session_id: WebSocket-сессия
+        короткоживущая. fresh=True — мимо кеша, с актуальным
+        ws_session_id (нужно для канала ws).
+        """
+        if self._cache is not None and not fresh:
+            cached = self._cache.get(user_id)
+            if cached is not MISSING:
+                return cached
+
+        task = self._inflight.get(user_id)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._load_contacts(user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(
+                lambda _t: self._inflight.pop(user_id, None))
+        # shield: отмена одного ожидающего не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    async def get_many_user_contacts(
+        self,
+        user_ids: Iterable[UUID],
+    ) -> dict[UUID, UserContacts]:
+        """Контакты для пачки пользователей через bulk-эндпоинт Auth.
+
+        POST {auth_base_url}/api/v1/users/bulk {"user_ids": [...]} →
+        {"users": [{"user_id": ..., "email": ..., ...}]}, не больше
+        auth_bulk_max_ids id за запрос. Уже закешированные не запрашиваем.
+        Если Auth не знает bulk-эндпоинт (404/405) — дальше ходим
+        только по одному; прочие ошибки и пропавшие из ответа id
+        добираются поштучно через get_user_contacts().
+        """
+        result: dict[UUID, UserContacts] = {}
+        to_fetch: list[UUID] = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = (
+                MISSING if self._cache is None else self._cache.get(user_id))
+            if cached is MISSING:
+                to_fetch.append(user_id)
+            else:
+                result[user_id] = cached
+
+        chunk_size = self._settings.auth_bulk_max_ids
+        for start in range(0, len(to_fetch), chunk_size):
+            chunk = to_fetch[start:start + chunk_size]
+            if self._bulk_supported:
+                result.update(await self._load_contacts_bulk(chunk))
+            rest = [user_id for user_id in chunk if user_id not in result]
+            if rest:
+                fetched = await asyncio.gather(
+                    *(self.get_user_contacts(user_id) for user_id in rest))
+                result.update(zip(rest, fetched))
+        return result
+
+    def stats(self) -> dict[str, float]:
+        stats: dict[str, float] = {
+            "in_flight": len(self._inflight),
+            "coalesced": self.coalesced,
+        }
+        if self._cache is not None:
+            stats.update(self._cache.stats())
+        return stats
+
+    async def _load_contacts(self, user_id: UUID) -> UserContacts:
         url = f"{self._settings.auth_base_url}/api/v1/users/{user_id}"
 
         try:
-            async with httpx.AsyncClient(timeout=2.0) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await self._http.get(url)
+            resp.raise_for_status()
+            data = resp.json()
         except Exception as exc:
             # Fallback, чтобы не ломать воркер, если Auth недоступен.
             logger.warning(
@@ -49,6 +152,54 @@ class AuthClient:
             )
             return self._fake_contacts(user_id)
 
+        contacts = self._contacts_from_json(user_id, data)
+        self._cache_contacts(contacts)
+        return contacts
+
+    async def _load_contacts_bulk(
+        self,
+        user_ids: list[UUID],
+    ) -> dict[UUID, UserContacts]:
+        url = f"{self._settings.auth_base_url}/api/v1/users/bulk"
+
+        try:
+            resp = await self._http.post(
+                url, json={"user_ids": [str(user_id) for user_id in user_ids]})
+            if resp.status_code in (404, 405):
+                logger.warning(
+                    "AuthClient: bulk endpoint %s is not available (%s),"
+                    " using per-user lookups",
+                    url,
+                    resp.status_code,
+                )
+                self._bulk_supported = False
+                return {}
+            resp.raise_for_status()
+            users = resp.json()["users"]
+        except Exception as exc:
+            logger.warning(
+                "AuthClient: bulk fetch of %s users from %s failed: %s",
+                len(user_ids),
+                url,
+                exc,
+            )
+            return {}
+
+        result: dict[UUID, UserContacts] = {}
+        for data in users:
+            contacts = self._contacts_from_json(
+                UUID(str(data["user_id"])), data)
+            self._cache_contacts(contacts)
+            result[contacts.user_id] = contacts
+        return result
+
+    def _cache_contacts(self, contacts: UserContacts) -> None:
+        if self._cache is not None:
+            self._cache.set(
+                contacts.user_id, replace(contacts, ws_session_id=None))
+
+    @staticmethod
+    def _contacts_from_json(user_id: UUID, data: dict) -> UserContacts:
         return UserContacts(
             user_id=user_id,
             email=data.get("email"),
@@ -1,3 +1,4 @@
+from .dispatcher import KeyedDispatcher
 from .kafka_consumer import KafkaNotificationConsumer
 
-__all__ = ["KafkaNotificationConsumer"]
+__all__ = ["KafkaNotificationConsumer", "KeyedDispatcher"]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from pydantic import ValidationError
+
+from src.notifications.common.job_codec import (
+    JobCodecError,
+    decode_job_binary,
+    is_binary_job,
+)
+from src.notifications.common.schemas import NotificationJob
+
+INVALID_JSON = "Invalid JSON in Kafka message"
+INVALID_PAYLOAD = "Invalid NotificationJob payload"
+INVALID_BINARY = "Invalid binary NotificationJob payload"
+
+
+class JobDecodeError(Exception):
+    """Сообщение из Kafka не удалось превратить в NotificationJob.
+
+    reason — текст для error_message в DLQ (INVALID_JSON / INVALID_PAYLOAD
+    / INVALID_BINARY).
+    """
+
+    def __init__(self, reason: str, cause: Exception) -> None:
+        super().__init__(f"{reason}: {cause}")
+        self.reason = reason
+
+
+def decode_job(raw_value: bytes, *, fast: bool = False) -> NotificationJob:
+    """bytes → NotificationJob.
+
+    fast=True — model_validate_json: pydantic разбирает JSON и валидирует
+    модель за один проход прямо из bytes, без промежуточных str и dict.
+    fast=False (по умолчанию) — decode → json.loads → model_validate.
+    Бинарный формат (common.job_codec) определяется по MAGIC-префиксу
+    независимо от fast.
+    """
+    if is_binary_job(raw_value):
+        try:
+            return decode_job_binary(raw_value)
+        except JobCodecError as exc:
+            raise JobDecodeError(INVALID_BINARY, exc) from exc
+
+    if fast:
+        try:
+            return NotificationJob.model_validate_json(raw_value)
+        except ValidationError as exc:
+            # Ошибка разбора JSON тоже приходит как ValidationError
+            if any(err["type"] == "json_invalid" for err in exc.errors()):
+                raise JobDecodeError(INVALID_JSON, exc) from exc
+            raise JobDecodeError(INVALID_PAYLOAD, exc) from exc
+
+    try:
+        payload: Any = json.loads(raw_value.decode("utf-8"))
+    except Exception as exc:
+        raise JobDecodeError(INVALID_JSON, exc) from exc
+
+    try:
+        return NotificationJob.model_validate(payload)
+    except Exception as exc:
+        raise JobDecodeError(INVALID_PAYLOAD, exc) from exc
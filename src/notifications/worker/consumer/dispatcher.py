@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import (
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    Hashable,
+    Mapping,
+)
+
+logger = logging.getLogger(__name__)
+
+JobFn = Callable[[], Awaitable[None]]
+# Допуск задачи до слота, например ChannelLimiter.slot канала job'а
+AdmissionFn = Callable[[], AsyncContextManager[None]]
+
+DEFAULT_LANE = "normal"
+
+
+class KeyedDispatcher:
+    """Конкурентное выполнение задач с сохранением порядка внутри ключа.
+
+    - одновременно выполняется не больше max_in_flight задач;
+    - задачи с одним ключом (например, user_id) выполняются строго
+      в порядке submit — следующая стартует после завершения предыдущей;
+    - задачи с разными ключами идут параллельно.
+
+    Слот берёт только job, стоящая первой в очереди своего ключа:
+    job'ы, ждущие предыдущую job'у того же ключа, слотов не занимают
+    и не мешают другим ключам.
+
+    admission — допуск до слота (лимиты канала): задача проходит его,
+    ещё не заняв слот, поэтому job'ы, ждущие токен своего канала, не
+    отнимают слоты у других каналов. Допуск держится до конца задачи.
+
+    Ожидающие (очередь ключа или допуск) занимают место в «комнате»
+    своей пары (lane, admission), в каждой — не больше max_queued.
+    Кампания, упёршаяся в лимит email, заполняет только свою комнату:
+    push, ws и другие полосы ставятся дальше.
+
+    submit() ждёт свободный слот (или место в комнате), поэтому
+    consumer-цикл естественно притормаживает при перегрузке (backpressure).
+
+    Слоты делятся между «полосами» (lane) по весам: если свободный
+    слот ждут несколько полос, при весах {"high": 4, "normal": 1}
+    на 4 job'а high приходится 1 job normal. Поток normal не может
+    занять все слоты надолго, а простаивающая полоса свою долю не держит.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        lane_weights: Mapping[str, int] | None = None,
+        max_queued: int | None = None,
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+        if max_queued is not None and max_queued < 1:
+            raise ValueError("max_queued must be >= 1")
+        weights = dict(lane_weights or {DEFAULT_LANE: 1})
+        if any(weight < 1 for weight in weights.values()):
+            raise ValueError("lane weights must be >= 1")
+        self._max_in_flight = max_in_flight
+        self._free_slots = max_in_flight
+        # Сначала полосы с большим весом
+        self._weights = dict(
+            sorted(weights.items(), key=lambda item: -item[1]))
+        self._credits = dict(self._weights)
+        self._waiters: dict[str, deque[asyncio.Future]] = {
+            lane: deque() for lane in self._weights
+        }
+        # ключ → последняя поставленная задача этого ключа
+        self._tails: dict[Hashable, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+        # задачи, держащие слот / место в очереди своего ключа
+        self._slot_holders: set[asyncio.Task] = set()
+        # задача → семафор комнаты, где она ждёт
+        self._room_holders: dict[asyncio.Task, asyncio.Semaphore] = {}
+        self._max_queued = max_queued or max_in_flight
+        self._rooms: dict[
+            tuple[str, AdmissionFn | None], asyncio.Semaphore] = {}
+
+        self.completed = 0
+
+    @property
+    def max_in_flight(self) -> int:
+        return self._max_in_flight
+
+    @property
+    def in_flight(self) -> int:
+        """Поставленные и ещё не завершённые задачи (включая ждущие ключ)."""
+        return len(self._tasks)
+
+    @property
+    def running(self) -> int:
+        """Задачи, занимающие слот."""
+        return len(self._slot_holders)
+
+    def waiting(self, lane: str = DEFAULT_LANE) -> int:
+        return sum(not fut.done() for fut in self._waiters[lane])
+
+    def stats(self) -> dict[str, float]:
+        stats: dict[str, float] = {
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "queued_by_key": len(self._room_holders),
+            "max_in_flight": self._max_in_flight,
+            "completed": self.completed,
+        }
+        for lane in self._waiters:
+            stats[f"waiting_{lane}"] = self.waiting(lane)
+        return stats
+
+    async def submit(
+        self,
+        key: Hashable,
+        fn: JobFn,
+        lane: str = DEFAULT_LANE,
+        admission: AdmissionFn | None = None,
+    ) -> asyncio.Task:
+        """Поставить задачу в очередь ключа.
+
+        Первая задача ключа ждёт свободный слот прямо здесь; остальные —
+        место в очереди ключа, а слот берут, когда дойдёт их очередь.
+        """
+        previous = self._tails.get(key)
+        if admission is None and (previous is None or previous.done()):
+            await self._acquire_slot(lane)
+            room = None
+        else:
+            room = self._rooms.get((lane, admission))
+            if room is None:
+                room = self._rooms[(lane, admission)] = asyncio.Semaphore(
+                    self._max_queued)
+            await room.acquire()
+
+        # Пока ждали, ключ мог получить новую задачу
+        previous = self._tails.get(key)
+        task = asyncio.create_task(
+            self._run(key, previous, fn, lane, admission))
+        if room is None:
+            self._slot_holders.add(task)
+        else:
+            self._room_holders[task] = room
+        self._tails[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    async def drain(self) -> None:
+        """Дождаться завершения всех уже поставленных задач."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _run(
+        self,
+        key: Hashable,
+        previous: asyncio.Task | None,
+        fn: JobFn,
+        lane: str,
+        admission: AdmissionFn | None,
+    ) -> None:
+        task = asyncio.current_task()
+        try:
+            async with AsyncExitStack() as stack:
+                try:
+                    if previous is not None and not previous.done():
+                        # Ошибка предыдущей задачи не должна ломать
+                        # цепочку ключа
+                        await asyncio.wait([previous])
+                    if admission is not None:
+                        await stack.enter_async_context(admission())
+                finally:
+                    room = self._room_holders.pop(task, None)
+                    if room is not None:
+                        room.release()
+                if task not in self._slot_holders:
+                    # Дошла очередь ключа и есть допуск — нужен слот
+                    await self._acquire_slot(lane)
+                    self._slot_holders.add(task)
+                await fn()
+        finally:
+            if self._tails.get(key) is asyncio.current_task():
+                del self._tails[key]
+
+    async def _acquire_slot(self, lane: str) -> None:
+        if lane not in self._waiters:
+            raise ValueError(f"Unknown dispatcher lane: {lane}")
+        if self._free_slots > 0 and not any(
+            self.waiting(name) for name in self._waiters
+        ):
+            self._free_slots -= 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Слот уже выдан, но забрать его некому — отдаём дальше
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        lane = self._next_lane()
+        if lane is None:
+            self._free_slots += 1
+            return
+        self._waiters[lane].popleft().set_result(None)
+
+    def _next_lane(self) -> str | None:
+        """Взвешенный round-robin по полосам, где кто-то ждёт слот."""
+        for waiters in self._waiters.values():
+            while waiters and waiters[0].done():
+                waiters.popleft()
+        ready = [lane for lane, waiters in self._waiters.items() if waiters]
+        if not ready:
+            return None
+        if all(self._credits[lane] == 0 for lane in ready):
+            self._credits = dict(self._weights)
+        for lane in ready:
+            if self._credits[lane] > 0:
+                self._credits[lane] -= 1
+                return lane
+        return None
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        room = self._room_holders.pop(task, None)
+        if room is not None:
+            # отменена, не дождавшись очереди ключа
+            room.release()
+        if task in self._slot_holders:
+            self._slot_holders.discard(task)
+            self._release_slot()
+        self.completed += 1
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.error(
+                "Dispatched task failed: %s",
+                exc,
+                exc_info=(type(exc), exc, exc.__traceback__),
+            )
@@ -1,71 +1,332 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
 import logging
-from typing import Any
+import time
+from typing import Any, Awaitable, Callable, Mapping, Sequence
 
-from aiokafka import AIOKafkaConsumer
+from aiokafka import (
+    AIOKafkaConsumer,
+    ConsumerRebalanceListener,
+    ConsumerRecord,
+    TopicPartition,
+)
 from aiokafka.errors import KafkaError
 
+from ..core.metrics import (
+    CONSUMER_LAG,
+    DECODE_ERRORS_TOTAL,
+    JOB_SECONDS,
+    JOBS_TOTAL,
+    track_stage,
+)
 from ..dlq import DlqPublisher
 from src.notifications.common.schemas import NotificationJob
 from src.notifications.common.config import Settings
 from ..processor import JobProcessor
+from ..retry import RETRY_ATTEMPTS_HEADER, RETRY_NOT_BEFORE_HEADER
+from .decoding import JobDecodeError, decode_job
+from .dispatcher import DEFAULT_LANE, AdmissionFn, KeyedDispatcher
+from .offsets import OffsetTracker
 
 logger = logging.getLogger(__name__)
 
 
 class KafkaNotificationConsumer:
-    """Читает NotificationJob из Kafka и передаёт их в JobProcessor."""
+    """Читает NotificationJob из Kafka и передаёт их в JobProcessor.
+
+    По умолчанию читает outbox-топик. Для retry-топиков создаётся
+    отдельный экземпляр с delay_aware=True: он не отдаёт сообщение
+    в обработку раньше момента из заголовка x-retry-not-before-ms.
+    """
 
     def __init__(
         self,
         settings: Settings,
         processor: JobProcessor,
         dlq_publisher: DlqPublisher,
+        *,
+        topics: Sequence[str] | None = None,
+        group_id: str | None = None,
+        delay_aware: bool = False,
+        dispatcher: KeyedDispatcher | None = None,
+        before_commit: Callable[[], Awaitable[None]] | None = None,
+        lane: str = DEFAULT_LANE,
+        admission: Mapping[str, AdmissionFn] | None = None,
     ) -> None:
         self._settings = settings
         self._processor = processor
         self._dlq = dlq_publisher
+        self._topics = list(topics or [settings.kafka_outbox_topic])
+        self._group_id = group_id or settings.kafka_consumer_group
+        self._delay_aware = delay_aware
         self._consumer: AIOKafkaConsumer | None = None
         self._stopped = asyncio.Event()
+        # Параллелим job'ы разных пользователей, порядок в рамках user_id
+        # сохраняется. Dispatcher может быть общим для нескольких consumer'ов.
+        self._dispatcher = dispatcher or KeyedDispatcher(
+            settings.worker_max_in_flight)
+        # Полоса приоритета в dispatcher'е (см. KeyedDispatcher)
+        self._lane = lane
+        # канал → допуск до слота dispatcher'а (лимиты канала)
+        self._admission = dict(admission or {})
+        self._offsets = OffsetTracker()
+        # Незавершённые job'ы этого consumer'а по партициям: при revoke
+        # ждём только их, а не весь (возможно, общий) dispatcher
+        self._tasks_by_tp: dict[TopicPartition, set[asyncio.Task]] = {}
+        # Например, flush write-behind статусов: offset коммитим только
+        # после того, как результат обработки записан
+        self._before_commit = before_commit
 
     async def start(self) -> None:
+        batch_mode = self._settings.kafka_batch_mode
+        # В batch-режиме коммитим сами и только завершённые job'ы
         self._consumer = AIOKafkaConsumer(
-            self._settings.kafka_outbox_topic,
             bootstrap_servers=self._settings.kafka_bootstrap_servers,
-            group_id=self._settings.kafka_consumer_group,
-            enable_auto_commit=True,
+            group_id=self._group_id,
+            enable_auto_commit=not batch_mode,
             value_deserializer=lambda v: v,
         )
+        self._consumer.subscribe(
+            self._topics,
+            listener=_RebalanceListener(self),
+        )
 
         await self._consumer.start()
         logger.info(
-            "Kafka consumer started: topic=%s group=%s bootstrap_servers=%s",
-            self._settings.kafka_outbox_topic,
-            self._settings.kafka_consumer_group,
+            "Kafka consumer started: topics=%s group=%s bootstrap_servers=%s",
+            self._topics,
+            self._group_id,
             self._settings.kafka_bootstrap_servers,
         )
+        logger.info(
+            "Job dispatcher: max_in_flight=%s batch_mode=%s lane=%s",
+            self._dispatcher.max_in_flight,
+            batch_mode,
+            self._lane,
+        )
 
         try:
-            async for msg in self._consumer:
-                if self._stopped.is_set():
-                    logger.info("Stop flag set, breaking consumer loop")
-                    break
-                await self._handle_message(msg.value)
+            if batch_mode:
+                await self._consume_batches()
+            else:
+                await self._consume_one_by_one()
         except asyncio.CancelledError:
             logger.info("Kafka consumer cancelled")
             raise
         except KafkaError as err:
             logger.exception("Kafka error in consumer loop: %s", err)
         finally:
+            await self._drain()
+            await self._commit_completed()
             await self._stop_consumer()
 
+    async def _consume_one_by_one(self) -> None:
+        async for msg in self._consumer:
+            if self._stopped.is_set():
+                logger.info("Stop flag set, breaking consumer loop")
+                break
+            self._update_lag(
+                TopicPartition(msg.topic, msg.partition), msg.offset + 1)
+            await self._dispatch_message(msg.value, msg.headers)
+
+    async def _consume_batches(self) -> None:
+        """getmany() → весь батч в обработку → коммит готового префикса."""
+        while not self._stopped.is_set():
+            batch = await self._consumer.getmany(
+                timeout_ms=self._settings.kafka_batch_timeout_ms,
+                max_records=self._settings.kafka_batch_max_records,
+            )
+            if batch:
+                await self._handle_batch(batch)
+            await self._commit_completed()
+        logger.info("Stop flag set, breaking consumer loop")
+
+    async def submit_job(self, job: NotificationJob) -> asyncio.Task:
+        """Поставить уже декодированный job в общий dispatcher.
+
+        Используется, например, отложенной доставкой, когда подошёл срок.
+        Возвращает задачу обработки job'а.
+        """
+        return await self._submit(job)
+
     async def stop(self) -> None:
         self._stopped.set()
         await self._stop_consumer()
 
+    async def _handle_batch(
+        self,
+        batch: dict[TopicPartition, list[ConsumerRecord]],
+    ) -> None:
+        """Декодирует весь батч и раздаёт job'ы в dispatcher.
+
+        Offset записи считается завершённым, когда её job обработан
+        (или сообщение ушло в DLQ как невалидное).
+        """
+        decoded: list[
+            tuple[TopicPartition, int, NotificationJob, int, float | None]
+        ] = []
+        for tp, records in batch.items():
+            if records:
+                self._update_lag(tp, records[-1].offset + 1)
+            for record in records:
+                self._offsets.track(tp, record.offset)
+                job = await self._decode_job(record.value)
+                if job is None:
+                    self._offsets.complete(tp, record.offset)
+                    continue
+                attempts, not_before = _retry_headers(
+                    getattr(record, "headers", ()))
+                decoded.append(
+                    (tp, record.offset, job, attempts, not_before))
+
+        jobs = [job for _, _, job, _, _ in decoded]
+        existing_by_job, _ = await asyncio.gather(
+            self._load_existing(jobs),
+            self._prefetch_contacts(jobs),
+        )
+        seen: set = set()
+
+        for tp, offset, job, attempts, not_before in decoded:
+            kwargs: dict[str, Any] = {"previous_attempts": attempts}
+            # Дубликат job_id в том же батче: его запись изменит обработка
+            # первого экземпляра, поэтому пусть второй читает её сам
+            if existing_by_job is not None and job.job_id not in seen:
+                kwargs["existing"] = existing_by_job.get(job.job_id)
+            seen.add(job.job_id)
+
+            await self._wait_not_before(not_before)
+            task = await self._dispatcher.submit(
+                job.user_id,
+                functools.partial(self._process_job, job, **kwargs),
+                lane=self._lane,
+                admission=self._admission_for(job),
+            )
+            self._tasks_by_tp.setdefault(tp, set()).add(task)
+            task.add_done_callback(
+                functools.partial(self._on_job_done, tp, offset))
+
+    async def _load_existing(
+        self,
+        jobs: list[NotificationJob],
+    ) -> dict | None:
+        """Idempotency-lookup для всего батча одним запросом.
+
+        None — загрузить не удалось, каждый job прочитает запись сам.
+        """
+        if not jobs:
+            return None
+        try:
+            return await self._processor.load_existing(jobs)
+        except Exception:
+            logger.exception(
+                "Batch idempotency lookup failed for %s jobs, "
+                "falling back to per-job lookups",
+                len(jobs),
+            )
+            return None
+
+    async def _prefetch_contacts(self, jobs: list[NotificationJob]) -> None:
+        """Контакты всех получателей батча — bulk-запросом в Auth."""
+        if not jobs:
+            return
+        try:
+            await self._processor.prefetch_contacts(jobs)
+        except Exception:
+            logger.exception(
+                "Contacts prefetch failed for %s jobs, "
+                "falling back to per-job lookups",
+                len(jobs),
+            )
+
+    def _on_job_done(
+        self,
+        tp: TopicPartition,
+        offset: int,
+        task: asyncio.Task,
+    ) -> None:
+        # _process_job сам отправляет упавшие job'ы в DLQ, поэтому offset
+        # считается обработанным в любом случае
+        self._offsets.complete(tp, offset)
+        tasks = self._tasks_by_tp.get(tp)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks_by_tp[tp]
+
+    async def _commit_completed(self) -> None:
+        if self._consumer is None or not self._settings.kafka_batch_mode:
+            return
+        offsets = self._offsets.committable()
+        if not offsets:
+            return
+        if self._before_commit is not None:
+            try:
+                await self._before_commit()
+            except Exception:
+                # offset'ы остаются в трекере: коммит повторится, когда
+                # хук пройдёт (например, DLQ дошлёт сообщения)
+                logger.exception(
+                    "Pre-commit hook failed, not committing %s", offsets)
+                return
+        try:
+            await self._consumer.commit(offsets)
+        except KafkaError as err:
+            logger.warning("Failed to commit offsets %s: %s", offsets, err)
+            return
+        self._offsets.mark_committed(offsets)
+
+    async def _on_partitions_revoked(
+        self,
+        revoked: set[TopicPartition],
+    ) -> None:
+        """Перед ребалансировкой доделываем job'ы отзываемых партиций.
+
+        Ждём только свои job'ы из revoked: dispatcher общий, и job'ы
+        других consumer'ов (или других партиций) ребалансировку не держат.
+        """
+        for tp in revoked:
+            # Серию не удаляем — в multiprocess-режиме это не работает;
+            # новый владелец партиции пишет свой lag, сумма верна
+            CONSUMER_LAG.labels(
+                group=self._group_id, topic=tp.topic, partition=tp.partition,
+            ).set(0)
+        if not self._settings.kafka_batch_mode:
+            return
+        pending = set().union(
+            *(self._tasks_by_tp.get(tp, ()) for tp in revoked))
+        if pending:
+            logger.info(
+                "Waiting for %s jobs of revoked partitions %s...",
+                len(pending),
+                sorted(revoked),
+            )
+            await asyncio.wait(pending)
+        await self._commit_completed()
+        self._offsets.forget(revoked)
+
+    def _update_lag(self, tp: TopicPartition, next_offset: int) -> None:
+        """Lag партиции: high watermark из последнего fetch'а минус позиция."""
+        if self._consumer is None:
+            return
+        highwater = self._consumer.highwater(tp)
+        if not isinstance(highwater, int):
+            return
+        CONSUMER_LAG.labels(
+            group=self._group_id,
+            topic=tp.topic,
+            partition=tp.partition,
+        ).set(max(highwater - next_offset, 0))
+
+    async def _drain(self) -> None:
+        if self._dispatcher.in_flight:
+            logger.info(
+                "Waiting for %s in-flight jobs to finish...",
+                self._dispatcher.in_flight,
+            )
+        await self._dispatcher.drain()
+
     async def _stop_consumer(self) -> None:
         if self._consumer is not None:
             logger.info("Stopping Kafka consumer...")
@@ -73,27 +334,67 @@ class KafkaNotificationConsumer:
             logger.info("Kafka consumer stopped")
             self._consumer = None
 
+    async def _dispatch_message(
+        self,
+        raw_value: bytes,
+        headers: Sequence[tuple[str, bytes]] = (),
+    ) -> None:
+        """Декодирует сообщение и ставит job в dispatcher (ключ — user_id)."""
+        job = await self._decode_job(raw_value)
+        if job is None:
+            return
+        attempts, not_before = _retry_headers(headers)
+        await self._wait_not_before(not_before)
+        await self._submit(job, previous_attempts=attempts)
+
+    async def _submit(
+        self,
+        job: NotificationJob,
+        previous_attempts: int = 0,
+    ) -> asyncio.Task:
+        return await self._dispatcher.submit(
+            job.user_id,
+            functools.partial(self._process_job, job, previous_attempts),
+            lane=self._lane,
+            admission=self._admission_for(job),
+        )
+
+    def _admission_for(self, job: NotificationJob) -> AdmissionFn | None:
+        if not self._admission:
+            return None
+        return self._admission.get(getattr(job.channel, "value", job.channel))
+
+    async def _wait_not_before(self, not_before: float | None) -> None:
+        """Retry-топик: ждём, пока наступит момент повторной попытки.
+
+        Все сообщения одного retry-топика имеют одинаковую задержку,
+        поэтому ожидание головы очереди не задерживает остальных дольше,
+        чем им и так положено.
+        """
+        if not self._delay_aware or not_before is None:
+            return
+        delay = not_before - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
     async def _handle_message(self, raw_value: bytes) -> None:
-        # 1. JSON-десериализация
-        try:
-            payload: Any = json.loads(raw_value.decode("utf-8"))
-        except Exception as exc:
-            logger.exception("Failed to decode message from Kafka: %s", exc)
-            await self._dlq.publish_raw(
-                raw_value,
-                error_message="Invalid JSON in Kafka message")
+        """Последовательная обработка одного сообщения (decode + job)."""
+        job = await self._decode_job(raw_value)
+        if job is None:
             return
+        await self._process_job(job)
 
-        # 2. Валидация NotificationJob
+    async def _decode_job(self, raw_value: bytes) -> NotificationJob | None:
+        """JSON → NotificationJob. Невалидные сообщения уходят в DLQ."""
         try:
-            job = NotificationJob.model_validate(payload)
-        except Exception as exc:
-            logger.exception("Failed to validate NotificationJob payload: %s",
-                             exc)
-            await self._dlq.publish_raw(
-                raw_value,
-                error_message="Invalid NotificationJob payload")
-            return
+            with track_stage("decode"):
+                job = decode_job(
+                    raw_value, fast=self._settings.kafka_fast_decode)
+        except JobDecodeError as exc:
+            DECODE_ERRORS_TOTAL.labels(reason=exc.reason).inc()
+            logger.exception("Failed to decode message from Kafka: %s", exc)
+            await self._dlq.publish_raw(raw_value, error_message=exc.reason)
+            return None
 
         logger.info(
             "Received job from Kafka: job_id=%s user_id=%s channel=%s",
@@ -101,20 +402,69 @@ class KafkaNotificationConsumer:
             job.user_id,
             job.channel,
         )
+        return job
 
+    async def _process_job(
+        self,
+        job: NotificationJob,
+        previous_attempts: int = 0,
+        **handle_kwargs: Any,
+    ) -> None:
+        """Бизнес-обработка job'а; необработанные ошибки → DLQ."""
         # 3. Бизнес-обработка
+        channel = getattr(job.channel, "value", job.channel)
+        started = time.perf_counter()
         try:
-            await self._processor.handle_job(job)
+            await self._processor.handle_job(
+                job,
+                previous_attempts=previous_attempts,
+                **handle_kwargs,
+            )
         except Exception as exc:
+            JOBS_TOTAL.labels(channel=channel, outcome="error").inc()
             logger.exception(
                 "Unhandled error while handling job %s, sending to DLQ",
                 job.job_id,
             )
             await self._dlq.publish_job(job, error_message=str(exc))
         else:
+            JOBS_TOTAL.labels(channel=channel, outcome="ok").inc()
             logger.info(
                 "Job %s processed successfully (user_id=%s, channel=%s)",
                 job.job_id,
                 job.user_id,
                 job.channel,
             )
+        finally:
+            JOB_SECONDS.labels(channel=channel).observe(
+                time.perf_counter() - started)
+
+
+def _retry_headers(
+    headers: Sequence[tuple[str, bytes]] | None,
+) -> tuple[int, float | None]:
+    """Достаёт из заголовков номер попытки и not-before (unix-секунды)."""
+    attempts = 0
+    not_before: float | None = None
+    for key, value in headers or ():
+        try:
+            if key == RETRY_ATTEMPTS_HEADER:
+                attempts = int(value)
+            elif key == RETRY_NOT_BEFORE_HEADER:
+                not_before = int(value) / 1000
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed header %s=%r", key, value)
+    return attempts, not_before
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    """Пробрасывает события ребалансировки в KafkaNotificationConsumer."""
+
+    def __init__(self, consumer: KafkaNotificationConsumer) -> None:
+        self._consumer = consumer
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        await self._consumer._on_partitions_revoked(set(revoked))
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        logger.info("Kafka partitions assigned: %s", sorted(assigned))
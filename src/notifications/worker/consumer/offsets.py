@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable
+
+from aiokafka import TopicPartition
+
+
+class OffsetTracker:
+    """Учёт завершённых offset'ов для ручного коммита.
+
+    Коммитим только непрерывный «водораздел» по партиции: если
+    offset'ы 10, 11, 12 в работе и 11 и 12 уже готовы, а 10 нет —
+    коммитить нечего. Так при падении воркера мы не теряем job'ы,
+    которые ещё не обработаны (at-least-once).
+    """
+
+    def __init__(self) -> None:
+        # партиция → offset'ы в порядке чтения, ещё не закоммиченные
+        self._pending: dict[TopicPartition, deque[int]] = {}
+        self._done: dict[TopicPartition, set[int]] = {}
+
+    def track(self, tp: TopicPartition, offset: int) -> None:
+        self._pending.setdefault(tp, deque()).append(offset)
+        self._done.setdefault(tp, set())
+
+    def complete(self, tp: TopicPartition, offset: int) -> None:
+        done = self._done.get(tp)
+        if done is not None:
+            done.add(offset)
+
+    def committable(self) -> dict[TopicPartition, int]:
+        """Offset'ы для commit() (следующий к чтению), только изменившиеся.
+
+        Состояние не меняется: offset'ы забываются только в
+        mark_committed(), когда коммит действительно прошёл.
+        """
+        result: dict[TopicPartition, int] = {}
+        for tp, pending in self._pending.items():
+            done = self._done[tp]
+            last: int | None = None
+            for offset in pending:
+                if offset not in done:
+                    break
+                last = offset
+            if last is not None:
+                result[tp] = last + 1
+        return result
+
+    def mark_committed(self, offsets: dict[TopicPartition, int]) -> None:
+        """Забыть offset'ы, которые покрыл успешный commit()."""
+        for tp, next_offset in offsets.items():
+            pending = self._pending.get(tp)
+            if pending is None:
+                continue
+            done = self._done[tp]
+            while pending and pending[0] < next_offset:
+                done.discard(pending.popleft())
+
+    def pending_count(self) -> int:
+        return sum(len(p) for p in self._pending.values())
+
+    def forget(self, tps: Iterable[TopicPartition]) -> None:
+        """Забыть партиции (например, после ребалансировки)."""
+        for tp in tps:
+            self._pending.pop(tp, None)
+            self._done.pop(tp, None)
@@ -0,0 +1,261 @@
+"""Метрики воркера в формате Prometheus (prometheus_client).
+
+Одиночный процесс отдаёт REGISTRY сам (MetricsServer). Под супервизором
+(--processes N) процессы пишут значения в PROMETHEUS_MULTIPROC_DIR
+(multiprocess-режим prometheus_client), а супервизор отдаёт их сумму.
+
+Gauge'и, которые считаются из состояния объектов (in-flight, пул
+Postgres, счётчики компонентов), обновляют функции add_refresher():
+перед ответом /metrics и по таймеру в дочерних процессах.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Mapping
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+logger = logging.getLogger(__name__)
+
+# Границы по умолчанию (секунды) — от миллисекунды до таймаутов SMTP
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# имя → функция, которая выставляет gauge'и из состояния процесса
+_REFRESHERS: dict[str, Callable[[], None]] = {}
+
+
+def add_refresher(name: str, refresh: Callable[[], None]) -> None:
+    """Зарегистрировать (или заменить) функцию обновления gauge'ей."""
+    _REFRESHERS[name] = refresh
+
+
+def refresh_gauges() -> None:
+    for name, refresh in list(_REFRESHERS.items()):
+        try:
+            refresh()
+        except Exception:
+            logger.exception("Failed to refresh %s metrics", name)
+
+
+def render() -> bytes:
+    """Текст /metrics одиночного процесса."""
+    refresh_gauges()
+    return generate_latest(REGISTRY)
+
+
+def export_stats(snapshot: Mapping[str, float]) -> None:
+    """Счётчики StatsSources ("dlq.published" → component/stat) в gauge."""
+    for key, value in snapshot.items():
+        component, _, stat = key.partition(".")
+        COMPONENT_STATS.labels(component=component, stat=stat).set(value)
+
+
+# -------------------- HTTP /metrics --------------------
+
+Route = Callable[[dict[str, str]], Any]
+
+
+class MetricsServer:
+    """Минимальный HTTP-сервер на asyncio: GET /metrics (+ доп. маршруты).
+
+    Маршрут — функция (query-параметры) → текст ответа или корутина,
+    которая его вернёт. Свой сервер, а не start_http_server из
+    prometheus_client: доп. маршруты (/debug/profile) работают в event
+    loop'е воркера. Keep-alive не поддерживается: Prometheus и curl
+    открывают соединение на каждый запрос.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self._host = host
+        self._port = port
+        self._server: asyncio.base_events.Server | None = None
+        self._routes: dict[str, Route] = {
+            "/metrics": lambda _query: render(),
+        }
+
+    def add_route(self, path: str, handler: Route) -> None:
+        self._routes[path] = handler
+
+    @property
+    def port(self) -> int:
+        """Фактический порт (для port=0 — выбранный системой)."""
+        if self._server is None or not self._server.sockets:
+            return self._port
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle, self._host, self._port)
+        logger.info(
+            "Metrics endpoint listening on %s:%s", self._host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # Заголовки запроса не нужны — дочитываем до пустой строки
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (
+                b"\r\n", b"\n", b"",
+            ):
+                pass
+            status, body = await self._route(request_line)
+        except (asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+
+        payload = body if isinstance(body, bytes) else body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {CONTENT_TYPE_LATEST}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n".encode("ascii") + payload
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, request_line: bytes) -> tuple[str, str | bytes]:
+        parts = request_line.decode("latin-1").split()
+        if len(parts) < 2 or parts[0] != "GET":
+            return "405 Method Not Allowed", "only GET is supported\n"
+        path, _, query_text = parts[1].partition("?")
+        handler = self._routes.get(path)
+        if handler is None:
+            return "404 Not Found", "not found\n"
+        query = dict(
+            item.partition("=")[::2] for item in query_text.split("&") if item
+        )
+        try:
+            result = handler(query)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except ValueError as exc:
+            return "400 Bad Request", f"{exc}\n"
+        except Exception as exc:
+            logger.exception("Metrics endpoint %s failed", path)
+            return "500 Internal Server Error", f"{exc}\n"
+        return "200 OK", result
+
+
+# -------------------- метрики воркера --------------------
+
+STAGE_SECONDS = Histogram(
+    "notifications_worker_stage_seconds",
+    "Time spent in a processing stage of a job",
+    ["stage"],
+    buckets=DEFAULT_BUCKETS,
+)
+JOB_SECONDS = Histogram(
+    "notifications_worker_job_seconds",
+    "End-to-end handling time of a job inside the worker",
+    ["channel"],
+    buckets=DEFAULT_BUCKETS,
+)
+JOBS_TOTAL = Counter(
+    "notifications_worker_jobs",
+    "Jobs handled by the worker",
+    ["channel", "outcome"],
+)
+SEND_ERRORS_TOTAL = Counter(
+    "notifications_worker_send_errors",
+    "Failed send attempts by channel",
+    ["channel"],
+)
+DECODE_ERRORS_TOTAL = Counter(
+    "notifications_worker_decode_errors",
+    "Kafka messages that could not be decoded",
+    ["reason"],
+)
+# livesum: под супервизором — сумма по живым процессам
+IN_FLIGHT = Gauge(
+    "notifications_worker_in_flight",
+    "Jobs currently being processed",
+    multiprocess_mode="livesum",
+)
+WAITING = Gauge(
+    "notifications_worker_waiting",
+    "Jobs waiting for a dispatcher slot",
+    ["lane"],
+    multiprocess_mode="livesum",
+)
+CONSUMER_LAG = Gauge(
+    "notifications_worker_consumer_lag",
+    "Messages behind the partition high watermark",
+    ["group", "topic", "partition"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "notifications_worker_db_pool_connections",
+    "Postgres pool connections by state",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+COMPONENT_STATS = Gauge(
+    "notifications_worker_component",
+    "Internal counters of worker components (caches, pools, DLQ, ...)",
+    ["component", "stat"],
+    multiprocess_mode="livesum",
+)
+
+
+# asyncio-задача → этап, который она сейчас выполняет (для профилировщика)
+_TASK_STAGES: dict[asyncio.Task, str] = {}
+
+
+def task_stage(task: asyncio.Task | None) -> str | None:
+    """Текущий этап задачи (track_stage) или None."""
+    if task is None:
+        return None
+    return _TASK_STAGES.get(task)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Время этапа обработки job'а → notifications_worker_stage_seconds.
+
+    Заодно помечает текущую задачу этапом — по этой метке
+    SamplingProfiler раскладывает сэмплы по этапам.
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    previous = _TASK_STAGES.get(task) if task is not None else None
+    if task is not None:
+        _TASK_STAGES[task] = stage
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(
+            time.perf_counter() - started)
+        if task is not None:
+            if previous is None:
+                _TASK_STAGES.pop(task, None)
+            else:
+                _TASK_STAGES[task] = previous
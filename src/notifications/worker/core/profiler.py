@@ -0,0 +1,174 @@
+"""Сэмплирующий профилировщик работающего воркера (только stdlib).
+
+Отдельный поток раз в interval_seconds снимает стек потока event loop'а
+(sys._current_frames) и копит одинаковые стеки. Результат — «folded»
+формат (`frame;frame;frame count` построчно), который понимают
+flamegraph.pl, speedscope и inferno. Воркер при этом не
+останавливается и не перезапускается; накладные расходы — один проход
+по стеку раз в несколько миллисекунд.
+
+С stages=True первым фреймом стека идёт `stage:<этап>` — этап
+JobProcessor'а (track_stage), который выполняла задача event loop'а в
+момент сэмпла.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from types import CodeType, FrameType
+
+from .metrics import task_stage
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusyError(ValueError):
+    """Профилирование уже идёт — одновременно только одно."""
+
+
+@dataclass
+class ProfileResult:
+    stacks: Counter[str]
+    samples: int
+    duration_seconds: float
+
+    def folded(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class SamplingProfiler:
+    """Профилировщик потока, в котором крутится event loop.
+
+    Создаётся внутри loop'а (запоминает его поток); capture() не
+    блокирует loop — сэмплирование идёт в отдельном потоке.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval_seconds: float = 0.005,
+        max_seconds: float = 300.0,
+        max_depth: int = 128,
+    ) -> None:
+        self._interval = interval_seconds
+        self._max_seconds = max_seconds
+        self._max_depth = max_depth
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._running = False
+        self._labels: dict[CodeType, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def capture(
+        self,
+        seconds: float,
+        *,
+        stages: bool = True,
+    ) -> ProfileResult:
+        if not 0 < seconds <= self._max_seconds:
+            raise ValueError(
+                f"profile duration must be in (0, {self._max_seconds:g}] sec")
+        if self._running:
+            raise ProfilerBusyError("profiling is already in progress")
+        self._running = True
+        try:
+            # Отдельный поток, а не executor loop'а: занятый пул не
+            # должен задерживать старт профилирования
+            done = self._loop.create_future()
+
+            def _target() -> None:
+                try:
+                    result = self._sample(seconds, stages)
+                except BaseException as exc:  # pragma: no cover
+                    self._loop.call_soon_threadsafe(done.set_exception, exc)
+                else:
+                    self._loop.call_soon_threadsafe(done.set_result, result)
+
+            threading.Thread(
+                target=_target, name="worker-profiler", daemon=True).start()
+            return await done
+        finally:
+            self._running = False
+
+    async def capture_to_file(
+        self,
+        seconds: float,
+        directory: str | os.PathLike,
+        *,
+        stages: bool = True,
+    ) -> Path:
+        """capture() и запись folded-файла worker-<pid>-<время>.folded."""
+        logger.info("Profiling worker for %.1f sec...", seconds)
+        result = await self.capture(seconds, stages=stages)
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        path = path / (
+            f"worker-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        await asyncio.to_thread(path.write_text, result.folded())
+        logger.info(
+            "Profile written to %s (%s samples, %s unique stacks)",
+            path,
+            result.samples,
+            len(result.stacks),
+        )
+        return path
+
+    def _sample(self, seconds: float, stages: bool) -> ProfileResult:
+        stacks: Counter[str] = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                break
+            stack = self._fold(frame)
+            if stages:
+                stage = self._current_stage()
+                if stage is not None:
+                    stack = f"stage:{stage};{stack}"
+            stacks[stack] += 1
+            samples += 1
+            del frame
+            time.sleep(self._interval)
+        return ProfileResult(
+            stacks=stacks,
+            samples=samples,
+            duration_seconds=time.monotonic() - started,
+        )
+
+    def _current_stage(self) -> str | None:
+        try:
+            return task_stage(asyncio.current_task(self._loop))
+        except RuntimeError:
+            return None
+
+    def _fold(self, frame: FrameType | None) -> str:
+        names: list[str] = []
+        while frame is not None and len(names) < self._max_depth:
+            names.append(self._label(frame.f_code))
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            parts = Path(code.co_filename).parts[-2:]
+            label = f"{code.co_name} ({'/'.join(parts)}:{code.co_firstlineno})"
+            # ';' — разделитель фреймов в folded-формате
+            label = label.replace(";", ":")
+            self._labels[code] = label
+        return label
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Iterable, Mapping
+
+logger = logging.getLogger(__name__)
+
+StatsFn = Callable[[], Mapping[str, Any]]
+
+
+class StatsSources:
+    """Реестр компонентов воркера, умеющих отдавать stats().
+
+    snapshot() собирает плоский словарь "<компонент>.<ключ>" → число;
+    нечисловые значения (например, состояние circuit breaker'а)
+    пропускаются.
+    """
+
+    def __init__(self) -> None:
+        self._sources: dict[str, StatsFn] = {}
+
+    def register(self, name: str, fn: StatsFn) -> None:
+        self._sources[name] = fn
+
+    def snapshot(self) -> dict[str, float]:
+        result: dict[str, float] = {}
+        for name, fn in self._sources.items():
+            try:
+                stats = fn()
+            except Exception:
+                logger.exception("Failed to collect stats from %s", name)
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool):
+                    continue
+                if isinstance(value, (int, float)):
+                    result[f"{name}.{key}"] = value
+        return result
+
+
+def merge_snapshots(
+    snapshots: Iterable[Mapping[str, float]],
+) -> dict[str, float]:
+    """Сложить snapshot'ы нескольких процессов воркера по ключам."""
+    merged: dict[str, float] = {}
+    for snapshot in snapshots:
+        for key, value in snapshot.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
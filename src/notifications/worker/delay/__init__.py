@@ -0,0 +1,4 @@
+from .scheduler import DelayedDeliveryScheduler
+from .timer_wheel import TimerWheel
+
+__all__ = ["DelayedDeliveryScheduler", "TimerWheel"]
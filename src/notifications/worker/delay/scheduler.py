@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from src.notifications.common.schemas import NotificationJob
+from ..repositories import DelayedJob, DelayedJobRepository
+from .timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+# on_due может вернуть future обработки job'а (задачу dispatcher'а):
+# строка delayed_jobs удаляется, когда она завершится
+DueJobFn = Callable[[NotificationJob], Awaitable["asyncio.Future | None"]]
+
+
+@dataclass
+class _Parked:
+    """Job в колесе и due_at его строки в delayed_jobs."""
+
+    due_at: datetime
+    job: NotificationJob
+
+
+class DelayedDeliveryScheduler:
+    """Отложенная доставка job'ов без блокировки consumer'а.
+
+    Каждый отложенный job сразу пишется в Postgres (delayed_jobs):
+    offset сообщения Kafka после этого можно коммитить.
+
+    - задержка <= horizon_seconds → job ещё и в памяти, в TimerWheel,
+      а его строка «арендована» этим процессом (claimed_until);
+    - задержка больше → только строка, poll-цикл арендует её и кладёт
+      job в колесо, когда срок подходит к горизонту;
+    - при остановке аренда строк из колеса снимается — их заберёт
+      любой живой воркер.
+
+    Когда срок наступает, job отдаётся в on_due (обычно — обратно в
+    dispatcher consumer'а) и проходит обычный сценарий обработки;
+    строка удаляется, только когда обработка закончилась. Если on_due
+    упал, job возвращается в колесо и повторяется через
+    redispatch_seconds. Упал процесс — аренда истекает через
+    lease_seconds после due_at, и job забирает другой воркер (повторную
+    отправку отсекает идемпотентность по job_id).
+    """
+
+    def __init__(
+        self,
+        *,
+        delay_repo: DelayedJobRepository,
+        on_due: DueJobFn,
+        tick_seconds: float,
+        horizon_seconds: float,
+        poll_interval_seconds: float,
+        poll_batch_size: int,
+        lease_seconds: float = 300.0,
+        redispatch_seconds: float = 1.0,
+    ) -> None:
+        self._delay_repo = delay_repo
+        self._on_due = on_due
+        self._tick_seconds = tick_seconds
+        self._horizon_seconds = horizon_seconds
+        self._poll_interval_seconds = poll_interval_seconds
+        self._poll_batch_size = poll_batch_size
+        self._lease_seconds = lease_seconds
+        self._redispatch_seconds = redispatch_seconds
+
+        self._wheel: TimerWheel[_Parked] = TimerWheel(
+            tick_seconds=tick_seconds,
+            now=time.time(),
+        )
+        if horizon_seconds > self._wheel.span_seconds:
+            raise ValueError(
+                f"horizon_seconds={horizon_seconds} exceeds timer wheel "
+                f"span {self._wheel.span_seconds:.1f}s"
+            )
+        self._tasks: list[asyncio.Task] = []
+        self._stopped = False
+        # обработанные job'ы, чьи строки пора удалить
+        self._finished: list[_Parked] = []
+
+    @property
+    def parked_in_memory(self) -> int:
+        return len(self._wheel)
+
+    # -------------------- публичный API --------------------
+
+    async def park(
+        self,
+        job: NotificationJob,
+        due_at: datetime | None = None,
+    ) -> None:
+        """Отложить job до due_at (по умолчанию — до job.send_after)."""
+        due_at = due_at or job.send_after
+        if due_at is None:
+            raise ValueError(f"Job {job.job_id} has no due time to park")
+
+        due_at = due_at.astimezone(timezone.utc)
+        delay = (due_at - datetime.now(timezone.utc)).total_seconds()
+        row = DelayedJob(
+            job_id=job.job_id,
+            due_at=due_at,
+            payload=job.model_dump_json(),
+        )
+
+        # после stop() колесо уже никто не крутит
+        if delay <= self._horizon_seconds and not self._stopped:
+            await self._delay_repo.save_many(
+                [row], lease_seconds=self._lease_seconds)
+            self._wheel.add(due_at.timestamp(), _Parked(due_at, job))
+            logger.info(
+                "Job %s parked in memory for %.2f sec until %s",
+                job.job_id,
+                max(delay, 0.0),
+                due_at,
+            )
+            return
+
+        await self._delay_repo.save_many([row])
+        logger.info(
+            "Job %s parked in delay store for %.2f sec until %s",
+            job.job_id,
+            delay,
+            due_at,
+        )
+
+    async def start(self) -> None:
+        self._stopped = False
+        self._tasks = [
+            asyncio.create_task(self._tick_loop(), name="delay-wheel-tick"),
+            asyncio.create_task(self._poll_loop(), name="delay-store-poll"),
+        ]
+        logger.info(
+            "Delayed delivery scheduler started: tick=%.3fs horizon=%ss "
+            "poll_interval=%ss",
+            self._tick_seconds,
+            self._horizon_seconds,
+            self._poll_interval_seconds,
+        )
+
+    async def stop(self) -> None:
+        """Остановить циклы и снять аренду со строк из колеса.
+
+        Вызывать до остановки consumer'ов: on_due, ждущий места в
+        dispatcher'е, прерывается, и его job'ы остаются в Postgres.
+        Job'ы, отложенные после stop(), пишутся только в Postgres.
+        """
+        self._stopped = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._delete_finished()
+
+        leftovers = self._wheel.pop_all()
+        if not leftovers:
+            return
+        await self._delay_repo.save_many([
+            DelayedJob(
+                job_id=parked.job.job_id,
+                due_at=parked.due_at,
+                payload=parked.job.model_dump_json(),
+            )
+            for _, parked in leftovers
+        ])
+        logger.info(
+            "Released %s in-memory delayed jobs back to delay store",
+            len(leftovers),
+        )
+
+    # -------------------- циклы --------------------
+
+    async def _tick_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._tick_seconds)
+            due = self._wheel.advance(time.time())
+            for idx, parked in enumerate(due):
+                try:
+                    done = await self._on_due(parked.job)
+                except asyncio.CancelledError:
+                    # stop(): неотданные job'ы — обратно в колесо, откуда
+                    # stop() вернёт их строки в общий пул
+                    now = time.time()
+                    for rest in due[idx:]:
+                        self._wheel.add(now, rest)
+                    raise
+                except Exception:
+                    logger.exception(
+                        "Failed to dispatch delayed job %s, retry in %s sec",
+                        parked.job.job_id,
+                        self._redispatch_seconds,
+                    )
+                    self._wheel.add(
+                        time.time() + self._redispatch_seconds, parked)
+                    continue
+                if done is None:
+                    self._finished.append(parked)
+                else:
+                    done.add_done_callback(
+                        functools.partial(self._on_processed, parked))
+            await self._delete_finished()
+
+    def _on_processed(self, parked: _Parked, _done: asyncio.Future) -> None:
+        self._finished.append(parked)
+
+    async def _delete_finished(self) -> None:
+        """Удалить строки обработанных job'ов одним запросом."""
+        if not self._finished:
+            return
+        finished, self._finished = self._finished, []
+        try:
+            await self._delay_repo.delete_many([
+                (parked.job.job_id, parked.due_at) for parked in finished
+            ])
+        except Exception:
+            # Строки вернутся после аренды; повтор отсечёт идемпотентность
+            logger.exception(
+                "Failed to delete %s dispatched delayed jobs", len(finished))
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await self._pull_due_from_store()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to poll delay store")
+            await asyncio.sleep(self._poll_interval_seconds)
+
+    async def _pull_due_from_store(self) -> None:
+        """Перенести из Postgres в колесо job'ы, попавшие в горизонт."""
+        while True:
+            until = datetime.now(timezone.utc) + timedelta(
+                seconds=self._horizon_seconds)
+            claimed = await self._delay_repo.claim_due(
+                until=until,
+                limit=self._poll_batch_size,
+                lease_seconds=self._lease_seconds,
+            )
+            broken: list[tuple[UUID, datetime]] = []
+            for row in claimed:
+                try:
+                    job = NotificationJob.model_validate_json(row.payload)
+                except Exception:
+                    logger.exception(
+                        "Dropping undecodable delayed job %s", row.job_id)
+                    broken.append((row.job_id, row.due_at))
+                    continue
+                self._wheel.add(
+                    row.due_at.timestamp(), _Parked(row.due_at, job))
+            if broken:
+                await self._delay_repo.delete_many(broken)
+
+            if claimed:
+                logger.info(
+                    "Moved %s delayed jobs from delay store to timer wheel",
+                    len(claimed),
+                )
+            if len(claimed) < self._poll_batch_size:
+                return
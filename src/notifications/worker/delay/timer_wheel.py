@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import math
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class TimerWheel(Generic[T]):
+    """Иерархическое колесо таймеров (Varghese & Lauck).
+
+    Время дискретизируется тиками по tick_seconds. Уровень L хранит
+    элементы, до срабатывания которых от wheel_size**L до
+    wheel_size**(L+1) тиков; при переходе через границу слота элементы
+    «спускаются» на уровень ниже. Добавление и срабатывание — O(1)
+    на элемент, независимо от количества отложенных job'ов.
+
+    Структура синхронная и ничего не знает про asyncio: время
+    передаётся снаружи (unix-секунды), см. advance().
+    """
+
+    def __init__(
+        self,
+        *,
+        tick_seconds: float,
+        now: float,
+        wheel_size: int = 64,
+        levels: int = 3,
+    ) -> None:
+        if tick_seconds <= 0:
+            raise ValueError("tick_seconds must be > 0")
+        if wheel_size < 2 or levels < 1:
+            raise ValueError("wheel_size must be >= 2 and levels >= 1")
+
+        self._tick = tick_seconds
+        self._size = wheel_size
+        self._levels: list[list[list[tuple[int, T]]]] = [
+            [[] for _ in range(wheel_size)] for _ in range(levels)
+        ]
+        self._current = self._to_tick(now)
+        self._ready: list[T] = []
+        self._count = 0
+
+    @property
+    def span_seconds(self) -> float:
+        """Максимальная задержка, которую колесо может принять."""
+        return (self._size ** len(self._levels) - 1) * self._tick
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, deadline: float, item: T) -> None:
+        """Запланировать item на момент deadline (unix-секунды)."""
+        expiry = math.ceil(deadline / self._tick)
+        if expiry - self._current >= self._size ** len(self._levels):
+            raise ValueError(
+                f"Deadline is beyond wheel span ({self.span_seconds:.1f}s)"
+            )
+        self._place(expiry, item)
+        self._count += 1
+
+    def advance(self, now: float) -> list[T]:
+        """Прокрутить колесо до now и вернуть сработавшие элементы."""
+        target = self._to_tick(now)
+        while self._current < target:
+            self._current += 1
+            self._cascade()
+            slot = self._levels[0][self._current % self._size]
+            if slot:
+                self._ready.extend(item for _, item in slot)
+                slot.clear()
+
+        fired, self._ready = self._ready, []
+        self._count -= len(fired)
+        return fired
+
+    def pop_all(self) -> list[tuple[float, T]]:
+        """Забрать все ещё не сработавшие элементы вместе с их дедлайнами."""
+        result = [(self._current * self._tick, item) for item in self._ready]
+        for level in self._levels:
+            for slot in level:
+                result.extend((expiry * self._tick, item)
+                              for expiry, item in slot)
+                slot.clear()
+        self._ready = []
+        self._count = 0
+        return result
+
+    # -------------------- helpers --------------------
+
+    def _to_tick(self, ts: float) -> int:
+        return math.floor(ts / self._tick)
+
+    def _place(self, expiry: int, item: T) -> None:
+        delta = expiry - self._current
+        if delta <= 0:
+            self._ready.append(item)
+            return
+
+        level = 0
+        span = self._size
+        while delta >= span:
+            level += 1
+            span *= self._size
+
+        idx = (expiry // self._size ** level) % self._size
+        self._levels[level][idx].append((expiry, item))
+
+    def _cascade(self) -> None:
+        """Спустить элементы верхних уровней, чей слот наступил."""
+        for level in range(len(self._levels) - 1, 0, -1):
+            unit = self._size ** level
+            if self._current % unit:
+                continue
+            slot = self._levels[level][(self._current // unit) % self._size]
+            if not slot:
+                continue
+            entries = list(slot)
+            slot.clear()
+            for expiry, item in entries:
+                self._place(expiry, item)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import json
 import logging
 from datetime import datetime, timezone
@@ -7,17 +9,32 @@ from typing import Any
 
 from aiokafka import AIOKafkaProducer
 
+from src.notifications.common.job_codec import is_binary_job
 from src.notifications.common.schemas import NotificationJob
 from src.notifications.common.config import Settings
 logger = logging.getLogger(__name__)
 
 
 class DlqPublisher:
-    """Публикация сообщений в DLQ-топик."""
+    """Публикация сообщений в DLQ-топик.
+
+    Отправка не блокирует job: сообщение ставится в буфер producer'а
+    (батчинг/сжатие настраиваются в create_kafka_producer), подтверждение
+    ждём в фоне. flush() дожидается всех отправок — consumer вызывает
+    его перед коммитом offset'ов. Недоставленные сообщения хранятся и
+    переотправляются при каждом flush(), пока брокер их не подтвердит.
+    В лог пишется не каждое сообщение, а каждое dlq_log_sample_every-е,
+    payload — только на DEBUG.
+    """
 
     def __init__(self, settings: Settings, producer: AIOKafkaProducer) -> None:
         self._settings = settings
         self._producer = producer
+        # future подтверждения → (key, value), чтобы переотправить
+        self._pending: dict[asyncio.Future, tuple[bytes | None, bytes]] = {}
+        self._undelivered: list[tuple[bytes | None, bytes]] = []
+        self.published = 0
+        self.failed = 0
 
     async def publish_job(
             self,
@@ -39,21 +56,88 @@ class DlqPublisher:
             "error_message": error_message,
             "failed_at": datetime.now(timezone.utc).isoformat(),
         }
+        if is_binary_job(raw_value):
+            # Бинарный job в utf-8 не сохранить без потерь
+            payload["raw_value"] = base64.b64encode(raw_value).decode("ascii")
+            payload["raw_encoding"] = "base64"
         await self._send(payload, key=None)
 
+    async def flush(self) -> None:
+        """Переотправить недоставленное и дождаться всех подтверждений.
+
+        Если что-то так и не доставилось — RuntimeError: сообщения
+        остаются в памяти до следующего flush(), а consumer не
+        коммитит offset'ы, пока flush() не пройдёт.
+        """
+        if self._undelivered:
+            retry, self._undelivered = self._undelivered, []
+            logger.warning(
+                "Re-sending %s undelivered DLQ message(s)", len(retry))
+            for key_bytes, value in retry:
+                try:
+                    await self._produce(key_bytes, value)
+                except Exception as exc:
+                    logger.error("Failed to re-send DLQ message: %s", exc)
+                    self._undelivered.append((key_bytes, value))
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._undelivered:
+            raise RuntimeError(
+                f"{len(self._undelivered)} DLQ message(s) were not delivered")
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "published": self.published,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "undelivered": len(self._undelivered),
+        }
+
     async def _send(self, payload: dict[str, Any], key: str | None) -> None:
         value = json.dumps(payload).encode("utf-8")
         key_bytes = key.encode("utf-8") if key else None
 
-        logger.error(
-            "Sending message to DLQ topic=%s key=%r payload=%r",
-            self._settings.kafka_dlq_topic,
-            key,
-            payload,
-        )
+        self.published += 1
+        sample_every = self._settings.dlq_log_sample_every
+        if sample_every <= 1 or self.published % sample_every == 1:
+            logger.error(
+                "Sending message to DLQ topic=%s key=%r error=%r"
+                " (total sent: %s, failed: %s)",
+                self._settings.kafka_dlq_topic,
+                key,
+                _truncate(payload.get("error_message")),
+                self.published,
+                self.failed,
+            )
+        logger.debug("DLQ payload key=%r payload=%r", key, payload)
+
+        await self._produce(key_bytes, value)
 
-        await self._producer.send_and_wait(
+    async def _produce(self, key_bytes: bytes | None, value: bytes) -> None:
+        # send() возвращает future подтверждения, не дожидаясь брокера
+        delivery = await self._producer.send(
             topic=self._settings.kafka_dlq_topic,
             key=key_bytes,
             value=value,
         )
+        self._pending[delivery] = (key_bytes, value)
+        delivery.add_done_callback(self._on_delivered)
+
+    def _on_delivered(self, delivery: asyncio.Future) -> None:
+        message = self._pending.pop(delivery, None)
+        if delivery.cancelled():
+            exc: BaseException | None = asyncio.CancelledError()
+        else:
+            exc = delivery.exception()
+        if exc is None:
+            return
+        self.failed += 1
+        if message is not None:
+            self._undelivered.append(message)
+        logger.error("Failed to deliver message to DLQ: %s", exc)
+
+
+def _truncate(value: str | None, limit: int = 200) -> str | None:
+    if value is None or len(value) <= limit:
+        return value
+    return value[:limit] + "..."
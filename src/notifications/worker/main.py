@@ -1,27 +1,296 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
+import os
 import signal
+from typing import Any, Awaitable, Callable
+
+import aiosmtplib
 
 from .auth import AuthClient
 from src.notifications.worker.core.config import settings
-from .consumer import KafkaNotificationConsumer
+from .consumer import KafkaNotificationConsumer, KeyedDispatcher
+from .consumer.dispatcher import AdmissionFn
+from .core.metrics import (
+    DB_POOL_CONNECTIONS,
+    IN_FLIGHT,
+    WAITING,
+    MetricsServer,
+    add_refresher,
+    export_stats,
+    refresh_gauges,
+)
+from .core.profiler import SamplingProfiler
+from .core.stats import StatsSources
+from .delay import DelayedDeliveryScheduler
 from .dlq import DlqPublisher
 from src.notifications.worker.core.logger import configure_logging
 from .processor import JobProcessor
+from .retry import RetryPublisher
 from .repositories import (
     TemplateRepository,
+    CachedTemplateRepository,
+    TemplateChangeListener,
     NotificationDeliveryRepository,
+    BufferedNotificationDeliveryRepository,
+    DelayedJobRepository,
+)
+from .senders import (
+    BreakerSender,
+    ChannelLimiter,
+    CircuitBreaker,
+    EmailSender,
+    PushSender,
+    RecipientRefusedError,
+    SmtpConnectionPool,
+    WsSender,
 )
-from .senders import EmailSender, PushSender, WsSender
 
-from .startup import create_db_pool, create_kafka_producer
+from .startup import (
+    create_auth_http_client,
+    create_db_pool,
+    create_kafka_producer,
+)
 
 logger = logging.getLogger(__name__)
 
 
-async def app() -> None:
+def _channel_limiter(
+    channel: str,
+    stats: StatsSources,
+) -> ChannelLimiter | None:
+    """ChannelLimiter канала или None, если лимиты не заданы."""
+    max_concurrency = getattr(settings, f"{channel}_max_concurrency")
+    rate = getattr(settings, f"{channel}_rate_per_second")
+    if max_concurrency <= 0 and rate <= 0:
+        return None
+    logger.info(
+        "Channel %s limits: max_concurrency=%s rate=%s/s",
+        channel,
+        max_concurrency,
+        rate,
+    )
+    limiter = ChannelLimiter(
+        channel,
+        max_concurrency=max_concurrency,
+        rate=rate,
+        burst=getattr(settings, f"{channel}_rate_burst"),
+    )
+    stats.register(f"limiter_{channel}", limiter.stats)
+    return limiter
+
+
+def _channel_limiters(stats: StatsSources) -> dict[str, ChannelLimiter]:
+    """Лимитеры каналов, для которых заданы лимиты."""
+    limiters = {}
+    for channel in ("email", "push", "ws"):
+        limiter = _channel_limiter(channel, stats)
+        if limiter is not None:
+            limiters[channel] = limiter
+    return limiters
+
+
+def _admission(
+    limiters: dict[str, ChannelLimiter],
+    *,
+    priority: bool = False,
+) -> dict[str, AdmissionFn]:
+    """Допуск consumer'а к лимитам каналов (см. KeyedDispatcher).
+
+    У каждого consumer'а свои объекты допуска — и свои «комнаты»
+    ожидания в dispatcher'е; priority=True — вне очереди лимитера.
+    """
+    return {
+        channel: functools.partial(limiter.slot, priority=priority)
+        for channel, limiter in limiters.items()
+    }
+
+
+def _circuit_breaker_enabled() -> bool:
+    """circuit_breaker_enabled, если job'ы есть куда откладывать.
+
+    При открытом канале job откладывается в delay-планировщик или в
+    retry-топик. Без них CircuitOpenError был бы обычной неудачной
+    попыткой, и авария провайдера за секунды сливала бы очередь в DLQ —
+    такой breaker не включаем.
+    """
+    if not settings.circuit_breaker_enabled:
+        return False
+    if settings.delayed_delivery_enabled or (
+        settings.retry_topics_enabled and settings.retry_delays_seconds
+    ):
+        return True
+    logger.warning(
+        "CIRCUIT_BREAKER_ENABLED requires DELAYED_DELIVERY_ENABLED or"
+        " RETRY_TOPICS_ENABLED to defer jobs; circuit breaker is disabled"
+    )
+    return False
+
+
+def _with_breaker(
+    channel: str,
+    sender,
+    stats: StatsSources,
+    *,
+    enabled: bool,
+    ignored_errors: tuple[type[BaseException], ...] = (ValueError,),
+):
+    """Обернуть sender в CircuitBreaker, если он включён."""
+    if not enabled:
+        return sender
+    breaker = CircuitBreaker(
+        channel,
+        window_size=settings.circuit_breaker_window_size,
+        min_calls=settings.circuit_breaker_min_calls,
+        failure_rate_threshold=settings.circuit_breaker_failure_rate,
+        open_seconds=settings.circuit_breaker_open_seconds,
+        half_open_probes=settings.circuit_breaker_half_open_probes,
+    )
+    stats.register(f"breaker_{channel}", breaker.stats)
+    return BreakerSender(sender, breaker, ignored_errors=ignored_errors)
+
+
+def _senders_with_breakers(
+    stats: StatsSources,
+    *,
+    email_sender,
+    push_sender,
+    ws_sender,
+) -> dict[str, Any]:
+    """Sender'ы каналов для JobProcessor, в CircuitBreaker'ах если нужно."""
+    enabled = _circuit_breaker_enabled()
+    return {
+        "email_sender": _with_breaker(
+            "email",
+            email_sender,
+            stats,
+            enabled=enabled,
+            # отказ по адресу — не признак падения SMTP
+            ignored_errors=(
+                ValueError,
+                RecipientRefusedError,
+                aiosmtplib.SMTPRecipientsRefused,
+            ),
+        ),
+        "push_sender": _with_breaker(
+            "push", push_sender, stats, enabled=enabled),
+        "ws_sender": _with_breaker("ws", ws_sender, stats, enabled=enabled),
+    }
+
+
+def _delay_scheduler(
+    db_pool,
+    on_due: Callable[[Any], Awaitable[asyncio.Task]],
+) -> DelayedDeliveryScheduler | None:
+    """Планировщик отложенной доставки или None, если она выключена."""
+    if not settings.delayed_delivery_enabled:
+        return None
+    return DelayedDeliveryScheduler(
+        delay_repo=DelayedJobRepository(db_pool),
+        on_due=on_due,
+        tick_seconds=settings.delay_wheel_tick_ms / 1000,
+        horizon_seconds=settings.delay_wheel_horizon_seconds,
+        poll_interval_seconds=settings.delay_store_poll_interval_seconds,
+        poll_batch_size=settings.delay_store_poll_batch_size,
+        lease_seconds=settings.delay_store_lease_seconds,
+    )
+
+
+def _dispatcher(stats: StatsSources) -> KeyedDispatcher:
+    """Один dispatcher на все consumer'ы — общий лимит in-flight."""
+    lane_weights = None
+    if settings.priority_lanes_enabled:
+        lane_weights = {
+            "high": settings.high_priority_lane_weight,
+            "normal": 1,
+        }
+    dispatcher = KeyedDispatcher(
+        settings.worker_max_in_flight,
+        lane_weights=lane_weights,
+        # job'ы, ждущие предыдущую job'у своего user_id; в batch-режиме
+        # весь батч и так уже в памяти
+        max_queued=max(
+            settings.worker_max_in_flight,
+            settings.kafka_batch_max_records if settings.kafka_batch_mode
+            else 0,
+        ),
+    )
+    stats.register("dispatcher", dispatcher.stats)
+    return dispatcher
+
+
+def _register_gauges(
+    dispatcher: KeyedDispatcher,
+    db_pool,
+    stats: StatsSources,
+) -> None:
+    """Gauge'и из состояния dispatcher'а, пула Postgres и компонентов."""
+    lanes = ("high", "normal") if settings.priority_lanes_enabled else (
+        "normal",)
+
+    def _refresh() -> None:
+        IN_FLIGHT.set(dispatcher.running)
+        for lane in lanes:
+            WAITING.labels(lane=lane).set(dispatcher.waiting(lane))
+        idle = db_pool.get_idle_size()
+        DB_POOL_CONNECTIONS.labels(state="in_use").set(
+            db_pool.get_size() - idle)
+        DB_POOL_CONNECTIONS.labels(state="idle").set(idle)
+        DB_POOL_CONNECTIONS.labels(state="max").set(db_pool.get_max_size())
+        export_stats(stats.snapshot())
+
+    add_refresher("worker", _refresh)
+
+
+async def _start_metrics_server(
+    profiler: SamplingProfiler,
+) -> MetricsServer | None:
+    """/metrics одиночного процесса (+ /debug/profile, если включён)."""
+    if not settings.metrics_enabled:
+        return None
+    server = MetricsServer(settings.metrics_host, settings.metrics_port)
+    if settings.profile_endpoint_enabled:
+        async def _profile_route(query: dict[str, str]) -> str:
+            seconds = float(
+                query.get("seconds", settings.profile_default_seconds))
+            result = await profiler.capture(
+                seconds, stages=query.get("stages", "1") != "0")
+            return result.folded()
+
+        server.add_route("/debug/profile", _profile_route)
+    await server.start()
+    return server
+
+
+async def _report_stats(
+    stats: StatsSources,
+    stats_queue: Any,
+    interval_seconds: float,
+) -> None:
+    """Раз в interval_seconds отправлять супервизору счётчики.
+
+    Заодно обновляет gauge'и: метрики супервизор читает из
+    PROMETHEUS_MULTIPROC_DIR, куда их пишет prometheus_client.
+    """
+    pid = os.getpid()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if settings.metrics_enabled:
+            refresh_gauges()
+        try:
+            stats_queue.put_nowait((pid, stats.snapshot()))
+        except Exception as exc:
+            logger.warning("Failed to report stats to supervisor: %s", exc)
+
+
+async def app(stats_queue: Any | None = None) -> None:
+    """Воркер целиком в одном event loop.
+
+    stats_queue — очередь супервизора (multiprocessing.Queue), куда
+    процесс периодически шлёт свои счётчики; None — одиночный запуск.
+    """
     logger.info(
         "Notification worker app starting with"
         " kafka_bootstrap_servers=%s, outbox_topic=%s, dlq_topic=%s",
@@ -32,35 +301,144 @@ async def app() -> None:
 
     db_pool = await create_db_pool()
     dlq_producer = await create_kafka_producer()
+    stats = StatsSources()
 
     template_repo = TemplateRepository(db_pool)
+    template_listener: TemplateChangeListener | None = None
+    if settings.template_cache_enabled:
+        template_repo = CachedTemplateRepository(
+            template_repo,
+            max_size=settings.template_cache_max_size,
+            ttl_seconds=settings.template_cache_ttl_seconds,
+        )
+        stats.register("template_cache", template_repo.stats)
+        template_listener = TemplateChangeListener(
+            dsn=settings.db_asyncpg_dsn,
+            channel=settings.templates_notify_channel,
+            cache=template_repo,
+        )
+        # Сначала LISTEN, потом прогрев: изменение шаблона во время
+        # warm() придёт уведомлением, а не останется в кеше старым
+        await template_listener.start()
+        await template_repo.warm()
     delivery_repo = NotificationDeliveryRepository(db_pool)
-    auth_client = AuthClient(settings)
+    status_buffer: BufferedNotificationDeliveryRepository | None = None
+    if settings.status_write_behind_enabled:
+        status_buffer = BufferedNotificationDeliveryRepository(
+            delivery_repo,
+            max_batch_size=settings.status_flush_max_batch,
+            flush_interval_seconds=settings.status_flush_interval_ms / 1000,
+        )
+        await status_buffer.start()
+        delivery_repo = status_buffer
+    auth_http_client = create_auth_http_client()
+    auth_client = AuthClient(settings, http_client=auth_http_client)
+    stats.register("auth", auth_client.stats)
+    smtp_pool: SmtpConnectionPool | None = None
+    if settings.smtp_pool_size > 0:
+        smtp_pool = SmtpConnectionPool(
+            settings.smtp_host,
+            settings.smtp_port,
+            size=settings.smtp_pool_size,
+            idle_check_seconds=settings.smtp_pool_idle_check_seconds,
+            timeout=settings.smtp_timeout_seconds,
+        )
+        stats.register("smtp_pool", smtp_pool.stats)
     email_sender = EmailSender(
         host=settings.smtp_host,
         port=settings.smtp_port,
-        sender=settings.smtp_from
+        sender=settings.smtp_from,
+        pool=smtp_pool,
+        batch_window_seconds=(
+            settings.smtp_batch_window_ms / 1000
+            if settings.smtp_batch_enabled else None
+        ),
+        batch_max_recipients=settings.smtp_batch_max_recipients,
     )
+    stats.register("email_batch", email_sender.stats)
     push_sender = PushSender()
     ws_sender = WsSender()
     dlq_publisher = DlqPublisher(settings, dlq_producer)
+    stats.register("dlq", dlq_publisher.stats)
+    retry_publisher: RetryPublisher | None = None
+    if settings.retry_topics_enabled:
+        retry_publisher = RetryPublisher(settings, dlq_producer)
 
+    async def _on_delayed_job_due(job) -> asyncio.Task:
+        return await consumer.submit_job(job)
+
+    delay_scheduler = _delay_scheduler(db_pool, _on_delayed_job_due)
     processor = JobProcessor(
         settings=settings,
         template_repo=template_repo,
         delivery_repo=delivery_repo,
         auth_client=auth_client,
-        email_sender=email_sender,
-        push_sender=push_sender,
-        ws_sender=ws_sender,
         dlq_publisher=dlq_publisher,
+        delay_scheduler=delay_scheduler,
+        retry_publisher=retry_publisher,
+        **_senders_with_breakers(
+            stats,
+            email_sender=email_sender,
+            push_sender=push_sender,
+            ws_sender=ws_sender,
+        ),
     )
 
+    # Лимиты канала проверяются до слота dispatcher'а: job'а, ждущая
+    # токен email, не занимает слот, нужный push и ws
+    limiters = _channel_limiters(stats)
+    dispatcher = _dispatcher(stats)
+    _register_gauges(dispatcher, db_pool, stats)
+
+    async def before_commit() -> None:
+        # offset'ы коммитим, только когда DLQ-сообщения подтверждены
+        # брокером, а статусы записаны в БД
+        await dlq_publisher.flush()
+        if status_buffer is not None:
+            await status_buffer.flush()
+
     consumer = KafkaNotificationConsumer(
         settings=settings,
         processor=processor,
         dlq_publisher=dlq_publisher,
+        dispatcher=dispatcher,
+        before_commit=before_commit,
+        admission=_admission(limiters),
     )
+    consumers = [consumer]
+    if settings.priority_lanes_enabled:
+        # Свой consumer и своя группа: HIGH-топик не ждёт, пока
+        # разгребётся outbox кампании
+        consumers.append(
+            KafkaNotificationConsumer(
+                settings=settings,
+                processor=processor,
+                dlq_publisher=dlq_publisher,
+                topics=[settings.kafka_high_priority_topic],
+                group_id=f"{settings.kafka_consumer_group}.high",
+                dispatcher=dispatcher,
+                before_commit=before_commit,
+                admission=_admission(limiters, priority=True),
+                lane="high",
+            )
+        )
+    if settings.retry_topics_enabled:
+        # По consumer'у на каждый retry-топик: ожидание «головы» 10s-топика
+        # не задерживает сообщения 1s-топика
+        for topic in settings.retry_topics:
+            consumers.append(
+                KafkaNotificationConsumer(
+                    settings=settings,
+                    processor=processor,
+                    dlq_publisher=dlq_publisher,
+                    topics=[topic],
+                    group_id=f"{settings.kafka_consumer_group}.{topic}",
+                    delay_aware=True,
+                    dispatcher=dispatcher,
+                    before_commit=before_commit,
+                    admission=_admission(limiters),
+                )
+            )
 
     loop = asyncio.get_running_loop()
     stop_event = asyncio.Event()
@@ -69,26 +447,97 @@ async def app() -> None:
         logger.info("Received signal %s, shutting down...", sig)
         stop_event.set()
 
+    profiler = SamplingProfiler(
+        interval_seconds=settings.profile_sample_interval_ms / 1000,
+        max_seconds=settings.profile_max_seconds,
+    )
+    profile_tasks: set[asyncio.Task] = set()
+
+    def _handle_profile_signal() -> None:
+        if profiler.running:
+            logger.warning(
+                "Profiling is already in progress, ignoring SIGUSR1")
+            return
+        task = asyncio.create_task(
+            profiler.capture_to_file(
+                settings.profile_default_seconds, settings.profile_dir),
+            name="profiler",
+        )
+        profile_tasks.add(task)
+        task.add_done_callback(profile_tasks.discard)
+
     for sig in (signal.SIGINT, signal.SIGTERM):
         try:
             loop.add_signal_handler(sig, _handle_signal, sig)
         except NotImplementedError:
             logger.warning("Signal handlers not supported in this environment")
+    try:
+        loop.add_signal_handler(signal.SIGUSR1, _handle_profile_signal)
+    except (NotImplementedError, AttributeError):
+        logger.warning("SIGUSR1 profiling trigger is not available here")
 
-    logger.info("Starting Kafka consumer task...")
-    consumer_task = asyncio.create_task(consumer.start(),
-                                        name="kafka-consumer")
+    if delay_scheduler is not None:
+        await delay_scheduler.start()
+
+    logger.info("Starting %s Kafka consumer task(s)...", len(consumers))
+    consumer_tasks = [
+        asyncio.create_task(c.start(), name=f"kafka-consumer-{idx}")
+        for idx, c in enumerate(consumers)
+    ]
+    metrics_server: MetricsServer | None = None
+    if stats_queue is None:
+        # Под супервизором /metrics отдаёт он — сумма по процессам
+        metrics_server = await _start_metrics_server(profiler)
+    stats_task: asyncio.Task | None = None
+    if stats_queue is not None:
+        stats_task = asyncio.create_task(
+            _report_stats(
+                stats, stats_queue, settings.worker_stats_interval_seconds),
+            name="stats-reporter",
+        )
 
     try:
         logger.info("Worker is running, waiting for stop event...")
         await stop_event.wait()
-        logger.info("Stop event set, cancelling consumer task...")
-        consumer_task.cancel()
-        try:
-            await consumer_task
-        except asyncio.CancelledError:
-            logger.info("Consumer task cancelled")
+        if delay_scheduler is not None:
+            # До consumer'ов: наступившие job'ы ещё отдаются в dispatcher,
+            # а неотданные сохраняются в Postgres
+            await delay_scheduler.stop()
+            logger.info("Delayed delivery scheduler stopped")
+        logger.info("Stop event set, cancelling consumer tasks...")
+        for task in consumer_tasks:
+            task.cancel()
+        results = await asyncio.gather(*consumer_tasks,
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, asyncio.CancelledError):
+                logger.info("Consumer task cancelled")
+            elif isinstance(result, Exception):
+                logger.error("Consumer task failed: %s", result)
     finally:
+        if stats_task is not None:
+            stats_task.cancel()
+        if metrics_server is not None:
+            await metrics_server.stop()
+        for task in profile_tasks:
+            task.cancel()
+        if template_listener is not None:
+            await template_listener.stop()
+        if delay_scheduler is not None:
+            # повторный stop() — no-op; нужен, если вышли по ошибке
+            await delay_scheduler.stop()
+        if status_buffer is not None:
+            await status_buffer.close()
+            logger.info("Delivery status buffer flushed")
+        await email_sender.close()
+        if smtp_pool is not None:
+            await smtp_pool.close()
+        await auth_http_client.aclose()
+        logger.info("Auth HTTP client closed")
+        try:
+            await dlq_publisher.flush()
+        except RuntimeError as exc:
+            logger.error("DLQ flush on shutdown failed: %s", exc)
         await dlq_producer.stop()
         logger.info("Kafka producer stopped")
         await db_pool.close()
@@ -102,5 +551,13 @@ def main() -> None:
     logger.info("Notification worker main() exited")
 
 
+def run_worker_process(index: int, stats_queue: Any) -> None:
+    """Точка входа дочернего процесса супервизора."""
+    configure_logging()
+    logger.info("Notification worker process #%s starting", index)
+    asyncio.run(app(stats_queue=stats_queue))
+    logger.info("Notification worker process #%s exited", index)
+
+
 if __name__ == "__main__":
     main()
@@ -1,16 +1,29 @@
 from __future__ import annotations
 
 import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence
+from uuid import UUID
 
 from ..auth import AuthClient
+from ..core.metrics import track_stage
+from ..delay import DelayedDeliveryScheduler
 from ..dlq import DlqPublisher
+from ..retry import RetryPublisher
 from ..repositories import (
     TemplateRepository,
+    NotificationDelivery,
     NotificationDeliveryRepository,
 )
 from ..senders import EmailSender, PushSender, WsSender
-from .timing import handle_expiration_if_needed, wait_send_after_if_needed
+from .timing import (
+    handle_expiration_if_needed,
+    send_after_delay_seconds,
+    wait_send_after_if_needed,
+)
+from .rendering import compile_template
 from .retry_engine import attempt_with_retries
+from .status_writer import _ensure_channel
 
 from src.notifications.common.config import Settings
 
@@ -22,6 +35,9 @@ from src.notifications.common.schemas import (
 
 logger = logging.getLogger(__name__)
 
+# handle_job(existing=...) не передан — читаем запись из БД сами
+_NOT_LOADED: Any = object()
+
 
 class JobProcessor:
     """Тонкий оркестратор обработки NotificationJob."""
@@ -36,6 +52,8 @@ class JobProcessor:
         push_sender: PushSender,
         ws_sender: WsSender,
         dlq_publisher: DlqPublisher,
+        delay_scheduler: DelayedDeliveryScheduler | None = None,
+        retry_publisher: RetryPublisher | None = None,
     ) -> None:
         self.settings = settings
         self.template_repo = template_repo
@@ -45,14 +63,40 @@ class JobProcessor:
         self.push_sender = push_sender
         self.ws_sender = ws_sender
         self.dlq = dlq_publisher
+        self.delay_scheduler = delay_scheduler
+        self.retry_publisher = retry_publisher
 
     # -------------------- публичный сценарий --------------------
 
-    async def handle_job(self, job: NotificationJob) -> None:
-        """Главная точка входа. Здесь только сценарий, без деталей."""
-        existing = await self._get_existing(job)
-        if self._should_skip(existing):
-            return
+    async def handle_job(
+        self,
+        job: NotificationJob,
+        *,
+        previous_attempts: int = 0,
+        existing: NotificationDelivery | None = _NOT_LOADED,
+    ) -> None:
+        """Главная точка входа. Здесь только сценарий, без деталей.
+
+        previous_attempts — сколько попыток уже было по данным
+        retry-топика (на случай, если статус в БД ещё не догнал).
+        existing — запись notification_delivery, заранее загруженная
+        через load_existing() для всего батча (None — записи нет).
+        """
+        if self.settings.delivery_claim_enabled:
+            # Заранее загруженная финальная запись — claim не нужен
+            if existing is not _NOT_LOADED and self._should_skip(existing):
+                return
+            # Паркуем до claim, чтобы не держать IN_PROGRESS всё ожидание
+            if await self._park_if_delayed(job):
+                return
+            existing = await self._claim(job)
+            if existing is None:
+                return
+        else:
+            if existing is _NOT_LOADED:
+                existing = await self._get_existing(job)
+            if self._should_skip(existing):
+                return
 
         # 1. Expiration
         expired = await handle_expiration_if_needed(
@@ -64,13 +108,19 @@ class JobProcessor:
             return
 
         # 2. send_after (отложенная отправка)
-        await wait_send_after_if_needed(
-            job=job,
-            max_send_delay_seconds=self.settings.max_send_delay_seconds,
-        )
+        if await self._park_if_delayed(job):
+            return
+        if self.delay_scheduler is None:
+            await wait_send_after_if_needed(
+                job=job,
+                max_send_delay_seconds=self.settings.max_send_delay_seconds,
+            )
 
         # 3. Retry-цикл
-        existing_attempts = existing.attempts if existing else 0
+        existing_attempts = max(
+            existing.attempts if existing else 0,
+            previous_attempts,
+        )
         await attempt_with_retries(
             job=job,
             existing_attempts=existing_attempts,
@@ -79,12 +129,99 @@ class JobProcessor:
             attempt_send_fn=self._attempt_send,
             delivery_repo=self.delivery_repo,
             dlq_publisher=self.dlq,
+            retry_publisher=self.retry_publisher,
+            defer_fn=self._defer_fn(),
         )
 
+    async def load_existing(
+        self,
+        jobs: Sequence[NotificationJob],
+    ) -> dict[UUID, NotificationDelivery]:
+        """Один запрос за записями notification_delivery для батча job'ов."""
+        return await self.delivery_repo.get_by_job_ids(
+            [job.job_id for job in jobs])
+
+    async def prefetch_contacts(self, jobs: Sequence[NotificationJob]) -> None:
+        """Загрузить контакты получателей батча в кеш AuthClient.
+
+        Без кеша контактов смысла нет — _attempt_send всё равно
+        запросит каждого пользователя сам.
+        """
+        if not self.settings.auth_contacts_cache_enabled:
+            return
+        await self.auth_client.get_many_user_contacts(
+            job.user_id for job in jobs)
+
     # -------------------- helpers --------------------
 
     async def _get_existing(self, job: NotificationJob):
-        return await self.delivery_repo.get_by_job_id(job.job_id)
+        with track_stage("delivery_lookup"):
+            return await self.delivery_repo.get_by_job_id(job.job_id)
+
+    async def _claim(self, job: NotificationJob):
+        """Атомарный захват job'а в БД (кросс-воркерная дедупликация)."""
+        with track_stage("delivery_lookup"):
+            claimed = await self.delivery_repo.claim(
+                job_id=job.job_id,
+                user_id=job.user_id,
+                channel=_ensure_channel(job),
+                max_attempts=self.settings.max_attempts,
+                lease_seconds=self.settings.delivery_claim_lease_seconds,
+            )
+        if claimed is None:
+            logger.info(
+                "Job %s is final or claimed by another worker — skipping",
+                job.job_id,
+            )
+        return claimed
+
+    async def _park_if_delayed(self, job: NotificationJob) -> bool:
+        """Паркует job с будущим send_after в DelayedDeliveryScheduler."""
+        if self.delay_scheduler is None:
+            return False
+        if send_after_delay_seconds(job) <= 0:
+            return False
+        # Освобождаем слот; job вернётся в handle_job в срок
+        await self.delay_scheduler.park(job)
+        return True
+
+    def _defer_fn(self):
+        """Куда откладывать job при открытом circuit breaker'е канала.
+
+        Только туда, где ожидание не держит слот воркера: планировщик
+        отложенной доставки или retry-топик. Иначе — None.
+        """
+        if self.delay_scheduler is not None:
+            return self._defer_to_scheduler
+        if (
+            self.retry_publisher is not None
+            and self.settings.retry_delays_seconds
+        ):
+            return self._defer_to_retry_topic
+        return None
+
+    async def _defer_to_scheduler(
+        self,
+        job: NotificationJob,
+        _attempts: int,
+        delay_seconds: float,
+    ) -> None:
+        due_at = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+        await self.delay_scheduler.park(job, due_at=due_at)
+
+    async def _defer_to_retry_topic(
+        self,
+        job: NotificationJob,
+        attempts: int,
+        _delay_seconds: float,
+    ) -> None:
+        # Топики есть только под retry_delays_seconds — берём самый
+        # длинный, а если breaker ещё открыт, job отложится снова
+        await self.retry_publisher.publish_retry(
+            job,
+            attempts=attempts,
+            delay_seconds=max(self.settings.retry_delays_seconds),
+        )
 
     def _should_skip(self, existing) -> bool:
         """Решаем, нужно ли вообще обрабатывать job, если она уже есть в БД."""
@@ -126,32 +263,55 @@ class JobProcessor:
         # Приводим канал к строке, с учётом Enum/str
         channel_str = self._normalize_channel(job.channel)
 
-        # 1. Контакты пользователя
-        contacts = await self.auth_client.get_user_contacts(job.user_id)
-
-        # 2. Шаблон
-        template = await self.template_repo.get_template(
-            template_code=job.template_code,
-            locale=job.locale,
-            channel=channel_str,
-        )
+        # 1. Шаблон
+        with track_stage("template"):
+            template = await self.template_repo.get_template(
+                template_code=job.template_code,
+                locale=job.locale,
+                channel=channel_str,
+            )
         if not template:
             raise RuntimeError(
                 f"Template not found: code={job.template_code} "
                 f"locale={job.locale} channel={channel_str}"
             )
 
-        # 3. Рендер (защита от None в subject)
-        subject_template = template.subject or ""
-        body_template = template.body or ""
-
-        try:
-            subject = subject_template.format(**job.data)
-            body = body_template.format(**job.data)
-        except KeyError as exc:
-            raise RuntimeError(f"Missing var in template: {exc}") from exc
-
-        # 4. Маршрутизация по каналам
+        # 2. Рендер (защита от None в subject). Шаблоны компилируются
+        # один раз; нехватку переменных ловим до похода в Auth
+        with track_stage("render"):
+            subject_template = compile_template(template.subject or "")
+            body_template = compile_template(template.body or "")
+            for compiled in (subject_template, body_template):
+                missing = compiled.missing(job.data)
+                if missing:
+                    raise RuntimeError(
+                        f"Missing var in template: {missing[0]!r}")
+
+            try:
+                subject = subject_template.render(job.data)
+                body = body_template.render(job.data)
+            except KeyError as exc:
+                raise RuntimeError(f"Missing var in template: {exc}") from exc
+
+        # 3. Контакты пользователя
+        with track_stage("contacts"):
+            # ws_session_id в кеше не хранится — для ws берём свежий
+            contacts = await self.auth_client.get_user_contacts(
+                job.user_id, fresh=channel_str == "ws")
+
+        # 4. Отправка
+        with track_stage("send"):
+            await self._send(channel_str, job, contacts, subject, body)
+
+    async def _send(
+        self,
+        channel_str: str,
+        job: NotificationJob,
+        contacts,
+        subject: str,
+        body: str,
+    ) -> None:
+        """Маршрутизация по каналам и вызов sender'а."""
         if channel_str == NotificationChannel.EMAIL.value:
             if not getattr(contacts, "email", None):
                 raise RuntimeError("User has no email")
@@ -160,6 +320,8 @@ class JobProcessor:
                 to=contacts.email,
                 subject=subject,
                 body=body,
+                # Письма кампании одинаковы у всех — можно склеивать
+                batchable=job.meta.campaign_id is not None,
             )
 
         elif channel_str == NotificationChannel.PUSH.value:
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Mapping
+
+_formatter = Formatter()
+
+# "user.name" / "items[0]" → "user"
+_ROOT_NAME = re.compile(r"[^.\[]*")
+
+
+@dataclass(frozen=True)
+class _Field:
+    name: str
+    conversion: str | None
+    format_spec: str
+    # Простое имя без .attr / [idx] — берём значение напрямую из data
+    simple: bool
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Разобранный один раз шаблон str.format.
+
+    parts — чередование литералов и полей, required — имена переменных,
+    которые должны быть в job.data. Для шаблонов с позиционными полями
+    или вложенными спецификаторами ("{x:{width}}") plan не строится,
+    render() делает обычный str.format — результат тот же.
+    """
+
+    source: str
+    parts: tuple[str | _Field, ...]
+    required: frozenset[str]
+    fallback: bool = False
+
+    def missing(self, data: Mapping[str, Any]) -> list[str]:
+        """Переменные шаблона, которых нет в data (отсортированы)."""
+        return sorted(name for name in self.required if name not in data)
+
+    def render(self, data: Mapping[str, Any]) -> str:
+        if self.fallback:
+            return self.source.format(**data)
+
+        out: list[str] = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            if part.simple:
+                value = data[part.name]
+            else:
+                value, _ = _formatter.get_field(part.name, (), data)
+            if part.conversion is not None:
+                value = _formatter.convert_field(value, part.conversion)
+            out.append(format(value, part.format_spec))
+        return "".join(out)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(source: str) -> CompiledTemplate:
+    """Разобрать шаблон в CompiledTemplate (результат кешируется).
+
+    Ошибки синтаксиса шаблона (непарная скобка и т.п.) — ValueError,
+    как и у str.format.
+    """
+    parts: list[str | _Field] = []
+    required: set[str] = set()
+    fallback = False
+
+    for literal, field_name, format_spec, conversion in _formatter.parse(
+        source
+    ):
+        if literal:
+            parts.append(literal)
+        if field_name is None:
+            continue
+
+        root = _ROOT_NAME.match(field_name).group(0)
+        if not root or root.isdigit() or "{" in (format_spec or ""):
+            fallback = True
+        else:
+            required.add(root)
+        parts.append(
+            _Field(
+                name=field_name,
+                conversion=conversion,
+                format_spec=format_spec or "",
+                simple=root == field_name,
+            )
+        )
+
+    return CompiledTemplate(
+        source=source,
+        parts=tuple(parts),
+        required=frozenset(required),
+        fallback=fallback,
+    )
@@ -4,14 +4,20 @@ import asyncio
 import logging
 from typing import Awaitable, Callable, Sequence
 
+from ..core.metrics import SEND_ERRORS_TOTAL
 from ..dlq import DlqPublisher
 from src.notifications.common.schemas import NotificationJob
 from ..repositories import NotificationDeliveryRepository
-from .status_writer import mark_sent, mark_failure
+from ..retry import RetryPublisher
+from ..senders import CircuitOpenError
+from .status_writer import mark_deferred, mark_sent, mark_failure
 
 logger = logging.getLogger(__name__)
 
 AttemptSendFn = Callable[[NotificationJob], Awaitable[None]]
+# defer_fn(job, attempts, delay_seconds) — вернуть job в обработку позже,
+# не держа слот воркера
+DeferFn = Callable[[NotificationJob, int, float], Awaitable[None]]
 
 
 async def attempt_with_retries(
@@ -23,12 +29,19 @@ async def attempt_with_retries(
     attempt_send_fn: AttemptSendFn,
     delivery_repo: NotificationDeliveryRepository,
     dlq_publisher: DlqPublisher,
+    retry_publisher: RetryPublisher | None = None,
+    defer_fn: DeferFn | None = None,
 ) -> None:
     """Глобальный retry-цикл для job'а.
 
     - вызывает attempt_send_fn;
     - пишет статусы через status_writer;
-    - шлёт job в DLQ при окончательной неудаче.
+    - шлёт job в DLQ при окончательной неудаче;
+    - если задан retry_publisher — вместо sleep публикует job
+      в retry-топик и сразу возвращает управление;
+    - CircuitOpenError (провайдер канала недоступен) при заданном
+      defer_fn попыткой не считается: job откладывается через defer_fn.
+      Без defer_fn — обычная неудачная попытка, но без вызова провайдера.
     """
     attempts = existing_attempts
 
@@ -41,6 +54,20 @@ async def attempt_with_retries(
 
         except Exception as exc:
             error = str(exc)
+
+            if isinstance(exc, CircuitOpenError) and defer_fn is not None:
+                attempts -= 1
+                await mark_deferred(
+                    delivery_repo,
+                    job,
+                    attempts=attempts,
+                    reason=error,
+                )
+                await defer_fn(job, attempts, exc.retry_after_seconds)
+                return
+
+            SEND_ERRORS_TOTAL.labels(
+                channel=getattr(job.channel, "value", job.channel)).inc()
             is_last = attempts >= max_attempts
 
             await mark_failure(
@@ -56,6 +83,14 @@ async def attempt_with_retries(
                 return
 
             delay = _get_retry_delay(attempts, retry_delays)
+            if retry_publisher is not None:
+                await retry_publisher.publish_retry(
+                    job,
+                    attempts=attempts,
+                    delay_seconds=delay,
+                )
+                return
+
             logger.info(
                 "Retrying job %s after %.2f sec (attempt %s/%s)",
                 job.job_id,
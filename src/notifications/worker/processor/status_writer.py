@@ -7,6 +7,7 @@ from src.notifications.common.schemas import (
     NotificationStatus,
     NotificationJob,
     NotificationChannel)
+from ..core.metrics import track_stage
 from ..repositories import NotificationDeliveryRepository
 
 logger = logging.getLogger(__name__)
@@ -64,16 +65,17 @@ async def mark_sent(
     job: NotificationJob,
     attempts: int,
 ) -> None:
-    await delivery_repo.save_status(
-        job_id=job.job_id,
-        user_id=job.user_id,
-        channel=_ensure_channel(job),
-        status=NotificationStatus.SENT.value,   # 👈 .value
-        attempts=attempts,
-        error_code=None,
-        error_message=None,
-        sent_at=datetime.now(timezone.utc),
-    )
+    with track_stage("status_write"):
+        await delivery_repo.save_status(
+            job_id=job.job_id,
+            user_id=job.user_id,
+            channel=_ensure_channel(job),
+            status=NotificationStatus.SENT.value,   # 👈 .value
+            attempts=attempts,
+            error_code=None,
+            error_message=None,
+            sent_at=datetime.now(timezone.utc),
+        )
     logger.info("Job %s SENT (attempt %s)", job.job_id, attempts)
 
 
@@ -87,16 +89,17 @@ async def mark_failure(
     status = NotificationStatus.FAILED if final\
         else NotificationStatus.RETRYING
 
-    await delivery_repo.save_status(
-        job_id=job.job_id,
-        user_id=job.user_id,
-        channel=_ensure_channel(job),
-        status=status.value,
-        attempts=attempts,
-        error_code=None,
-        error_message=error,
-        sent_at=None,
-    )
+    with track_stage("status_write"):
+        await delivery_repo.save_status(
+            job_id=job.job_id,
+            user_id=job.user_id,
+            channel=_ensure_channel(job),
+            status=status.value,
+            attempts=attempts,
+            error_code=None,
+            error_message=error,
+            sent_at=None,
+        )
     logger.warning(
         "Job %s %s on attempt %s: %s",
         job.job_id,
@@ -112,14 +115,45 @@ async def mark_expired(
     attempts: int,
     message: str = "Notification expired",
 ) -> None:
-    await delivery_repo.save_status(
-        job_id=job.job_id,
-        user_id=job.user_id,
-        channel=_ensure_channel(job),
-        status=NotificationStatus.EXPIRED.value,
-        attempts=attempts,
-        error_code=None,
-        error_message=message,
-        sent_at=None,
-    )
+    with track_stage("status_write"):
+        await delivery_repo.save_status(
+            job_id=job.job_id,
+            user_id=job.user_id,
+            channel=_ensure_channel(job),
+            status=NotificationStatus.EXPIRED.value,
+            attempts=attempts,
+            error_code=None,
+            error_message=message,
+            sent_at=None,
+        )
     logger.warning("Job %s EXPIRED (attempts=%s)", job.job_id, attempts)
+
+
+async def mark_deferred(
+    delivery_repo: NotificationDeliveryRepository,
+    job: NotificationJob,
+    attempts: int,
+    reason: str,
+) -> None:
+    """Job отложен без попытки отправки (например, канал в circuit open).
+
+    attempts не увеличиваем; RETRYING снимает IN_PROGRESS-захват, чтобы
+    вернувшийся job смог снова сделать claim.
+    """
+    with track_stage("status_write"):
+        await delivery_repo.save_status(
+            job_id=job.job_id,
+            user_id=job.user_id,
+            channel=_ensure_channel(job),
+            status=NotificationStatus.RETRYING.value,
+            attempts=attempts,
+            error_code=None,
+            error_message=reason,
+            sent_at=None,
+        )
+    logger.info(
+        "Job %s deferred (attempts=%s): %s",
+        job.job_id,
+        attempts,
+        reason,
+    )
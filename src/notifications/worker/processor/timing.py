@@ -40,28 +40,43 @@ async def handle_expiration_if_needed(
     return True
 
 
+def send_after_delay_seconds(job: NotificationJob) -> float:
+    """Сколько секунд осталось до send_after (0, если ждать не нужно)."""
+    if not job.send_after:
+        return 0.0
+
+    now = datetime.now(timezone.utc)
+    target = job.send_after.astimezone(timezone.utc)
+    return max((target - now).total_seconds(), 0.0)
+
+
 async def wait_send_after_if_needed(
     job: NotificationJob,
     max_send_delay_seconds: int,
 ) -> None:
     """Обрабатывает send_after:
      ждёт до нужного момента
-      (но не больше max_send_delay)."""
-    if not job.send_after:
-        return
-
-    now = datetime.now(timezone.utc)
-    target = job.send_after.astimezone(timezone.utc)
+      (но не больше max_send_delay).
 
-    if target <= now:
+    Используется, только если DelayedDeliveryScheduler выключен.
+    """
+    delay = send_after_delay_seconds(job)
+    if delay <= 0:
         return
 
-    delay = (target - now).total_seconds()
-    delay = min(delay, float(max_send_delay_seconds))
+    if delay > max_send_delay_seconds:
+        logger.warning(
+            "Job %s send_after is %.2f sec away, capping wait to %s sec "
+            "(enable delayed delivery to honour it)",
+            job.job_id,
+            delay,
+            max_send_delay_seconds,
+        )
+        delay = float(max_send_delay_seconds)
 
     if delay <= 0:
         return
 
     logger.info("Delaying job %s for %.2f sec until %s",
-                job.job_id, delay, target)
+                job.job_id, delay, job.send_after)
     await asyncio.sleep(delay)
@@ -1,11 +1,21 @@
 from .template_repo import TemplateRepository, Template
+from .template_cache import CachedTemplateRepository, TemplateChangeListener
 from .notification_delivery_repo import (
     NotificationDeliveryRepository,
-    NotificationDelivery)
+    NotificationDelivery,
+    DeliveryStatusUpdate)
+from .buffered_delivery_repo import BufferedNotificationDeliveryRepository
+from .delayed_job_repo import DelayedJobRepository, DelayedJob
 
 __all__ = [
     "TemplateRepository",
     "Template",
+    "CachedTemplateRepository",
+    "TemplateChangeListener",
     "NotificationDeliveryRepository",
     "NotificationDelivery",
+    "DeliveryStatusUpdate",
+    "BufferedNotificationDeliveryRepository",
+    "DelayedJobRepository",
+    "DelayedJob",
 ]
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+
+from .notification_delivery_repo import (
+    DeliveryStatusUpdate,
+    NotificationDelivery,
+    NotificationDeliveryRepository,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedNotificationDeliveryRepository:
+    """Write-behind обёртка над NotificationDeliveryRepository.
+
+    save_status() только кладёт строку в буфер; повторные обновления
+    одного job_id схлопываются (остаётся последнее). Буфер сбрасывается
+    одним multi-row upsert'ом, когда набирается max_batch_size строк
+    или проходит flush_interval_seconds, а также на close().
+
+    get_by_job_id() сначала смотрит в буфер, чтобы воркер видел
+    собственные ещё не записанные статусы.
+    """
+
+    def __init__(
+        self,
+        repo: NotificationDeliveryRepository,
+        *,
+        max_batch_size: int,
+        flush_interval_seconds: float,
+    ) -> None:
+        self._repo = repo
+        self._max_batch_size = max_batch_size
+        self._flush_interval_seconds = flush_interval_seconds
+        self._pending: dict[UUID, DeliveryStatusUpdate] = {}
+        # строки, которые прямо сейчас пишутся в БД
+        self._flushing: dict[UUID, DeliveryStatusUpdate] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        self._flush_task = asyncio.create_task(
+            self._flush_loop(), name="delivery-status-flush")
+
+    async def close(self) -> None:
+        """Остановить фоновый flush и записать всё, что осталось."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+    async def get_by_job_id(
+            self,
+            job_id: UUID) -> Optional[NotificationDelivery]:
+        pending = self._pending.get(job_id) or self._flushing.get(job_id)
+        if pending is not None:
+            return _to_delivery(pending)
+        return await self._repo.get_by_job_id(job_id)
+
+    async def get_by_job_ids(
+            self,
+            job_ids: Sequence[UUID]) -> dict[UUID, NotificationDelivery]:
+        result: dict[UUID, NotificationDelivery] = {}
+        missing: list[UUID] = []
+        for job_id in job_ids:
+            pending = self._pending.get(job_id) or self._flushing.get(job_id)
+            if pending is not None:
+                result[job_id] = _to_delivery(pending)
+            else:
+                missing.append(job_id)
+        if missing:
+            result.update(await self._repo.get_by_job_ids(missing))
+        return result
+
+    async def claim(
+        self,
+        *,
+        job_id: UUID,
+        user_id: UUID,
+        channel: str,
+        max_attempts: int,
+        lease_seconds: float,
+    ) -> Optional[NotificationDelivery]:
+        # claim решает по состоянию в БД — несохранённый статус этого
+        # job'а нужно сначала записать
+        if job_id in self._pending or job_id in self._flushing:
+            await self.flush()
+        return await self._repo.claim(
+            job_id=job_id,
+            user_id=user_id,
+            channel=channel,
+            max_attempts=max_attempts,
+            lease_seconds=lease_seconds,
+        )
+
+    async def save_status(
+        self,
+        *,
+        job_id: UUID,
+        user_id: UUID,
+        channel: str,
+        status: str,
+        attempts: int,
+        error_code: Optional[str],
+        error_message: Optional[str],
+        sent_at: Optional[datetime],
+    ) -> None:
+        self._pending[job_id] = DeliveryStatusUpdate(
+            job_id=job_id,
+            user_id=user_id,
+            channel=channel,
+            status=status,
+            attempts=attempts,
+            error_code=error_code,
+            error_message=error_message,
+            sent_at=sent_at,
+        )
+        if len(self._pending) >= self._max_batch_size:
+            try:
+                await self.flush()
+            except Exception:
+                # Строки остались в буфере, их запишет фоновый flush.
+                # Ошибку не пробрасываем: она попала бы в mark_sent
+                # чужого job'а, и retry-цикл отправил бы его повторно
+                logger.exception(
+                    "Failed to flush %s delivery statuses, will retry",
+                    len(self._pending),
+                )
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            try:
+                await self._repo.save_statuses(list(batch.values()))
+            except Exception:
+                # Возвращаем строки в буфер, не затирая более свежие
+                for job_id, update in batch.items():
+                    self._pending.setdefault(job_id, update)
+                raise
+            finally:
+                self._flushing = {}
+            logger.debug("Flushed %s delivery statuses", len(batch))
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception(
+                    "Failed to flush %s delivery statuses, will retry",
+                    len(self._pending),
+                )
+
+
+def _to_delivery(update: DeliveryStatusUpdate) -> NotificationDelivery:
+    return NotificationDelivery(
+        job_id=update.job_id,
+        user_id=update.user_id,
+        status=update.status,
+        attempts=update.attempts,
+        error_message=update.error_message,
+        sent_at=update.sent_at,
+    )
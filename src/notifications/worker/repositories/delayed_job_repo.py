@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+from uuid import UUID
+
+import asyncpg
+
+
+@dataclass
+class DelayedJob:
+    job_id: UUID
+    due_at: datetime
+    payload: str
+
+
+class DelayedJobRepository:
+    """Работа с таблицей delayed_jobs (долгие отложенные отправки)."""
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self._pool = pool
+
+    async def save_many(
+        self,
+        jobs: Sequence[DelayedJob],
+        *,
+        lease_seconds: float | None = None,
+    ) -> None:
+        """Upsert по job_id: повторная парковка просто сдвигает due_at.
+
+        lease_seconds — строки сразу арендованы вызывающим (job лежит у
+        него в памяти) до due_at + lease_seconds; None — аренды нет.
+        """
+        if not jobs:
+            return
+        query = """
+            INSERT INTO delayed_jobs (job_id, due_at, payload, claimed_until)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (job_id) DO UPDATE
+            SET
+                due_at = EXCLUDED.due_at,
+                payload = EXCLUDED.payload,
+                claimed_until = EXCLUDED.claimed_until
+        """
+        now = datetime.now(timezone.utc)
+        rows = [
+            (
+                j.job_id,
+                j.due_at,
+                j.payload,
+                None if lease_seconds is None
+                else max(j.due_at, now) + timedelta(seconds=lease_seconds),
+            )
+            for j in jobs
+        ]
+        async with self._pool.acquire() as conn:
+            await conn.executemany(query, rows)
+
+    async def claim_due(
+        self,
+        until: datetime,
+        limit: int,
+        lease_seconds: float,
+    ) -> list[DelayedJob]:
+        """Арендовать и вернуть job'ы с due_at <= until.
+
+        Строка не удаляется: аренда (claimed_until) истекает через
+        lease_seconds после due_at, и если воркер упал, не отдав job,
+        его заберёт следующий poll. SKIP LOCKED позволяет нескольким
+        воркерам разбирать таблицу параллельно.
+        """
+        query = """
+            UPDATE delayed_jobs
+            SET claimed_until = greatest(due_at, now())
+                + make_interval(secs => $3)
+            WHERE job_id IN (
+                SELECT job_id
+                FROM delayed_jobs
+                WHERE due_at <= $1
+                  AND (claimed_until IS NULL OR claimed_until < now())
+                ORDER BY due_at
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING job_id, due_at, payload;
+        """
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(query, until, limit, float(lease_seconds))
+
+        return [
+            DelayedJob(
+                job_id=row["job_id"],
+                due_at=row["due_at"],
+                payload=row["payload"],
+            )
+            for row in rows
+        ]
+
+    async def delete_many(
+        self,
+        keys: Sequence[tuple[UUID, datetime]],
+    ) -> None:
+        """Удалить отданные в обработку job'ы по (job_id, due_at).
+
+        Если job за это время отложили заново (due_at сдвинулся), строка
+        остаётся.
+        """
+        if not keys:
+            return
+        query = """
+            DELETE FROM delayed_jobs AS d
+            USING unnest($1::uuid[], $2::timestamptz[]) AS k(job_id, due_at)
+            WHERE d.job_id = k.job_id AND d.due_at = k.due_at
+        """
+        async with self._pool.acquire() as conn:
+            await conn.execute(
+                query,
+                [job_id for job_id, _ in keys],
+                [due_at for _, due_at in keys],
+            )
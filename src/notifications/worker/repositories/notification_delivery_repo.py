@@ -2,11 +2,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
 from uuid import UUID
 
 import asyncpg
 
+from src.notifications.common.schemas import NotificationStatus
+
 
 @dataclass
 class NotificationDelivery:
@@ -18,6 +20,19 @@ class NotificationDelivery:
     sent_at: Optional[datetime]
 
 
+@dataclass
+class DeliveryStatusUpdate:
+    """Одна строка для upsert'а в notification_delivery."""
+    job_id: UUID
+    user_id: UUID
+    channel: str
+    status: str
+    attempts: int
+    error_code: Optional[str]
+    error_message: Optional[str]
+    sent_at: Optional[datetime]
+
+
 class NotificationDeliveryRepository:
     """Работа с таблицей notification_delivery."""
 
@@ -38,14 +53,85 @@ class NotificationDeliveryRepository:
         if row is None:
             return None
 
-        return NotificationDelivery(
-            job_id=row["job_id"],
-            user_id=row["user_id"],
-            status=row["status"],
-            attempts=row["attempts"],
-            error_message=row["error_message"],
-            sent_at=row["sent_at"],
-        )
+        return _row_to_delivery(row)
+
+    async def get_by_job_ids(
+            self,
+            job_ids: Sequence[UUID]) -> dict[UUID, NotificationDelivery]:
+        """Все существующие записи для пачки job_id за один запрос."""
+        if not job_ids:
+            return {}
+        query = """
+            SELECT job_id, user_id, status, attempts, error_message, sent_at
+            FROM notification_delivery
+            WHERE job_id = ANY($1::uuid[]);
+        """
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(query, list(job_ids))
+
+        return {row["job_id"]: _row_to_delivery(row) for row in rows}
+
+    async def claim(
+        self,
+        *,
+        job_id: UUID,
+        user_id: UUID,
+        channel: str,
+        max_attempts: int,
+        lease_seconds: float,
+    ) -> Optional[NotificationDelivery]:
+        """Атомарно захватить job: insert/update в IN_PROGRESS + RETURNING.
+
+        Возвращает запись (уже в статусе IN_PROGRESS, attempts сохранены),
+        если job можно обрабатывать, и None, если он уже финальный
+        (SENT; FAILED/EXPIRED при attempts >= max_attempts) или его
+        прямо сейчас держит другой воркер (IN_PROGRESS моложе lease_seconds).
+        Один запрос вместо get_by_job_id + проверки в Python, без гонки
+        между воркерами, получившими один и тот же job.
+        """
+        query = """
+            INSERT INTO notification_delivery (
+                job_id,
+                user_id,
+                channel,
+                status,
+                attempts
+            )
+            VALUES ($1, $2, $3, $4, 0)
+            ON CONFLICT (job_id) DO UPDATE
+            SET
+                status = EXCLUDED.status,
+                updated_at = now()
+            WHERE notification_delivery.status <> $5
+              AND NOT (
+                  notification_delivery.status IN ($6, $7)
+                  AND notification_delivery.attempts >= $8
+              )
+              AND NOT (
+                  notification_delivery.status = $4
+                  AND notification_delivery.updated_at
+                      > now() - make_interval(secs => $9)
+              )
+            RETURNING job_id, user_id, status, attempts,
+                      error_message, sent_at;
+        """
+        async with self._pool.acquire() as conn:
+            row = await conn.fetchrow(
+                query,
+                job_id,
+                user_id,
+                channel,
+                NotificationStatus.IN_PROGRESS.value,
+                NotificationStatus.SENT.value,
+                NotificationStatus.FAILED.value,
+                NotificationStatus.EXPIRED.value,
+                max_attempts,
+                float(lease_seconds),
+            )
+
+        if row is None:
+            return None
+        return _row_to_delivery(row)
 
     async def save_status(
         self,
@@ -97,3 +183,68 @@ class NotificationDeliveryRepository:
                 error_message,
                 sent_at,
             )
+
+    async def save_statuses(
+        self,
+        updates: Sequence[DeliveryStatusUpdate],
+    ) -> None:
+        """Multi-row upsert за один round-trip (unnest массивов).
+
+        job_id в updates должны быть уникальны: Postgres не даёт
+        обновить одну строку дважды в рамках одного ON CONFLICT.
+        """
+        if not updates:
+            return
+        query = """
+            INSERT INTO notification_delivery (
+                job_id,
+                user_id,
+                channel,
+                status,
+                attempts,
+                error_code,
+                error_message,
+                sent_at
+            )
+            SELECT * FROM unnest(
+                $1::uuid[],
+                $2::uuid[],
+                $3::text[],
+                $4::text[],
+                $5::int[],
+                $6::text[],
+                $7::text[],
+                $8::timestamptz[]
+            )
+            ON CONFLICT (job_id) DO UPDATE
+            SET
+                status = EXCLUDED.status,
+                attempts = EXCLUDED.attempts,
+                error_code = EXCLUDED.error_code,
+                error_message = EXCLUDED.error_message,
+                sent_at = EXCLUDED.sent_at,
+                updated_at = now()
+        """
+        async with self._pool.acquire() as conn:
+            await conn.execute(
+                query,
+                [u.job_id for u in updates],
+                [u.user_id for u in updates],
+                [u.channel for u in updates],
+                [u.status for u in updates],
+                [u.attempts for u in updates],
+                [u.error_code for u in updates],
+                [u.error_message for u in updates],
+                [u.sent_at for u in updates],
+            )
+
+
+def _row_to_delivery(row: asyncpg.Record) -> NotificationDelivery:
+    return NotificationDelivery(
+        job_id=row["job_id"],
+        user_id=row["user_id"],
+        status=row["status"],
+        attempts=row["attempts"],
+        error_message=row["error_message"],
+        sent_at=row["sent_at"],
+    )
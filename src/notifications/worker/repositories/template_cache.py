@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Optional
+
+import asyncpg
+
+from ..core.cache import MISSING, TTLCache
+from .template_repo import Template, TemplateRepository
+
+logger = logging.getLogger(__name__)
+
+TemplateKey = tuple[str, str, str]
+
+
+class CachedTemplateRepository:
+    """Кеш шаблонов поверх TemplateRepository.
+
+    Ключ — (template_code, locale, channel). Кешируется и отсутствие
+    шаблона, чтобы job'ы с опечаткой в коде не ходили в БД каждый раз.
+    Свежесть держится двумя механизмами: TTL и инвалидация по
+    Postgres NOTIFY (см. TemplateChangeListener).
+
+    invalidate()/clear() увеличивают поколение ключа (или всего кеша):
+    если оно сменилось, пока шаблон читался из БД, прочитанное может
+    быть старой версией, и в кеш оно не кладётся.
+    """
+
+    def __init__(
+        self,
+        repo: TemplateRepository,
+        *,
+        max_size: int,
+        ttl_seconds: float,
+    ) -> None:
+        self._repo = repo
+        self._cache: TTLCache[TemplateKey, Optional[Template]] = TTLCache(
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+        )
+        # поколение всего кеша (clear) и отдельных ключей (invalidate)
+        self._epoch = 0
+        self._generations: dict[TemplateKey, int] = {}
+
+    async def get_template(
+        self,
+        template_code: str,
+        locale: str,
+        channel: str,
+    ) -> Optional[Template]:
+        key = (template_code, locale, channel)
+        cached = self._cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        generation = self._generation(key)
+        template = await self._repo.get_template(
+            template_code=template_code,
+            locale=locale,
+            channel=channel,
+        )
+        if self._generation(key) == generation:
+            self._cache.set(key, template)
+        return template
+
+    async def warm(self) -> int:
+        """Загрузить все шаблоны в кеш одним запросом."""
+        epoch, generations = self._epoch, dict(self._generations)
+        templates = await self._repo.list_templates()
+        for tpl in templates:
+            key = (tpl.template_code, tpl.locale, tpl.channel)
+            if (self._epoch, self._generations.get(key)) == (
+                epoch, generations.get(key),
+            ):
+                self._cache.set(key, tpl)
+        logger.info("Template cache warmed with %s templates", len(templates))
+        return len(templates)
+
+    def invalidate(
+        self,
+        template_code: str,
+        locale: str,
+        channel: str,
+    ) -> None:
+        key = (template_code, locale, channel)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.invalidate(key)
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._generations.clear()
+        self._cache.clear()
+
+    def stats(self) -> dict[str, float]:
+        return self._cache.stats()
+
+    def _generation(self, key: TemplateKey) -> tuple[int, int]:
+        return self._epoch, self._generations.get(key, 0)
+
+
+class TemplateChangeListener:
+    """LISTEN на канал изменений шаблонов и инвалидация кеша.
+
+    API делает pg_notify(<канал>, '{"template_code": ..., "locale": ...,
+    "channel": ...}') в той же транзакции, что и create/update шаблона.
+    Слушаем на отдельном соединении (не из пула). Если соединение
+    оборвалось — сбрасываем кеш целиком (уведомления могли потеряться)
+    и переподключаемся.
+    """
+
+    def __init__(
+        self,
+        *,
+        dsn: str,
+        channel: str,
+        cache: CachedTemplateRepository,
+        reconnect_delay_seconds: float = 5.0,
+    ) -> None:
+        self._dsn = dsn
+        self._channel = channel
+        self._cache = cache
+        self._reconnect_delay_seconds = reconnect_delay_seconds
+        self._task: asyncio.Task | None = None
+        # LISTEN оформлен (или первая попытка не удалась)
+        self._ready = asyncio.Event()
+
+    async def start(self) -> None:
+        """Запустить слушателя и дождаться первой попытки LISTEN.
+
+        Вызывать до warm() кеша: изменения шаблонов, сделанные во время
+        прогрева, тогда не потеряются. Если первая попытка не удалась,
+        переподключение идёт в фоне и при успехе сбросит кеш.
+        """
+        self._task = asyncio.create_task(
+            self._run(), name="template-change-listener")
+        ready = asyncio.create_task(self._ready.wait())
+        try:
+            await asyncio.wait(
+                {ready, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            ready.cancel()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except (
+                OSError,
+                asyncpg.PostgresError,
+                asyncpg.InterfaceError,
+            ) as exc:
+                logger.warning(
+                    "Template change listener failed: %s,"
+                    " reconnecting in %s s",
+                    exc,
+                    self._reconnect_delay_seconds,
+                )
+            self._ready.set()
+            self._cache.clear()
+            await asyncio.sleep(self._reconnect_delay_seconds)
+
+    async def _listen_once(self) -> None:
+        conn = await asyncpg.connect(dsn=self._dsn)
+        closed = asyncio.Event()
+        conn.add_termination_listener(lambda _conn: closed.set())
+        try:
+            await conn.add_listener(self._channel, self._on_notify)
+            self._ready.set()
+            logger.info("Listening for template changes on %r", self._channel)
+            await closed.wait()
+            logger.warning("Template change listener connection closed")
+        finally:
+            if not conn.is_closed():
+                await conn.close()
+
+    def _on_notify(
+        self,
+        _conn,
+        _pid: int,
+        _channel: str,
+        payload: str,
+    ) -> None:
+        try:
+            data = json.loads(payload)
+            key = (data["template_code"], data["locale"], data["channel"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(
+                "Malformed template change payload %r, clearing cache",
+                payload,
+            )
+            self._cache.clear()
+            return
+
+        self._cache.invalidate(*key)
+        logger.info("Template cache invalidated for %s", key)
@@ -41,10 +41,25 @@ class TemplateRepository:
         if row is None:
             return None
 
-        return Template(
-            template_code=row["template_code"],
-            locale=row["locale"],
-            channel=row["channel"],
-            subject=row["subject"],
-            body=row["body"],
-        )
+        return _row_to_template(row)
+
+    async def list_templates(self) -> list[Template]:
+        """Все шаблоны — для прогрева кеша на старте воркера."""
+        query = """
+            SELECT template_code, locale, channel, subject, body
+            FROM templates;
+        """
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(query)
+
+        return [_row_to_template(row) for row in rows]
+
+
+def _row_to_template(row: asyncpg.Record) -> Template:
+    return Template(
+        template_code=row["template_code"],
+        locale=row["locale"],
+        channel=row["channel"],
+        subject=row["subject"],
+        body=row["body"],
+    )
@@ -0,0 +1,11 @@
+from .publisher import (
+    RetryPublisher,
+    RETRY_ATTEMPTS_HEADER,
+    RETRY_NOT_BEFORE_HEADER,
+)
+
+__all__ = [
+    "RetryPublisher",
+    "RETRY_ATTEMPTS_HEADER",
+    "RETRY_NOT_BEFORE_HEADER",
+]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from aiokafka import AIOKafkaProducer
+
+from src.notifications.common.schemas import NotificationJob
+from src.notifications.common.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Заголовки retry-сообщений
+RETRY_ATTEMPTS_HEADER = "x-retry-attempts"
+RETRY_NOT_BEFORE_HEADER = "x-retry-not-before-ms"
+
+
+class RetryPublisher:
+    """Публикация job'а в retry-топик вместо asyncio.sleep в воркере.
+
+    Топик выбирается по задержке (notifications.retry.1s/3s/10s),
+    номер попытки и момент, раньше которого job нельзя брать,
+    передаются в заголовках.
+    """
+
+    def __init__(self, settings: Settings, producer: AIOKafkaProducer) -> None:
+        self._settings = settings
+        self._producer = producer
+
+    async def publish_retry(
+        self,
+        job: NotificationJob,
+        attempts: int,
+        delay_seconds: float,
+    ) -> None:
+        topic = self._settings.retry_topic_for_delay(delay_seconds)
+        not_before_ms = int((time.time() + delay_seconds) * 1000)
+        headers = [
+            (RETRY_ATTEMPTS_HEADER, str(attempts).encode("ascii")),
+            (RETRY_NOT_BEFORE_HEADER, str(not_before_ms).encode("ascii")),
+        ]
+
+        logger.info(
+            "Publishing job %s to retry topic=%s (attempt %s, delay %.2f sec)",
+            job.job_id,
+            topic,
+            attempts,
+            delay_seconds,
+        )
+
+        await self._producer.send_and_wait(
+            topic=topic,
+            key=str(job.job_id).encode("utf-8"),
+            value=job.model_dump_json().encode("utf-8"),
+            headers=headers,
+        )
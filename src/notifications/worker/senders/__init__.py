@@ -1,6 +1,23 @@
+from .email_batch import EmailBatcher, RecipientRefusedError
 from .email_sender import EmailSender
 from .push_sender import PushSender
 from .ws_sender import WsSender
 from .base import BaseSender
+from .smtp_pool import SmtpConnectionPool
+from .limits import ChannelLimiter, TokenBucket
+from .circuit_breaker import BreakerSender, CircuitBreaker, CircuitOpenError
 
-__all__ = ["EmailSender", "PushSender", "WsSender", "BaseSender"]
+__all__ = [
+    "EmailSender",
+    "PushSender",
+    "WsSender",
+    "BaseSender",
+    "SmtpConnectionPool",
+    "EmailBatcher",
+    "ChannelLimiter",
+    "TokenBucket",
+    "RecipientRefusedError",
+    "BreakerSender",
+    "CircuitBreaker",
+    "CircuitOpenError",
+]
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Канал временно отключён: провайдер недоступен.
+
+    retry_after_seconds — через сколько breaker пропустит пробный вызов.
+    """
+
+    def __init__(self, channel: str, retry_after_seconds: float) -> None:
+        super().__init__(
+            f"Circuit open for channel {channel}, "
+            f"retry after {retry_after_seconds:.1f} sec"
+        )
+        self.channel = channel
+        self.retry_after_seconds = retry_after_seconds
+
+
+class CircuitBreaker:
+    """Circuit breaker канала отправки: closed → open → half-open.
+
+    - closed: вызовы идут, исходы последних window_size вызовов копятся;
+      когда вызовов не меньше min_calls и доля ошибок достигла
+      failure_rate_threshold — переходим в open;
+    - open: вызовы сразу отбиваются CircuitOpenError (без таймаутов
+      на мёртвом провайдере), через open_seconds — half-open;
+    - half-open: пропускаем до half_open_probes пробных вызовов; ошибка
+      любого — снова open, все пробы успешны — closed с чистым окном.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        *,
+        window_size: int = 20,
+        min_calls: int = 10,
+        failure_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.channel = channel
+        self._window: deque[bool] = deque(maxlen=window_size)
+        self._min_calls = min_calls
+        self._threshold = failure_rate_threshold
+        self._open_seconds = open_seconds
+        self._half_open_probes = half_open_probes
+        self._clock = clock
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._retry_after() <= 0:
+            return HALF_OPEN
+        return self._state
+
+    def before_call(self) -> None:
+        """Разрешить вызов или бросить CircuitOpenError."""
+        if self._state == OPEN:
+            retry_after = self._retry_after()
+            if retry_after > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.channel, retry_after)
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info("Circuit for %s is half-open, probing", self.channel)
+
+        if self._state == HALF_OPEN:
+            if self._probes_in_flight >= self._half_open_probes:
+                self.rejected += 1
+                raise CircuitOpenError(self.channel, self._open_seconds)
+            self._probes_in_flight += 1
+
+    def record_success(self) -> None:
+        if self._state == HALF_OPEN:
+            self._probes_in_flight -= 1
+            self._probe_successes += 1
+            if self._probe_successes >= self._half_open_probes:
+                self._state = CLOSED
+                self._window.clear()
+                logger.info("Circuit for %s closed", self.channel)
+            return
+        self._window.append(True)
+
+    def record_failure(self) -> None:
+        if self._state == HALF_OPEN:
+            self._probes_in_flight -= 1
+            self._open()
+            return
+        self._window.append(False)
+        calls = len(self._window)
+        failures = calls - sum(self._window)
+        if calls >= self._min_calls and failures / calls >= self._threshold:
+            self._open()
+
+    def release(self) -> None:
+        """Вызов не завершился (отмена) — освободить пробный слот."""
+        if self._state == HALF_OPEN:
+            self._probes_in_flight -= 1
+
+    def stats(self) -> dict[str, Any]:
+        calls = len(self._window)
+        return {
+            "state": self.state,
+            "failure_rate": (
+                (calls - sum(self._window)) / calls if calls else 0.0),
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._window.clear()
+        self.opened += 1
+        logger.warning(
+            "Circuit for %s opened for %.1f sec",
+            self.channel,
+            self._open_seconds,
+        )
+
+    def _retry_after(self) -> float:
+        return self._opened_at + self._open_seconds - self._clock()
+
+
+class BreakerSender:
+    """Обёртка над sender'ом: send() через CircuitBreaker канала.
+
+    Ошибки «плохого адреса» (ValueError от sender'ов, отказ сервера по
+    конкретному получателю) провайдера не характеризуют и в долю
+    ошибок не идут.
+    """
+
+    def __init__(
+        self,
+        sender: Any,
+        breaker: CircuitBreaker,
+        ignored_errors: tuple[type[BaseException], ...] = (ValueError,),
+    ) -> None:
+        self._sender = sender
+        self.breaker = breaker
+        self._ignored_errors = ignored_errors
+
+    async def send(self, **kwargs: Any) -> None:
+        self.breaker.before_call()
+        try:
+            await self._sender.send(**kwargs)
+        except self._ignored_errors:
+            self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
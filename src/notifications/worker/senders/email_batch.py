@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Mapping, Sequence
+
+logger = logging.getLogger(__name__)
+
+# send_batch(subject, body, recipients) -> {recipient: причина отказа}
+SendBatchFn = Callable[
+    [str, str, Sequence[str]], Awaitable[Mapping[str, str]]
+]
+
+
+class RecipientRefusedError(RuntimeError):
+    """Сервер отказал конкретному получателю (остальные письма ушли)."""
+
+
+@dataclass
+class _Group:
+    subject: str
+    body: str
+    waiters: list[tuple[str, asyncio.Future]] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class EmailBatcher:
+    """Склейка одинаковых писем в одну SMTP-транзакцию.
+
+    Письма с одинаковыми subject и body, пришедшие в течение window_seconds,
+    уходят одним сообщением с несколькими RCPT TO (не больше
+    max_recipients). Каждый вызывающий ждёт свой future и получает
+    результат по своему адресу: отказ сервера для конкретного
+    получателя — RecipientRefusedError только у него, ошибка всей
+    транзакции — у всех job'ов группы.
+    """
+
+    def __init__(
+        self,
+        send_batch: SendBatchFn,
+        *,
+        window_seconds: float,
+        max_recipients: int,
+    ) -> None:
+        if max_recipients < 1:
+            raise ValueError("max_recipients must be >= 1")
+        self._send_batch = send_batch
+        self._window_seconds = window_seconds
+        self._max_recipients = max_recipients
+        self._groups: dict[tuple[str, str], _Group] = {}
+        self._flushing: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.recipients = 0
+
+    async def send(self, *, to: str, subject: str, body: str) -> None:
+        key = (subject, body)
+        group = self._groups.get(key)
+        if group is None:
+            group = _Group(subject=subject, body=body)
+            self._groups[key] = group
+            group.timer = asyncio.get_running_loop().call_later(
+                self._window_seconds, self._start_flush, key)
+
+        future = asyncio.get_running_loop().create_future()
+        group.waiters.append((to, future))
+        if len(group.waiters) >= self._max_recipients:
+            self._start_flush(key)
+
+        await future
+
+    async def close(self) -> None:
+        """Отправить всё накопленное (при остановке воркера)."""
+        for key in list(self._groups):
+            self._start_flush(key)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "pending_groups": len(self._groups),
+            "batches": self.batches,
+            "recipients": self.recipients,
+        }
+
+    def _start_flush(self, key: tuple[str, str]) -> None:
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+        task = asyncio.create_task(self._flush(group))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, group: _Group) -> None:
+        # Один адрес может прийти от нескольких job'ов — RCPT TO один раз
+        recipients = list(dict.fromkeys(to for to, _ in group.waiters))
+        self.batches += 1
+        self.recipients += len(recipients)
+
+        try:
+            refused = await self._send_batch(
+                group.subject, group.body, recipients)
+        except Exception as exc:
+            logger.warning(
+                "Batched email to %s recipients failed: %s",
+                len(recipients),
+                exc,
+            )
+            for _, future in group.waiters:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for to, future in group.waiters:
+            if future.done():
+                continue
+            if to in refused:
+                future.set_exception(RecipientRefusedError(
+                    f"Recipient {to} refused: {refused[to]}"))
+            else:
+                future.set_result(None)
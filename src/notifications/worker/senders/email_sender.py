@@ -1,24 +1,94 @@
+from typing import Mapping, Sequence
+
 import aiosmtplib
 from email.mime.text import MIMEText
 
+from .email_batch import EmailBatcher
+from .smtp_pool import SmtpConnectionPool
+
+
 class EmailSender:
-    def __init__(self, host: str, port: int, sender: str):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        pool: SmtpConnectionPool | None = None,
+        batch_window_seconds: float | None = None,
+        batch_max_recipients: int = 50,
+    ):
         self.host = host
         self.port = port
         self.sender = sender
+        # Без пула — отдельное SMTP-соединение на каждое письмо
+        self.pool = pool
+        # batch_window_seconds=None — склейка писем выключена
+        self.batcher: EmailBatcher | None = None
+        if batch_window_seconds is not None:
+            self.batcher = EmailBatcher(
+                self._send_batch,
+                window_seconds=batch_window_seconds,
+                max_recipients=batch_max_recipients,
+            )
+
+    async def send(
+        self,
+        to: str,
+        subject: str,
+        body: str,
+        batchable: bool = False,
+    ) -> None:
+        """Отправляет письмо через локальный SMTP (Mailpit).
+
+        batchable=True — письмо можно отправить одной транзакцией с
+        другими такими же (рассылки кампаний), см. EmailBatcher.
+        """
+        if batchable and self.batcher is not None:
+            await self.batcher.send(to=to, subject=subject, body=body)
+            return
 
-    async def send(self, to: str, subject: str, body: str) -> None:
-        """Отправляет письмо через локальный SMTP (Mailpit)."""
+        msg = self._build_message(subject, body, to)
+        await self._send_message(msg, [to])
 
+    def stats(self) -> dict[str, float]:
+        if self.batcher is None:
+            return {}
+        return self.batcher.stats()
+
+    async def close(self) -> None:
+        if self.batcher is not None:
+            await self.batcher.close()
+
+    async def _send_batch(
+        self,
+        subject: str,
+        body: str,
+        recipients: Sequence[str],
+    ) -> Mapping[str, str]:
+        # Адреса только в конверте (RCPT TO), получатели не видят друг друга
+        msg = self._build_message(subject, body, "undisclosed-recipients:;")
+        refused, _ = await self._send_message(msg, recipients)
+        return {to: str(response) for to, response in refused.items()}
+
+    def _build_message(self, subject: str, body: str, to: str) -> MIMEText:
         msg = MIMEText(body, "html")
         msg["Subject"] = subject
         msg["From"] = self.sender
         msg["To"] = to
+        return msg
+
+    async def _send_message(self, msg: MIMEText, recipients: Sequence[str]):
+        if self.pool is not None:
+            return await self.pool.send_message(
+                msg,
+                sender=self.sender,
+                recipients=recipients,
+            )
 
-        await aiosmtplib.send(
+        return await aiosmtplib.send(
             msg,
             hostname=self.host,
             port=self.port,
             sender=self.sender,
-            recipients=[to],
+            recipients=list(recipients),
         )
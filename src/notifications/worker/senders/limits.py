@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PriorityGate:
+    """Семафор на capacity мест: приоритетные ожидающие идут первыми.
+
+    Внутри каждой группы (priority=True/False) — FIFO.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self._free = capacity
+        self._waiters: dict[bool, deque[asyncio.Future]] = {
+            True: deque(),
+            False: deque(),
+        }
+
+    def waiting(self) -> int:
+        return sum(
+            not fut.done()
+            for waiters in self._waiters.values() for fut in waiters
+        )
+
+    async def acquire(self, priority: bool = False) -> None:
+        if self._free > 0 and not self.waiting():
+            self._free -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Место уже выдано, но забрать его некому — отдаём дальше
+                self.release()
+            raise
+
+    def release(self) -> None:
+        for priority in (True, False):
+            waiters = self._waiters[priority]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._free += 1
+
+
+class TokenBucket:
+    """Token bucket: в среднем rate отправок в секунду, всплеск до burst.
+
+    Ожидающие обслуживаются по очереди (FIFO, приоритетные — раньше
+    остальных), acquire() возвращает, сколько секунд пришлось ждать.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        if burst < 1:
+            raise ValueError("burst must be >= 1")
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._turn = PriorityGate(1)
+
+    async def acquire(self, priority: bool = False) -> float:
+        started = self._clock()
+        await self._turn.acquire(priority)
+        try:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return self._clock() - started
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+        finally:
+            self._turn.release()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self._burst,
+            self._tokens + (now - self._updated) * self._rate,
+        )
+        self._updated = now
+
+
+class ChannelLimiter:
+    """Bulkhead канала: лимит одновременных отправок + token bucket.
+
+    max_concurrency=0 и rate=0 — соответствующее ограничение выключено.
+    У каждого канала свой лимитер, поэтому медленный SMTP не занимает
+    лимиты push/ws. slot(priority=True) — вне очереди: job'ы
+    приоритетной полосы не ждут, пока разойдётся кампания. stats()
+    показывает, сколько job'ы простояли в ожидании слота и токена.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        *,
+        max_concurrency: int = 0,
+        rate: float = 0,
+        burst: int = 1,
+    ) -> None:
+        self.channel = channel
+        self._slots = (
+            PriorityGate(max_concurrency) if max_concurrency > 0 else None
+        )
+        self._bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self._in_flight = 0
+        self._waiting = 0
+
+        self.acquired = 0
+        self.concurrency_wait_seconds = 0.0
+        self.rate_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, priority: bool = False) -> AsyncIterator[None]:
+        self._waiting += 1
+        try:
+            if self._slots is not None:
+                started = time.monotonic()
+                await self._slots.acquire(priority)
+                self.concurrency_wait_seconds += time.monotonic() - started
+            try:
+                if self._bucket is not None:
+                    self.rate_wait_seconds += await self._bucket.acquire(
+                        priority)
+            except BaseException:
+                if self._slots is not None:
+                    self._slots.release()
+                raise
+        finally:
+            self._waiting -= 1
+
+        self.acquired += 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "acquired": self.acquired,
+            "concurrency_wait_seconds": self.concurrency_wait_seconds,
+            "rate_wait_seconds": self.rate_wait_seconds,
+        }
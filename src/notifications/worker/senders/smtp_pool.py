@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.message import Message
+from typing import AsyncIterator, Callable, Sequence
+
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PooledConnection:
+    smtp: aiosmtplib.SMTP
+    last_used: float
+    sent: int = 0
+
+
+class SmtpConnectionPool:
+    """Пул постоянных SMTP-сессий.
+
+    aiosmtplib.send() на каждое письмо делает connect + EHLO + QUIT —
+    это дороже самой отправки. Пул держит до size открытых сессий и
+    отправляет через каждую много писем подряд:
+
+    - сессия, простоявшая дольше idle_check_seconds, перед выдачей
+      проверяется NOOP'ом и при ошибке переоткрывается;
+    - сессия, на которой отправка упала, закрывается (сервер мог
+      оборвать соединение посреди транзакции);
+    - stats() показывает занятость пула и время ожидания свободной сессии.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        size: int,
+        idle_check_seconds: float = 30.0,
+        timeout: float = 10.0,
+        smtp_factory: Callable[[], aiosmtplib.SMTP] | None = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self._size = size
+        self._idle_check_seconds = idle_check_seconds
+        self._smtp_factory = smtp_factory or (
+            lambda: aiosmtplib.SMTP(hostname=host, port=port, timeout=timeout))
+        self._slots = asyncio.Semaphore(size)
+        # LIFO: чаще используем «тёплые» сессии, лишние дольше простаивают
+        self._idle: list[_PooledConnection] = []
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self.connects = 0
+        self.acquires = 0
+        self.saturated_acquires = 0
+        self.wait_seconds_total = 0.0
+
+    async def send_message(
+        self,
+        message: Message,
+        *,
+        sender: str,
+        recipients: Sequence[str],
+    ):
+        async with self.acquire() as smtp:
+            return await smtp.send_message(
+                message, sender=sender, recipients=list(recipients))
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        if self._closed:
+            raise RuntimeError("SMTP connection pool is closed")
+
+        self.acquires += 1
+        if self._slots.locked():
+            self.saturated_acquires += 1
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self.wait_seconds_total += time.monotonic() - started
+
+        self._in_use += 1
+        conn: _PooledConnection | None = None
+        try:
+            conn = await self._checkout()
+            yield conn.smtp
+            conn.sent += 1
+        except BaseException:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            self._in_use -= 1
+            if conn is not None:
+                conn.last_used = time.monotonic()
+                if self._closed:
+                    self._discard(conn)
+                else:
+                    self._idle.append(conn)
+            self._slots.release()
+
+    async def close(self) -> None:
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            try:
+                await conn.smtp.quit()
+            except Exception:
+                conn.smtp.close()
+        logger.info("SMTP connection pool closed (%s sessions)", len(idle))
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "size": self._size,
+            "open": len(self._idle) + self._in_use,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiting": self._waiting,
+            "connects": self.connects,
+            "acquires": self.acquires,
+            "saturated_acquires": self.saturated_acquires,
+            "wait_seconds_total": self.wait_seconds_total,
+        }
+
+    async def _checkout(self) -> _PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if await self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+        return await self._connect()
+
+    async def _is_healthy(self, conn: _PooledConnection) -> bool:
+        if not conn.smtp.is_connected:
+            return False
+        if time.monotonic() - conn.last_used < self._idle_check_seconds:
+            return True
+        try:
+            await conn.smtp.noop()
+        except aiosmtplib.SMTPException as exc:
+            logger.info(
+                "Idle SMTP session failed NOOP (%s), reconnecting", exc)
+            return False
+        return True
+
+    async def _connect(self) -> _PooledConnection:
+        smtp = self._smtp_factory()
+        await smtp.connect()
+        self.connects += 1
+        logger.debug("Opened SMTP session #%s", self.connects)
+        return _PooledConnection(smtp=smtp, last_used=time.monotonic())
+
+    @staticmethod
+    def _discard(conn: _PooledConnection) -> None:
+        # close() без QUIT: соединение могло быть уже мёртвым
+        conn.smtp.close()
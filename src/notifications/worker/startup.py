@@ -4,6 +4,7 @@ import asyncio
 import logging
 
 import asyncpg
+import httpx
 from aiokafka import AIOKafkaProducer
 from aiokafka.errors import KafkaConnectionError
 
@@ -51,7 +52,11 @@ async def create_kafka_producer() -> AIOKafkaProducer:
     delay_seconds = 1
 
     producer = AIOKafkaProducer(
-        bootstrap_servers=settings.kafka_bootstrap_servers)
+        bootstrap_servers=settings.kafka_bootstrap_servers,
+        linger_ms=settings.kafka_producer_linger_ms,
+        max_batch_size=settings.kafka_producer_max_batch_size,
+        compression_type=settings.kafka_producer_compression_type,
+    )
 
     for attempt in range(1, max_attempts + 10):
         try:
@@ -77,3 +82,35 @@ async def create_kafka_producer() -> AIOKafkaProducer:
                 await producer.stop()
                 raise
             await asyncio.sleep(delay_seconds)
+
+
+def create_auth_http_client() -> httpx.AsyncClient:
+    """Общий HTTP-клиент к Auth: пул keep-alive соединений на весь воркер."""
+    limits = httpx.Limits(
+        max_connections=settings.auth_http_max_connections,
+        max_keepalive_connections=settings.auth_http_max_keepalive_connections,
+        keepalive_expiry=settings.auth_http_keepalive_expiry_seconds,
+    )
+    http2 = settings.auth_http2_enabled
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning(
+                "AUTH_HTTP2_ENABLED is set but h2 is not installed,"
+                " falling back to HTTP/1.1"
+            )
+            http2 = False
+
+    logger.info(
+        "Creating Auth HTTP client"
+        " (max_connections=%s, keepalive=%s, http2=%s)",
+        settings.auth_http_max_connections,
+        settings.auth_http_max_keepalive_connections,
+        http2,
+    )
+    return httpx.AsyncClient(
+        timeout=settings.auth_http_timeout_seconds,
+        limits=limits,
+        http2=http2,
+    )
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import time
+from dataclasses import dataclass
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Iterator
+
+from prometheus_client import (
+    CollectorRegistry,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .core.stats import merge_snapshots
+
+logger = logging.getLogger(__name__)
+
+# target(index, stats_queue) — тело дочернего процесса
+ChildTarget = Callable[[int, Any], None]
+
+
+@dataclass
+class _Child:
+    index: int
+    process: BaseProcess
+    started_at: float
+    restarts: int = 0
+
+
+class WorkerSupervisor:
+    """Запускает N процессов воркера в одной consumer group.
+
+    - упавший процесс перезапускается (с растущей паузой, если падает
+      сразу после старта);
+    - SIGTERM/SIGINT пересылается детям: каждый доделывает начатые
+      job'ы и выходит сам; кто не уложился в shutdown_timeout — kill;
+    - дети периодически присылают через очередь snapshot счётчиков,
+      супервизор складывает их (merged_stats());
+    - если задан metrics_address, дети пишут метрики в общий каталог
+      (multiprocess-режим prometheus_client), а супервизор отдаёт их
+      сумму на GET /metrics;
+    - SIGUSR1 пересылается всем детям — каждый пишет свой профиль
+      (см. core.profiler).
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        target: ChildTarget,
+        *,
+        shutdown_timeout_seconds: float = 30.0,
+        max_restart_backoff_seconds: float = 30.0,
+        stats_log_interval_seconds: float = 60.0,
+        metrics_address: tuple[str, int] | None = None,
+    ) -> None:
+        if processes < 1:
+            raise ValueError("processes must be >= 1")
+        self._processes = processes
+        self._target = target
+        self._shutdown_timeout = shutdown_timeout_seconds
+        self._max_backoff = max_restart_backoff_seconds
+        self._stats_log_interval = stats_log_interval_seconds
+        self._metrics_address = metrics_address
+        self._metrics_server: Any | None = None
+        self._metrics_dir: str | None = None
+        # spawn: дети не наследуют состояние родителя (сокеты, потоки)
+        self._ctx = mp.get_context("spawn")
+        self._stats_queue = self._ctx.Queue()
+        self._children: dict[int, _Child] = {}
+        self._latest_stats: dict[int, dict[str, float]] = {}
+        self._restart_at: dict[int, float] = {}
+        self._stopping = False
+
+    def run(self) -> int:
+        """Блокирующий цикл супервизора. Возвращает код выхода."""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        signal.signal(signal.SIGUSR1, self._forward_signal)
+
+        logger.info("Starting %s worker processes", self._processes)
+        if self._metrics_address is not None:
+            self._start_metrics_server(self._metrics_address)
+        for index in range(self._processes):
+            self._start_child(index, restarts=0)
+
+        next_stats_log = time.monotonic() + self._stats_log_interval
+        while not self._stopping:
+            self._drain_stats(timeout=0.5)
+            self._check_children()
+            if time.monotonic() >= next_stats_log:
+                self._log_stats()
+                next_stats_log = time.monotonic() + self._stats_log_interval
+
+        return self._shutdown()
+
+    def merged_stats(self) -> dict[str, float]:
+        merged = merge_snapshots(self._latest_stats.values())
+        merged["supervisor.processes_alive"] = sum(
+            child.process.is_alive() for child in self._children.values())
+        merged["supervisor.restarts"] = sum(
+            child.restarts for child in self._children.values())
+        return merged
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        """Состояние супервизора для /metrics (collector prometheus_client)."""
+        stats = self.merged_stats()
+        family = GaugeMetricFamily(
+            "notifications_worker_supervisor",
+            "Worker supervisor state",
+            labels=["stat"],
+        )
+        for key in ("processes_alive", "restarts"):
+            family.add_metric([key], stats[f"supervisor.{key}"])
+        yield family
+
+    # -------------------- helpers --------------------
+
+    def _start_metrics_server(self, address: tuple[str, int]) -> None:
+        # До запуска детей: spawn-процесс читает каталог при импорте
+        # prometheus_client
+        self._metrics_dir = tempfile.mkdtemp(
+            prefix="notifications-worker-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = self._metrics_dir
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=self._metrics_dir)
+        registry.register(self)
+        host, port = address
+        self._metrics_server, _ = start_http_server(
+            port, addr=host, registry=registry)
+        logger.info("Supervisor metrics endpoint listening on %s:%s", *address)
+
+    def _start_child(self, index: int, restarts: int) -> None:
+        process = self._ctx.Process(
+            target=self._target,
+            args=(index, self._stats_queue),
+            name=f"notification-worker-{index}",
+        )
+        process.start()
+        self._children[index] = _Child(
+            index=index,
+            process=process,
+            started_at=time.monotonic(),
+            restarts=restarts,
+        )
+        logger.info("Worker process #%s started (pid=%s)", index, process.pid)
+
+    def _check_children(self) -> None:
+        now = time.monotonic()
+        for index, child in list(self._children.items()):
+            if child.process.is_alive():
+                continue
+
+            restart_at = self._restart_at.get(index)
+            if restart_at is None:
+                uptime = now - child.started_at
+                # Падает сразу после старта — не перезапускаем в цикле
+                backoff = 0.0 if uptime > self._max_backoff else min(
+                    self._max_backoff, 2 ** min(child.restarts, 5))
+                logger.error(
+                    "Worker process #%s (pid=%s) exited with code %s"
+                    " after %.1f sec, restarting in %.1f sec",
+                    index,
+                    child.process.pid,
+                    child.process.exitcode,
+                    uptime,
+                    backoff,
+                )
+                self._latest_stats.pop(child.process.pid, None)
+                if self._metrics_dir is not None:
+                    # live-gauge'и мёртвого процесса больше не суммируем
+                    multiprocess.mark_process_dead(
+                        child.process.pid, self._metrics_dir)
+                self._restart_at[index] = now + backoff
+            elif now >= restart_at:
+                del self._restart_at[index]
+                self._start_child(index, restarts=child.restarts + 1)
+
+    def _drain_stats(self, timeout: float) -> None:
+        try:
+            report = self._stats_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            pid, snapshot = report
+            self._latest_stats[pid] = snapshot
+            try:
+                report = self._stats_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _log_stats(self) -> None:
+        stats = self.merged_stats()
+        logger.info(
+            "Worker processes stats: %s",
+            ", ".join(
+                f"{key}={value:g}" for key, value in sorted(stats.items())),
+        )
+
+    def _on_signal(self, signum: int, _frame: Any) -> None:
+        if self._stopping:
+            return
+        logger.info(
+            "Supervisor received signal %s, stopping workers...", signum)
+        self._stopping = True
+
+    def _forward_signal(self, signum: int, _frame: Any) -> None:
+        for child in self._children.values():
+            if child.process.is_alive() and child.process.pid is not None:
+                os.kill(child.process.pid, signum)
+
+    def _shutdown(self) -> int:
+        for child in self._children.values():
+            if child.process.is_alive():
+                child.process.terminate()  # SIGTERM → graceful drain
+
+        deadline = time.monotonic() + self._shutdown_timeout
+        for child in self._children.values():
+            child.process.join(max(0.0, deadline - time.monotonic()))
+            if child.process.is_alive():
+                logger.warning(
+                    "Worker process #%s did not stop in %.0f sec, killing",
+                    child.index,
+                    self._shutdown_timeout,
+                )
+                child.process.kill()
+                child.process.join()
+
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+        if self._metrics_dir is not None:
+            os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+            shutil.rmtree(self._metrics_dir, ignore_errors=True)
+        self._stats_queue.close()
+        logger.info("All worker processes stopped")
+        return 0
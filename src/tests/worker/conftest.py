@@ -32,6 +32,8 @@ class FakeTemplateRepo:
 class FakeDeliveryRepo:
     def __init__(self) -> None:
         self.get_by_job_id = AsyncMock(return_value=None)
+        self.get_by_job_ids = AsyncMock(return_value={})
+        self.claim = AsyncMock(return_value=None)
         self.save_status = AsyncMock()
 
 
@@ -40,7 +42,7 @@ class FakeAuthClient:
         self._email = email
         self.get_user_contacts = AsyncMock(side_effect=self._get_contacts)
 
-    async def _get_contacts(self, user_id):
+    async def _get_contacts(self, user_id, *, fresh=False):
         return UserContacts(
             user_id=user_id,
             email=self._email,
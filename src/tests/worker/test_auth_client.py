@@ -0,0 +1,221 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+from src.notifications.worker.auth import AuthClient
+
+
+def _auth_client(settings, handler):
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AuthClient(settings, http_client=http_client), http_client
+
+
+@pytest.mark.asyncio
+async def test_auth_client_reuses_shared_http_client(settings):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"email": "user@example.com"})
+
+    auth_client, http_client = _auth_client(settings, handler)
+    for _ in range(2):
+        contacts = await auth_client.get_user_contacts(uuid4())
+        assert contacts.email == "user@example.com"
+
+    assert len(requests) == 2
+    # Чужой клиент AuthClient не закрывает — это делает main
+    await auth_client.aclose()
+    assert not http_client.is_closed
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_request_and_are_cached(settings):
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"email": "user@example.com"})
+
+    auth_client, http_client = _auth_client(settings, handler)
+    user_id = uuid4()
+
+    results = await asyncio.gather(
+        *(auth_client.get_user_contacts(user_id) for _ in range(5)))
+    assert {c.email for c in results} == {"user@example.com"}
+    assert calls == 1
+    assert auth_client.stats()["coalesced"] == 4
+
+    await auth_client.get_user_contacts(user_id)
+    assert calls == 1
+    assert auth_client.stats()["hits"] == 1
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_ws_session_id_is_not_served_from_cache(settings):
+    sessions = iter(["ws-1", "ws-2"])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "email": "user@example.com",
+            "ws_session_id": next(sessions),
+        })
+
+    auth_client, http_client = _auth_client(settings, handler)
+    user_id = uuid4()
+
+    first = await auth_client.get_user_contacts(user_id)
+    assert first.ws_session_id == "ws-1"
+    cached = await auth_client.get_user_contacts(user_id)
+    assert cached.email == "user@example.com"
+    assert cached.ws_session_id is None
+
+    fresh = await auth_client.get_user_contacts(user_id, fresh=True)
+    assert fresh.ws_session_id == "ws-2"
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fallback_contacts_are_not_cached(settings):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503)
+
+    auth_client, http_client = _auth_client(settings, handler)
+    user_id = uuid4()
+
+    contacts = await auth_client.get_user_contacts(user_id)
+    assert contacts.email == f"user-{user_id}@example.com"
+    assert auth_client.stats()["size"] == 0
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_bulk_lookup_is_chunked_and_fills_cache(settings):
+    settings.auth_bulk_max_ids = 2
+    bulk_sizes = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/v1/users/bulk"
+        user_ids = json.loads(request.content)["user_ids"]
+        bulk_sizes.append(len(user_ids))
+        return httpx.Response(200, json={"users": [
+            {"user_id": user_id, "email": f"{user_id}@example.com"}
+            for user_id in user_ids
+        ]})
+
+    auth_client, http_client = _auth_client(settings, handler)
+    user_ids = [uuid4() for _ in range(5)]
+
+    contacts = await auth_client.get_many_user_contacts(user_ids + user_ids)
+    assert set(contacts) == set(user_ids)
+    assert bulk_sizes == [2, 2, 1]
+
+    # Всё уже в кеше — в Auth не ходим
+    await auth_client.get_user_contacts(user_ids[0])
+    assert bulk_sizes == [2, 2, 1]
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_bulk_lookup_falls_back_when_endpoint_is_missing(settings):
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if request.url.path.endswith("/bulk"):
+            return httpx.Response(404)
+        return httpx.Response(200, json={"email": "user@example.com"})
+
+    auth_client, http_client = _auth_client(settings, handler)
+
+    first = await auth_client.get_many_user_contacts([uuid4(), uuid4()])
+    assert {c.email for c in first.values()} == {"user@example.com"}
+    await auth_client.get_many_user_contacts([uuid4()])
+
+    # bulk пробуем один раз, дальше только поштучно
+    assert sum(p.endswith("/bulk") for p in paths) == 1
+    assert len(paths) == 4
+    await http_client.aclose()
+
+
+def _auth_stub(with_bulk: bool) -> FastAPI:
+    """Auth с bulk-эндпоинтом или без: тогда POST /bulk попадает на
+    маршрут /users/{user_id} и получает 405, как у старого Auth."""
+    app = FastAPI()
+
+    if with_bulk:
+        @app.post("/api/v1/users/bulk")
+        async def bulk(body: dict) -> dict:
+            return {"users": [
+                {"user_id": user_id, "email": f"{user_id}@example.com"}
+                for user_id in body["user_ids"]
+            ]}
+
+    @app.get("/api/v1/users/{user_id}")
+    async def user(user_id: str) -> dict:
+        return {"email": f"{user_id}@example.com"}
+
+    return app
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("with_bulk", "expected"),
+    [
+        (True, ["POST 200 2", "POST 200 2", "POST 200 1", "POST 200 1"]),
+        # bulk пробуем один раз, дальше только поштучно
+        (False, ["POST 405 2"] + ["GET 200 1"] * 6),
+    ],
+)
+async def test_bulk_lookup_against_real_http_server(
+    settings,
+    with_bulk,
+    expected,
+):
+    server = uvicorn.Server(uvicorn.Config(
+        _auth_stub(with_bulk),
+        host="127.0.0.1",
+        port=0,
+        lifespan="off",
+        log_level="warning",
+    ))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        assert not serving.done()
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    responses: list[str] = []
+
+    async def record(response: httpx.Response) -> None:
+        request = response.request
+        ids = len(json.loads(request.content)["user_ids"]) if (
+            request.method == "POST") else 1
+        responses.append(f"{request.method} {response.status_code} {ids}")
+
+    settings.auth_base_url = f"http://127.0.0.1:{port}"
+    settings.auth_bulk_max_ids = 2
+    http_client = httpx.AsyncClient(event_hooks={"response": [record]})
+    auth_client = AuthClient(settings, http_client=http_client)
+    user_ids = [uuid4() for _ in range(6)]
+    try:
+        contacts = await auth_client.get_many_user_contacts(user_ids[:5])
+        contacts.update(
+            await auth_client.get_many_user_contacts(user_ids[4:]))
+    finally:
+        await http_client.aclose()
+        server.should_exit = True
+        await serving
+
+    assert {c.email for c in contacts.values()} == {
+        f"{user_id}@example.com" for user_id in user_ids}
+    assert responses == expected
@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from aiokafka import TopicPartition
+
+from src.notifications.worker.consumer.dispatcher import KeyedDispatcher
+from src.notifications.worker.consumer.kafka_consumer import (
+    KafkaNotificationConsumer)
+from src.notifications.worker.consumer.offsets import OffsetTracker
+from .conftest import FakeDlqPublisher, make_notification_job
+
+TP = TopicPartition("notifications.outbox", 0)
+
+
+def test_offset_tracker_commits_only_contiguous_prefix():
+    tracker = OffsetTracker()
+    for offset in (10, 11, 12):
+        tracker.track(TP, offset)
+
+    tracker.complete(TP, 11)
+    tracker.complete(TP, 12)
+    assert tracker.committable() == {}
+
+    tracker.complete(TP, 10)
+    assert tracker.committable() == {TP: 13}
+    # пока commit() не прошёл, offset'ы не забываются
+    assert tracker.committable() == {TP: 13}
+    tracker.mark_committed({TP: 13})
+    assert tracker.committable() == {}
+    assert tracker.pending_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_handle_batch_completes_offsets_after_processing(settings):
+    settings.worker_max_in_flight = 4
+    processor = SimpleNamespace(
+        handle_job=AsyncMock(),
+        load_existing=AsyncMock(return_value={}),
+        prefetch_contacts=AsyncMock(),
+    )
+    dlq = FakeDlqPublisher()
+    consumer = KafkaNotificationConsumer(
+        settings=settings,
+        processor=processor,
+        dlq_publisher=dlq,
+    )
+
+    jobs = [make_notification_job() for _ in range(3)]
+    records = [
+        SimpleNamespace(offset=i, value=job.model_dump_json().encode())
+        for i, job in enumerate(jobs)
+    ]
+    records.append(SimpleNamespace(offset=3, value=b"not json"))
+
+    await consumer._handle_batch({TP: records})
+    await consumer._dispatcher.drain()
+
+    assert processor.handle_job.await_count == 3
+    # одна пачка — один idempotency-lookup, результат передан в handle_job
+    processor.load_existing.assert_awaited_once()
+    processor.prefetch_contacts.assert_awaited_once()
+    for call in processor.handle_job.await_args_list:
+        assert call.kwargs["existing"] is None
+    dlq.publish_raw.assert_awaited_once()
+    assert consumer._offsets.committable() == {TP: 4}
+
+
+@pytest.mark.asyncio
+async def test_revoke_waits_only_for_jobs_of_revoked_partitions(settings):
+    settings.kafka_batch_mode = True
+    processor = SimpleNamespace(
+        handle_job=AsyncMock(),
+        load_existing=AsyncMock(return_value={}),
+        prefetch_contacts=AsyncMock(),
+    )
+    dispatcher = KeyedDispatcher(max_in_flight=4)
+    consumer = KafkaNotificationConsumer(
+        settings=settings,
+        processor=processor,
+        dlq_publisher=FakeDlqPublisher(),
+        dispatcher=dispatcher,
+    )
+    consumer._consumer = SimpleNamespace(
+        commit=AsyncMock(), highwater=lambda tp: None)
+
+    # job другого consumer'а в общем dispatcher'е, который не закончится
+    release = asyncio.Event()
+    await dispatcher.submit("other", release.wait)
+
+    job = make_notification_job()
+    record = SimpleNamespace(offset=0, value=job.model_dump_json().encode())
+    await consumer._handle_batch({TP: [record]})
+
+    await asyncio.wait_for(consumer._on_partitions_revoked({TP}), 1)
+
+    processor.handle_job.assert_awaited_once()
+    consumer._consumer.commit.assert_awaited_once_with({TP: 1})
+    assert dispatcher.in_flight == 1
+    release.set()
+    await dispatcher.drain()
+
+
+@pytest.mark.asyncio
+async def test_offsets_are_kept_until_before_commit_succeeds(settings):
+    settings.kafka_batch_mode = True
+    processor = SimpleNamespace(
+        handle_job=AsyncMock(),
+        load_existing=AsyncMock(return_value={}),
+        prefetch_contacts=AsyncMock(),
+    )
+    before_commit = AsyncMock(side_effect=[RuntimeError("dlq down"), None])
+    consumer = KafkaNotificationConsumer(
+        settings=settings,
+        processor=processor,
+        dlq_publisher=FakeDlqPublisher(),
+        before_commit=before_commit,
+    )
+    consumer._consumer = SimpleNamespace(
+        commit=AsyncMock(), highwater=lambda tp: None)
+
+    job = make_notification_job()
+    record = SimpleNamespace(offset=0, value=job.model_dump_json().encode())
+    await consumer._handle_batch({TP: [record]})
+    await consumer._dispatcher.drain()
+
+    await consumer._commit_completed()
+    consumer._consumer.commit.assert_not_awaited()
+
+    await consumer._commit_completed()
+    consumer._consumer.commit.assert_awaited_once_with({TP: 1})
+    assert consumer._offsets.pending_count() == 0
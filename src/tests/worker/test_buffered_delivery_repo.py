@@ -0,0 +1,106 @@
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+
+from src.notifications.worker.repositories import (
+    BufferedNotificationDeliveryRepository)
+
+
+def _status(job_id, user_id, status, attempts):
+    return dict(
+        job_id=job_id,
+        user_id=user_id,
+        channel="email",
+        status=status,
+        attempts=attempts,
+        error_code=None,
+        error_message=None,
+        sent_at=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_buffer_collapses_updates_and_flushes_one_batch():
+    repo = AsyncMock()
+    buffered = BufferedNotificationDeliveryRepository(
+        repo,
+        max_batch_size=100,
+        flush_interval_seconds=60,
+    )
+    job_a, job_b, user = uuid4(), uuid4(), uuid4()
+
+    await buffered.save_status(**_status(job_a, user, "RETRYING", 1))
+    await buffered.save_status(**_status(job_a, user, "SENT", 2))
+    await buffered.save_status(**_status(job_b, user, "FAILED", 3))
+
+    # читаем собственную ещё не записанную запись
+    existing = await buffered.get_by_job_id(job_a)
+    assert (existing.status, existing.attempts) == ("SENT", 2)
+    repo.get_by_job_id.assert_not_awaited()
+    repo.save_statuses.assert_not_awaited()
+
+    await buffered.close()
+
+    repo.save_statuses.assert_awaited_once()
+    (updates,), _ = repo.save_statuses.await_args
+    assert {(u.job_id, u.status) for u in updates} == {
+        (job_a, "SENT"),
+        (job_b, "FAILED"),
+    }
+    assert buffered.pending_count == 0
+
+
+@pytest.mark.asyncio
+async def test_buffer_flushes_when_batch_is_full():
+    repo = AsyncMock()
+    buffered = BufferedNotificationDeliveryRepository(
+        repo,
+        max_batch_size=2,
+        flush_interval_seconds=60,
+    )
+    user = uuid4()
+
+    await buffered.save_status(**_status(uuid4(), user, "SENT", 1))
+    repo.save_statuses.assert_not_awaited()
+    await buffered.save_status(**_status(uuid4(), user, "SENT", 1))
+    repo.save_statuses.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_for_next_attempt():
+    repo = AsyncMock()
+    repo.save_statuses.side_effect = [RuntimeError("db down"), None]
+    buffered = BufferedNotificationDeliveryRepository(
+        repo,
+        max_batch_size=100,
+        flush_interval_seconds=60,
+    )
+    await buffered.save_status(**_status(uuid4(), uuid4(), "SENT", 1))
+
+    with pytest.raises(RuntimeError):
+        await buffered.flush()
+    assert buffered.pending_count == 1
+
+    await buffered.flush()
+    assert buffered.pending_count == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_size_triggered_flush_does_not_raise_from_save_status():
+    repo = AsyncMock()
+    repo.save_statuses.side_effect = [RuntimeError("db is down"), None]
+    buffered = BufferedNotificationDeliveryRepository(
+        repo,
+        max_batch_size=1,
+        flush_interval_seconds=60,
+    )
+    job_id, user = uuid4(), uuid4()
+
+    # Не должно бросать: иначе retry-цикл повторит уже отправленный job
+    await buffered.save_status(**_status(job_id, user, "SENT", 1))
+
+    assert buffered.pending_count == 1
+    await buffered.close()
+    assert repo.save_statuses.await_count == 2
+    assert buffered.pending_count == 0
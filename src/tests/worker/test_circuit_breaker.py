@@ -0,0 +1,75 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.notifications.worker.senders import (
+    BreakerSender,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_fails_fast_and_recovers_after_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        "email",
+        window_size=4,
+        min_calls=4,
+        failure_rate_threshold=0.5,
+        open_seconds=30,
+        clock=clock,
+    )
+    smtp = AsyncMock()
+    sender = BreakerSender(smtp, breaker)
+
+    smtp.send.side_effect = [None, None, OSError("down"), OSError("down")]
+    for _ in range(4):
+        try:
+            await sender.send(to="a@x", subject="", body="")
+        except OSError:
+            pass
+    assert breaker.state == "open"
+
+    # Пока open — провайдера не зовём
+    with pytest.raises(CircuitOpenError) as exc_info:
+        await sender.send(to="a@x", subject="", body="")
+    assert exc_info.value.retry_after_seconds == 30
+    assert smtp.send.await_count == 4
+
+    # half-open: одна проба, при успехе — closed
+    clock.now = 31
+    smtp.send.side_effect = None
+    await sender.send(to="a@x", subject="", body="")
+    assert breaker.state == "closed"
+    assert breaker.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_and_bad_address_is_not_a_failure():
+    clock = FakeClock()
+    breaker = CircuitBreaker("push", min_calls=1, open_seconds=10, clock=clock)
+    push = AsyncMock()
+    sender = BreakerSender(push, breaker)
+
+    push.send.side_effect = ValueError("Recipient push_token is empty")
+    with pytest.raises(ValueError):
+        await sender.send(to="", subject="", body="")
+    assert breaker.state == "closed"
+
+    push.send.side_effect = OSError("down")
+    with pytest.raises(OSError):
+        await sender.send(to="t", subject="", body="")
+    clock.now = 11
+    with pytest.raises(OSError):
+        await sender.send(to="t", subject="", body="")
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
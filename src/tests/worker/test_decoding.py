@@ -0,0 +1,31 @@
+import pytest
+
+from src.notifications.worker.consumer.decoding import (
+    INVALID_JSON,
+    INVALID_PAYLOAD,
+    JobDecodeError,
+    decode_job,
+)
+from .conftest import make_notification_job
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_decode_paths_agree(fast):
+    job = make_notification_job()
+    decoded = decode_job(job.model_dump_json().encode(), fast=fast)
+    assert decoded.model_dump() == job.model_dump()
+
+
+@pytest.mark.parametrize("fast", [True, False])
+@pytest.mark.parametrize(
+    "raw, reason",
+    [
+        (b"not json", INVALID_JSON),
+        (b"\xff\xfe", INVALID_JSON),
+        (b'{"job_id": "x"}', INVALID_PAYLOAD),
+    ],
+)
+def test_decode_errors_keep_dlq_reason(fast, raw, reason):
+    with pytest.raises(JobDecodeError) as exc_info:
+        decode_job(raw, fast=fast)
+    assert exc_info.value.reason == reason
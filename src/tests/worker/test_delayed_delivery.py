@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.notifications.worker.delay import (
+    DelayedDeliveryScheduler,
+    TimerWheel,
+)
+from src.notifications.worker.processor.job_processor import JobProcessor
+from .conftest import FakeAuthClient, make_notification_job
+
+
+def test_timer_wheel_fires_in_deadline_order_across_levels():
+    wheel = TimerWheel(tick_seconds=1.0, now=0.0, wheel_size=4, levels=3)
+    # 4**3 - 1 = 63 тика — покрываем все три уровня
+    for deadline in (50.0, 3.0, 17.0, 1.0):
+        wheel.add(deadline, deadline)
+
+    fired: list[tuple[float, float]] = []
+    for now in range(1, 64):
+        fired.extend((float(now), item) for item in wheel.advance(now))
+
+    assert fired == [(1.0, 1.0), (3.0, 3.0), (17.0, 17.0), (50.0, 50.0)]
+    assert len(wheel) == 0
+
+
+def test_timer_wheel_rejects_deadline_beyond_span():
+    wheel = TimerWheel(tick_seconds=1.0, now=0.0, wheel_size=4, levels=2)
+    with pytest.raises(ValueError):
+        wheel.add(100.0, "too far")
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stores_every_job_and_leases_short_ones():
+    delay_repo = AsyncMock()
+    scheduler = DelayedDeliveryScheduler(
+        delay_repo=delay_repo,
+        on_due=AsyncMock(),
+        tick_seconds=0.1,
+        horizon_seconds=60,
+        poll_interval_seconds=5,
+        poll_batch_size=100,
+        lease_seconds=30,
+    )
+    now = datetime.now(timezone.utc)
+
+    near = make_notification_job()
+    await scheduler.park(near, due_at=now + timedelta(seconds=10))
+    far = make_notification_job()
+    await scheduler.park(far, due_at=now + timedelta(days=1))
+
+    assert scheduler.parked_in_memory == 1
+    calls = delay_repo.save_many.await_args_list
+    assert [[row.job_id for row in args[0]] for args, _ in calls] == [
+        [near.job_id],
+        [far.job_id],
+    ]
+    assert [kwargs.get("lease_seconds") for _, kwargs in calls] == [30, None]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_deletes_row_only_after_processing():
+    delay_repo = AsyncMock()
+    processing = asyncio.get_running_loop().create_future()
+    scheduler = DelayedDeliveryScheduler(
+        delay_repo=delay_repo,
+        on_due=AsyncMock(return_value=processing),
+        tick_seconds=0.01,
+        horizon_seconds=60,
+        poll_interval_seconds=5,
+        poll_batch_size=100,
+    )
+    job = make_notification_job()
+    due_at = datetime.now(timezone.utc)
+    await scheduler.park(job, due_at=due_at)
+
+    await scheduler.start()
+    try:
+        await asyncio.sleep(0.05)
+        delay_repo.delete_many.assert_not_awaited()
+
+        processing.set_result(None)
+        await asyncio.sleep(0.05)
+    finally:
+        await scheduler.stop()
+
+    delay_repo.delete_many.assert_awaited_once_with([(job.job_id, due_at)])
+
+
+@pytest.mark.asyncio
+async def test_scheduler_reparks_job_when_dispatch_fails():
+    on_due = AsyncMock(side_effect=[RuntimeError("dispatcher closed"), None])
+    delay_repo = AsyncMock()
+    scheduler = DelayedDeliveryScheduler(
+        delay_repo=delay_repo,
+        on_due=on_due,
+        tick_seconds=0.01,
+        horizon_seconds=60,
+        poll_interval_seconds=5,
+        poll_batch_size=100,
+        redispatch_seconds=0.05,
+    )
+    job = make_notification_job()
+    await scheduler.park(job, due_at=datetime.now(timezone.utc))
+
+    await scheduler.start()
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await scheduler.stop()
+
+    assert [args for args, _ in on_due.await_args_list] == [(job,), (job,)]
+    delay_repo.delete_many.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stop_releases_job_stuck_in_dispatch():
+    delay_repo = AsyncMock()
+
+    async def on_due(job):
+        # dispatcher переполнен — submit не возвращается
+        await asyncio.Event().wait()
+
+    scheduler = DelayedDeliveryScheduler(
+        delay_repo=delay_repo,
+        on_due=on_due,
+        tick_seconds=0.01,
+        horizon_seconds=60,
+        poll_interval_seconds=5,
+        poll_batch_size=100,
+    )
+    first = make_notification_job()
+    second = make_notification_job()
+    now = datetime.now(timezone.utc)
+    await scheduler.park(first, due_at=now)
+    await scheduler.park(second, due_at=now)
+
+    await scheduler.start()
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+
+    (saved,), kwargs = delay_repo.save_many.await_args
+    assert {row.job_id for row in saved} == {first.job_id, second.job_id}
+    assert kwargs.get("lease_seconds") is None
+    delay_repo.delete_many.assert_not_awaited()
+
+    # consumer'ы ещё доделывают job'ы и могут отложить новую
+    late = make_notification_job()
+    await scheduler.park(late, due_at=now + timedelta(seconds=1))
+    (saved,), _ = delay_repo.save_many.await_args
+    assert [row.job_id for row in saved] == [late.job_id]
+    assert scheduler.parked_in_memory == 0
+
+
+@pytest.mark.asyncio
+async def test_job_processor_parks_job_instead_of_sleeping(
+    settings,
+    template_repo,
+    delivery_repo,
+    dlq_publisher,
+    email_sender,
+    push_sender,
+    ws_sender,
+):
+    job = make_notification_job()
+    job.send_after = datetime.now(timezone.utc) + timedelta(hours=5)
+    delay_scheduler = AsyncMock()
+
+    processor = JobProcessor(
+        settings=settings,
+        template_repo=template_repo,
+        delivery_repo=delivery_repo,
+        auth_client=FakeAuthClient(email="user@example.com"),
+        email_sender=email_sender,
+        push_sender=push_sender,
+        ws_sender=ws_sender,
+        dlq_publisher=dlq_publisher,
+        delay_scheduler=delay_scheduler,
+    )
+
+    await processor.handle_job(job)
+
+    delay_scheduler.park.assert_awaited_once_with(job)
+    email_sender.send.assert_not_awaited()
+    delivery_repo.save_status.assert_not_awaited()
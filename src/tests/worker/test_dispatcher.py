@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from src.notifications.worker.consumer.dispatcher import KeyedDispatcher
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_keeps_order_within_key():
+    dispatcher = KeyedDispatcher(max_in_flight=4)
+    done: list[tuple[str, int]] = []
+
+    def make_job(key: str, idx: int, delay: float):
+        async def job():
+            await asyncio.sleep(delay)
+            done.append((key, idx))
+        return job
+
+    # первая job'а ключа "a" самая медленная — вторая обязана ждать её
+    await dispatcher.submit("a", make_job("a", 1, 0.05))
+    await dispatcher.submit("a", make_job("a", 2, 0.0))
+    await dispatcher.submit("b", make_job("b", 1, 0.0))
+    await dispatcher.drain()
+
+    assert [idx for key, idx in done if key == "a"] == [1, 2]
+    # ключ "b" не ждал медленную job'у ключа "a"
+    assert done.index(("b", 1)) < done.index(("a", 1))
+    assert dispatcher.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_bounds_in_flight():
+    dispatcher = KeyedDispatcher(max_in_flight=2)
+    state = {"running": 0, "peak": 0}
+
+    async def job():
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+
+    for key in range(6):
+        await dispatcher.submit(key, job)
+        assert dispatcher.in_flight <= 2
+    await dispatcher.drain()
+
+    assert state["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_failed_job_does_not_break_key_chain():
+    dispatcher = KeyedDispatcher(max_in_flight=2)
+    done: list[int] = []
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def ok():
+        done.append(1)
+
+    await dispatcher.submit("a", failing)
+    await dispatcher.submit("a", ok)
+    await dispatcher.drain()
+
+    assert done == [1]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_gives_free_slots_to_lanes_by_weight():
+    dispatcher = KeyedDispatcher(
+        max_in_flight=1,
+        lane_weights={"high": 2, "normal": 1},
+    )
+    release = asyncio.Event()
+    started: list[str] = []
+
+    def make_job(name: str):
+        async def job():
+            started.append(name)
+            await release.wait()
+        return job
+
+    # Слот занят — дальше job'ы обеих полос ждут его в очереди
+    await dispatcher.submit("blocker", make_job("blocker"))
+    submits = [
+        asyncio.create_task(
+            dispatcher.submit(f"{lane}{idx}", make_job(f"{lane}{idx}"),
+                              lane=lane))
+        for idx in range(3)
+        for lane in ("normal", "high")
+    ]
+    await asyncio.sleep(0)
+    assert dispatcher.waiting("high") == 3
+    assert dispatcher.waiting("normal") == 3
+
+    release.set()
+    await asyncio.gather(*submits)
+    await dispatcher.drain()
+
+    assert started == [
+        "blocker", "high0", "high1", "normal0",
+        "high2", "normal1", "normal2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_queued_jobs_of_one_key_do_not_block_other_keys():
+    dispatcher = KeyedDispatcher(max_in_flight=4)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    finished: dict[str, float] = {}
+
+    async def slow():
+        await asyncio.sleep(0.2)
+
+    async def fast():
+        finished["b"] = loop.time() - started
+
+    for _ in range(4):
+        await dispatcher.submit("a", slow)
+    # job'ы "a", ждущие свою очередь, слотов не держат
+    assert dispatcher.running == 1
+    await dispatcher.submit("b", fast)
+    await asyncio.sleep(0.05)
+
+    assert finished["b"] < 0.1
+    await dispatcher.drain()
+    assert dispatcher.running == 0
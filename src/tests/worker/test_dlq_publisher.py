@@ -0,0 +1,44 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.notifications.worker.dlq import DlqPublisher
+from .conftest import make_notification_job
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_broker_ack(settings):
+    loop = asyncio.get_running_loop()
+    deliveries = []
+
+    async def send(**_kwargs):
+        deliveries.append(loop.create_future())
+        return deliveries[-1]
+
+    producer = AsyncMock()
+    producer.send.side_effect = send
+    dlq = DlqPublisher(settings, producer)
+
+    await dlq.publish_job(make_notification_job(), "boom")
+    await dlq.publish_raw(b"not json", "invalid")
+    assert dlq.stats() == {
+        "published": 2, "failed": 0, "pending": 2, "undelivered": 0}
+    producer.send_and_wait.assert_not_awaited()
+
+    deliveries[0].set_result(None)
+    deliveries[1].set_exception(RuntimeError("broker down"))
+    with pytest.raises(RuntimeError, match="1 DLQ message"):
+        await dlq.flush()
+    assert dlq.stats() == {
+        "published": 2, "failed": 1, "pending": 0, "undelivered": 1}
+
+    # flush() переотправляет недоставленное, пока брокер не подтвердит
+    flushing = asyncio.create_task(dlq.flush())
+    await asyncio.sleep(0)
+    assert producer.send.await_count == 3
+    assert producer.send.await_args.kwargs["value"] == (
+        producer.send.await_args_list[1].kwargs["value"])
+    deliveries[2].set_result(None)
+    await flushing
+    assert dlq.stats()["undelivered"] == 0
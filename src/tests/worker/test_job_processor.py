@@ -54,3 +54,38 @@ async def test_job_processor_happy_email(
 
     dlq_publisher.publish_job.assert_not_awaited()
     dlq_publisher.publish_raw.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_job_processor_claim_mode_skips_job_claimed_elsewhere(
+    settings,
+    template_repo,
+    delivery_repo,
+    dlq_publisher,
+    email_sender,
+    push_sender,
+    ws_sender,
+    job_email,
+):
+    """claim вернул None (job финальный или у другого воркера) → не шлём."""
+    settings.delivery_claim_enabled = True
+    delivery_repo.claim.return_value = None
+
+    processor = JobProcessor(
+        settings=settings,
+        template_repo=template_repo,
+        delivery_repo=delivery_repo,
+        auth_client=FakeAuthClient(email="user@example.com"),
+        email_sender=email_sender,
+        push_sender=push_sender,
+        ws_sender=ws_sender,
+        dlq_publisher=dlq_publisher,
+    )
+
+    await processor.handle_job(job_email)
+
+    delivery_repo.claim.assert_awaited_once()
+    assert delivery_repo.claim.await_args.kwargs["job_id"] == job_email.job_id
+    delivery_repo.get_by_job_id.assert_not_awaited()
+    email_sender.send.assert_not_awaited()
+    delivery_repo.save_status.assert_not_awaited()
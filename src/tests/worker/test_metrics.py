@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.notifications.worker.core.metrics import (
+    IN_FLIGHT,
+    MetricsServer,
+    add_refresher,
+)
+from src.notifications.worker.processor.job_processor import JobProcessor
+from .conftest import FakeAuthClient
+
+
+def _stage_count(stage: str) -> float:
+    return REGISTRY.get_sample_value(
+        "notifications_worker_stage_seconds_count", {"stage": stage}) or 0.0
+
+
+async def _get(port: int, path: str) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+    response = (await reader.read()).decode()
+    writer.close()
+    return response
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_refreshes_gauges_before_render():
+    in_flight = iter([3, 5])
+    add_refresher("test", lambda: IN_FLIGHT.set(next(in_flight)))
+    server = MetricsServer("127.0.0.1", 0)
+    await server.start()
+    try:
+        first = await _get(server.port, "/metrics")
+        second = await _get(server.port, "/metrics")
+        missing = await _get(server.port, "/debug/profile")
+    finally:
+        await server.stop()
+        add_refresher("test", lambda: None)
+
+    assert first.startswith("HTTP/1.1 200 OK")
+    assert "notifications_worker_in_flight 3.0" in first
+    assert "notifications_worker_in_flight 5.0" in second
+    # профиль — только если маршрут добавлен (profile_endpoint_enabled)
+    assert missing.startswith("HTTP/1.1 404")
+
+
+@pytest.mark.asyncio
+async def test_job_processor_records_stage_latencies(
+    settings,
+    template_repo,
+    delivery_repo,
+    dlq_publisher,
+    email_sender,
+    push_sender,
+    ws_sender,
+    job_email,
+):
+    stages = ("delivery_lookup", "template", "render", "contacts", "send",
+              "status_write")
+    before = {stage: _stage_count(stage) for stage in stages}
+    processor = JobProcessor(
+        settings=settings,
+        template_repo=template_repo,
+        delivery_repo=delivery_repo,
+        auth_client=FakeAuthClient(email="user@example.com"),
+        email_sender=email_sender,
+        push_sender=push_sender,
+        ws_sender=ws_sender,
+        dlq_publisher=dlq_publisher,
+    )
+
+    await processor.handle_job(job_email)
+
+    for stage in stages:
+        assert _stage_count(stage) == before[stage] + 1, stage
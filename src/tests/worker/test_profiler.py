@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+from src.notifications.worker.core.metrics import track_stage
+from src.notifications.worker.core.profiler import (
+    ProfilerBusyError,
+    SamplingProfiler,
+)
+
+
+def _busy_render(seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+async def _job() -> None:
+    with track_stage("render"):
+        _busy_render(0.3)
+
+
+@pytest.mark.asyncio
+async def test_profiler_samples_event_loop_and_annotates_stage(tmp_path):
+    profiler = SamplingProfiler(interval_seconds=0.002)
+
+    capture = asyncio.create_task(profiler.capture(0.2))
+    await asyncio.sleep(0)
+    with pytest.raises(ProfilerBusyError):
+        await profiler.capture(0.1)
+    await asyncio.create_task(_job())
+    result = await capture
+
+    assert result.samples > 0
+    folded = result.folded()
+    render_lines = [
+        line for line in folded.splitlines()
+        if line.startswith("stage:render;")
+    ]
+    assert render_lines
+    assert "_busy_render" in render_lines[0]
+    # Каждая строка — "стек количество"
+    assert all(
+        line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+    path = await profiler.capture_to_file(0.05, tmp_path)
+    assert path.read_text()
@@ -0,0 +1,56 @@
+import pytest
+
+from src.notifications.worker.processor.job_processor import JobProcessor
+from src.notifications.worker.processor.rendering import compile_template
+from .conftest import FakeAuthClient
+
+
+@pytest.mark.parametrize(
+    "source, data",
+    [
+        ("Hello, {name}!", {"name": "User"}),
+        ("{{literal}} {n:>5} {n!r}", {"n": 42}),
+        ("{user[name]} / {items[0]}", {"user": {"name": "A"}, "items": [1]}),
+        ("{x:{width}}", {"x": 1, "width": 4}),
+        ("<html>без переменных</html>", {}),
+    ],
+)
+def test_compiled_template_matches_str_format(source, data):
+    compiled = compile_template(source)
+    assert compiled.render(data) == source.format(**data)
+    assert compile_template(source) is compiled
+
+
+def test_compiled_template_reports_missing_vars():
+    compiled = compile_template("{b} {a.x} {a}")
+    assert compiled.required == {"a", "b"}
+    assert compiled.missing({"a": 1}) == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_missing_var_detected_before_contacts_lookup(
+    settings,
+    template_repo,
+    delivery_repo,
+    dlq_publisher,
+    email_sender,
+    push_sender,
+    ws_sender,
+    job_email,
+):
+    job_email.data = {}
+    auth_client = FakeAuthClient(email="user@example.com")
+    processor = JobProcessor(
+        settings=settings,
+        template_repo=template_repo,
+        delivery_repo=delivery_repo,
+        auth_client=auth_client,
+        email_sender=email_sender,
+        push_sender=push_sender,
+        ws_sender=ws_sender,
+        dlq_publisher=dlq_publisher,
+    )
+
+    with pytest.raises(RuntimeError, match="Missing var in template: 'name'"):
+        await processor._attempt_send(job_email)
+    auth_client.get_user_contacts.assert_not_awaited()
@@ -1,7 +1,10 @@
+from unittest.mock import AsyncMock
+
 import pytest
 
 from src.notifications.worker.processor.retry_engine import (
     attempt_with_retries)
+from src.notifications.worker.senders import CircuitOpenError
 from .conftest import FakeDeliveryRepo, FakeDlqPublisher, make_notification_job
 
 
@@ -60,3 +63,59 @@ async def test_retry_engine_exhausts_attempts_and_goes_to_dlq():
 
     assert delivery_repo.save_status.await_count >= 2
     dlq_publisher.publish_job.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_retry_engine_publishes_to_retry_topic_instead_of_sleeping():
+    job = make_notification_job()
+    delivery_repo = FakeDeliveryRepo()
+    dlq_publisher = FakeDlqPublisher()
+    retry_publisher = AsyncMock()
+
+    attempt_send_fn = AsyncMock(side_effect=RuntimeError("temporary error"))
+
+    await attempt_with_retries(
+        job=job,
+        existing_attempts=0,
+        max_attempts=3,
+        retry_delays=[1.0, 3.0, 10.0],
+        attempt_send_fn=attempt_send_fn,
+        delivery_repo=delivery_repo,
+        dlq_publisher=dlq_publisher,
+        retry_publisher=retry_publisher,
+    )
+
+    # одна попытка, статус RETRYING, дальше — retry-топик
+    attempt_send_fn.assert_awaited_once()
+    last_kwargs = delivery_repo.save_status.await_args_list[-1][1]
+    assert last_kwargs["status"] == "RETRYING"
+    retry_publisher.publish_retry.assert_awaited_once_with(
+        job, attempts=1, delay_seconds=1.0)
+    dlq_publisher.publish_job.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_retry_engine_defers_open_circuit_without_counting_attempt():
+    job = make_notification_job()
+    delivery_repo = FakeDeliveryRepo()
+    dlq_publisher = FakeDlqPublisher()
+    defer_fn = AsyncMock()
+
+    attempt_send_fn = AsyncMock(
+        side_effect=CircuitOpenError("email", retry_after_seconds=12.0))
+
+    await attempt_with_retries(
+        job=job,
+        existing_attempts=2,
+        max_attempts=3,
+        retry_delays=[0.0],
+        attempt_send_fn=attempt_send_fn,
+        delivery_repo=delivery_repo,
+        dlq_publisher=dlq_publisher,
+        defer_fn=defer_fn,
+    )
+
+    defer_fn.assert_awaited_once_with(job, 2, 12.0)
+    last_kwargs = delivery_repo.save_status.await_args_list[-1][1]
+    assert (last_kwargs["status"], last_kwargs["attempts"]) == ("RETRYING", 2)
+    dlq_publisher.publish_job.assert_not_awaited()
@@ -0,0 +1,138 @@
+import asyncio
+import functools
+
+import pytest
+
+from src.notifications.worker.consumer import KeyedDispatcher
+from src.notifications.worker.senders import ChannelLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_out_sends_after_burst():
+    bucket = TokenBucket(rate=50, burst=2)
+
+    waits = [await bucket.acquire() for _ in range(4)]
+
+    assert max(waits[:2]) < 0.005
+    # 3-й и 4-й ждут по ~1/50 с
+    assert all(wait >= 0.015 for wait in waits[2:])
+
+
+@pytest.mark.asyncio
+async def test_channel_concurrency_limit_does_not_block_other_channels():
+    release = asyncio.Event()
+    email = ChannelLimiter("email", max_concurrency=1)
+    push = ChannelLimiter("push", max_concurrency=1)
+
+    async def send_email():
+        async with email.slot():
+            await release.wait()
+
+    emails = [asyncio.create_task(send_email()) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    assert email.stats()["waiting"] == 1
+
+    # email-канал занят, а push получает слот сразу
+    async with push.slot():
+        pass
+
+    release.set()
+    await asyncio.gather(*emails)
+    stats = email.stats()
+    assert stats["acquired"] == 2
+    assert stats["concurrency_wait_seconds"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_channel_does_not_hold_dispatcher_slots():
+    dispatcher = KeyedDispatcher(max_in_flight=2)
+    email_limiter = ChannelLimiter("email", max_concurrency=0, rate=1, burst=1)
+    finished: dict[str, float] = {}
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    def make_job(name: str):
+        async def job():
+            finished[name] = loop.time() - started
+        return job
+
+    # первый email забирает токен, остальные ждут его ~1 с каждый
+    for idx in range(3):
+        await dispatcher.submit(
+            f"email-{idx}", make_job(f"email-{idx}"),
+            admission=email_limiter.slot,
+        )
+    await dispatcher.submit("push", make_job("push"))
+    await asyncio.sleep(0.1)
+
+    # email'ы в ожидании токена не занимают слоты dispatcher'а
+    assert dispatcher.running == 0
+    assert finished["push"] < 0.1
+    assert "email-1" not in finished
+
+    for task in list(dispatcher._tasks):
+        task.cancel()
+    await asyncio.gather(*dispatcher._tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_saturated_email_room_does_not_block_push_or_high_lane():
+    dispatcher = KeyedDispatcher(
+        max_in_flight=2, lane_weights={"high": 4, "normal": 1}, max_queued=2)
+    email_limiter = ChannelLimiter("email", rate=1, burst=1)
+    push_limiter = ChannelLimiter("push", max_concurrency=10)
+    campaign_email = email_limiter.slot
+    done: list[str] = []
+
+    def make_job(name: str):
+        async def job():
+            done.append(name)
+        return job
+
+    # кампания выбрала токен и заполнила свою комнату ожидания
+    for idx in range(3):
+        await dispatcher.submit(
+            f"email-{idx}", make_job(f"email-{idx}"),
+            admission=campaign_email)
+    blocked = asyncio.create_task(dispatcher.submit(
+        "email-3", make_job("email-3"), admission=campaign_email))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    # job'ы с допуском ждут в комнатах своих (lane, канал)
+    await asyncio.wait_for(dispatcher.submit(
+        "push", make_job("push"), admission=push_limiter.slot), 0.1)
+    await asyncio.wait_for(dispatcher.submit(
+        "high", make_job("high"), lane="high",
+        admission=functools.partial(push_limiter.slot, priority=True),
+    ), 0.1)
+    await asyncio.sleep(0.05)
+    assert {"push", "high"} <= set(done)
+    assert "email-1" not in done
+
+    blocked.cancel()
+    for task in list(dispatcher._tasks):
+        task.cancel()
+    await asyncio.gather(blocked, *dispatcher._tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_priority_waiters_get_tokens_first():
+    bucket = TokenBucket(rate=50, burst=1)
+    order: list[str] = []
+
+    async def take(name: str, priority: bool = False):
+        await bucket.acquire(priority)
+        order.append(name)
+
+    await take("first")
+    tasks = [asyncio.create_task(take("normal-1"))]
+    await asyncio.sleep(0)
+    tasks += [
+        asyncio.create_task(take("normal-2")),
+        asyncio.create_task(take("high", priority=True)),
+    ]
+    await asyncio.gather(*tasks)
+
+    # normal-1 уже ждал токен, high обгоняет только тех, кто в очереди
+    assert order == ["first", "normal-1", "high", "normal-2"]
@@ -0,0 +1,135 @@
+import asyncio
+from email.mime.text import MIMEText
+from unittest.mock import AsyncMock, MagicMock
+
+import aiosmtplib
+import pytest
+
+from src.notifications.worker.senders import EmailSender, SmtpConnectionPool
+
+
+class FakeSmtp:
+    def __init__(self) -> None:
+        self.is_connected = False
+        self.connect = AsyncMock(side_effect=self._connect)
+        self.noop = AsyncMock()
+        self.quit = AsyncMock()
+        self.close = MagicMock()
+        self.send_message = AsyncMock()
+
+    async def _connect(self):
+        self.is_connected = True
+
+
+def _pool(size=2, **kwargs):
+    sessions = []
+
+    def factory():
+        sessions.append(FakeSmtp())
+        return sessions[-1]
+
+    pool = SmtpConnectionPool(
+        "mailpit", 1025, size=size, smtp_factory=factory, **kwargs)
+    return pool, sessions
+
+
+@pytest.mark.asyncio
+async def test_email_sender_reuses_pooled_session():
+    pool, sessions = _pool()
+    sender = EmailSender("mailpit", 1025, "noreply@example.com", pool=pool)
+
+    for idx in range(3):
+        await sender.send(to=f"u{idx}@example.com", subject="s", body="b")
+
+    assert len(sessions) == 1
+    assert sessions[0].send_message.await_count == 3
+    await pool.close()
+    sessions[0].quit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_session_is_replaced():
+    pool, sessions = _pool()
+    msg = MIMEText("b")
+
+    await pool.send_message(msg, sender="a@x", recipients=["b@x"])
+    sessions[0].send_message.side_effect = (
+        aiosmtplib.SMTPServerDisconnected("gone"))
+    with pytest.raises(aiosmtplib.SMTPServerDisconnected):
+        await pool.send_message(msg, sender="a@x", recipients=["b@x"])
+    sessions[0].close.assert_called_once()
+
+    await pool.send_message(msg, sender="a@x", recipients=["b@x"])
+    assert len(sessions) == 2
+
+
+@pytest.mark.asyncio
+async def test_idle_session_is_health_checked():
+    pool, sessions = _pool(idle_check_seconds=0)
+    msg = MIMEText("b")
+    await pool.send_message(msg, sender="a@x", recipients=["b@x"])
+
+    sessions[0].noop.side_effect = aiosmtplib.SMTPServerDisconnected("idle")
+    await pool.send_message(msg, sender="a@x", recipients=["b@x"])
+
+    assert len(sessions) == 2
+    assert sessions[1].send_message.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_saturation():
+    pool, sessions = _pool(size=1)
+    release = asyncio.Event()
+
+    async def send():
+        async with pool.acquire():
+            await release.wait()
+
+    first = asyncio.create_task(send())
+    second = asyncio.create_task(send())
+    await asyncio.sleep(0.01)
+    assert pool.stats()["in_use"] == 1
+    assert pool.stats()["waiting"] == 1
+
+    release.set()
+    await asyncio.gather(first, second)
+    stats = pool.stats()
+    assert stats["saturated_acquires"] == 1
+    assert stats["connects"] == 1
+    assert len(sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_campaign_emails_share_one_transaction():
+    pool, sessions = _pool()
+    sender = EmailSender(
+        "mailpit",
+        1025,
+        "noreply@example.com",
+        pool=pool,
+        batch_window_seconds=0.01,
+        batch_max_recipients=2,
+    )
+
+    async def send_message(msg, *, sender, recipients):
+        assert msg["To"] == "undisclosed-recipients:;"
+        refused = {to: "550 no such user" for to in recipients if "bad" in to}
+        return refused, "250 OK"
+
+    await pool.send_message(MIMEText("warm"), sender="a@x", recipients=["b@x"])
+    sessions[0].send_message.side_effect = send_message
+
+    results = await asyncio.gather(
+        *(
+            sender.send(to=to, subject="Промо", body="<b>-50%</b>",
+                        batchable=True)
+            for to in ("a@x", "bad@x", "c@x")
+        ),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], RuntimeError)
+    # 3 получателя при лимите 2 → две транзакции (+1 прогревочная)
+    assert sessions[0].send_message.await_count == 3
+    assert sender.batcher.stats()["recipients"] == 3
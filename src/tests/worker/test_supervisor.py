@@ -0,0 +1,95 @@
+import os
+import time
+import urllib.request
+
+from src.notifications.worker.core.stats import StatsSources, merge_snapshots
+from src.notifications.worker.supervisor import WorkerSupervisor
+
+
+def _crash_once(index, stats_queue):
+    # Первый запуск падает, перезапущенный процесс шлёт stats и живёт
+    marker = os.environ["SUPERVISOR_TEST_MARKER"]
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise SystemExit(1)
+    stats_queue.put((os.getpid(), {"dispatcher.completed": 5}))
+    time.sleep(30)
+
+
+def _count_jobs(index, stats_queue):
+    # импорт после старта: каталог метрик задан супервизором
+    from src.notifications.worker.core.metrics import JOBS_TOTAL
+
+    JOBS_TOTAL.labels(channel="email", outcome="ok").inc(index + 1)
+    stats_queue.put((os.getpid(), {}))
+    time.sleep(30)
+
+
+def test_stats_sources_keep_numeric_values_and_merge_by_key():
+    stats = StatsSources()
+    stats.register("breaker_email", lambda: {"state": "open", "rejected": 3})
+    stats.register("broken", lambda: 1 / 0)
+
+    snapshot = stats.snapshot()
+
+    assert snapshot == {"breaker_email.rejected": 3}
+    assert merge_snapshots([snapshot, snapshot, {"dlq.published": 1}]) == {
+        "breaker_email.rejected": 6,
+        "dlq.published": 1,
+    }
+
+
+def test_supervisor_restarts_crashed_child_and_collects_stats(tmp_path):
+    os.environ["SUPERVISOR_TEST_MARKER"] = str(tmp_path / "crashed")
+    supervisor = WorkerSupervisor(
+        1,
+        _crash_once,
+        shutdown_timeout_seconds=5,
+        max_restart_backoff_seconds=0.1,
+    )
+    supervisor._start_child(0, restarts=0)
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            supervisor._drain_stats(timeout=0.1)
+            supervisor._check_children()
+            if supervisor._latest_stats:
+                break
+        stats = supervisor.merged_stats()
+        assert stats["dispatcher.completed"] == 5
+        assert stats["supervisor.restarts"] == 1
+        assert stats["supervisor.processes_alive"] == 1
+    finally:
+        supervisor._shutdown()
+
+
+def test_supervisor_serves_sum_of_process_metrics():
+    supervisor = WorkerSupervisor(
+        2,
+        _count_jobs,
+        shutdown_timeout_seconds=5,
+        metrics_address=("127.0.0.1", 0),
+    )
+    supervisor._start_metrics_server(("127.0.0.1", 0))
+    port = supervisor._metrics_server.server_port
+    for index in range(2):
+        supervisor._start_child(index, restarts=0)
+    try:
+        deadline = time.monotonic() + 30
+        while len(supervisor._latest_stats) < 2:
+            assert time.monotonic() < deadline
+            supervisor._drain_stats(timeout=0.1)
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{port}/metrics", timeout=5,
+        ) as response:
+            text = response.read().decode()
+    finally:
+        supervisor._shutdown()
+
+    assert (
+        'notifications_worker_jobs_total{channel="email",outcome="ok"} 3.0'
+        in text
+    )
+    alive = 'notifications_worker_supervisor{stat="processes_alive"} 2.0'
+    assert alive in text
+    assert "PROMETHEUS_MULTIPROC_DIR" not in os.environ
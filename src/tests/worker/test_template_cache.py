@@ -0,0 +1,134 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import asyncpg
+import pytest
+
+from src.notifications.worker.repositories import (
+    CachedTemplateRepository,
+    Template,
+    TemplateChangeListener,
+)
+
+
+def _template(code="welcome"):
+    return Template(
+        template_code=code,
+        locale="ru",
+        channel="email",
+        subject="Привет",
+        body="Привет, {name}",
+    )
+
+
+def _cached(repo):
+    return CachedTemplateRepository(repo, max_size=10, ttl_seconds=60)
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_db_once_and_caches_missing_templates():
+    repo = AsyncMock()
+    repo.get_template.side_effect = (
+        lambda template_code, **_: _template() if template_code == "welcome"
+        else None
+    )
+    cached = _cached(repo)
+
+    for _ in range(3):
+        assert await cached.get_template("welcome", "ru", "email")
+        assert await cached.get_template("typo", "ru", "email") is None
+
+    assert repo.get_template.await_count == 2
+    assert cached.stats()["hits"] == 4
+
+
+@pytest.mark.asyncio
+async def test_notify_invalidates_single_key():
+    repo = AsyncMock()
+    repo.list_templates.return_value = [_template("a"), _template("b")]
+    cached = _cached(repo)
+    assert await cached.warm() == 2
+
+    listener = TemplateChangeListener(
+        dsn="postgresql://unused", channel="templates_changed", cache=cached)
+    payload = json.dumps(
+        {"template_code": "a", "locale": "ru", "channel": "email"})
+    listener._on_notify(None, 1, "templates_changed", payload)
+
+    repo.get_template.return_value = _template("a")
+    await cached.get_template("a", "ru", "email")
+    await cached.get_template("b", "ru", "email")
+    repo.get_template.assert_awaited_once()
+
+    # Непонятный payload — сбрасываем всё
+    listener._on_notify(None, 1, "templates_changed", "garbage")
+    assert cached.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("reset", ["invalidate", "clear"])
+async def test_invalidation_during_fetch_does_not_cache_stale_template(reset):
+    fetched = asyncio.Event()
+    release = asyncio.Event()
+    stale, fresh = _template(), _template()
+    fresh.body = "Здравствуйте, {name}"
+
+    async def slow_get_template(**_):
+        # первый запрос читает старую версию, пока приходит NOTIFY
+        if not fetched.is_set():
+            fetched.set()
+            await release.wait()
+            return stale
+        return fresh
+
+    repo = AsyncMock()
+    repo.get_template.side_effect = slow_get_template
+    cached = _cached(repo)
+
+    pending = asyncio.create_task(
+        cached.get_template("welcome", "ru", "email"))
+    await fetched.wait()
+    if reset == "invalidate":
+        cached.invalidate("welcome", "ru", "email")
+    else:
+        cached.clear()
+    release.set()
+
+    assert await pending is stale
+    assert await cached.get_template("welcome", "ru", "email") is fresh
+    assert repo.get_template.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_after_interface_error():
+    repo = AsyncMock()
+    repo.list_templates.return_value = [_template("a")]
+    cached = _cached(repo)
+    await cached.warm()
+
+    listener = TemplateChangeListener(
+        dsn="postgresql://unused",
+        channel="templates_changed",
+        cache=cached,
+        reconnect_delay_seconds=0,
+    )
+    listening = asyncio.Event()
+    attempts = 0
+
+    async def listen_once():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise asyncpg.InterfaceError("connection was closed")
+        listening.set()
+        await asyncio.Event().wait()
+
+    listener._listen_once = listen_once
+    await listener.start()
+    await asyncio.wait_for(listening.wait(), 1)
+
+    assert attempts == 2
+    # уведомления могли потеряться — кеш сброшен
+    assert cached.stats()["size"] == 0
+    await listener.stop()